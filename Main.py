@@ -1,16 +1,40 @@
 import streamlit as st
+from core import precarga, trazas
 
 st.set_page_config(
     page_title="FLEX WATCH | Dashboard",
     page_icon="✈️",
     layout="wide"
 )
+# --- Exportador de métricas en /metrics (FLEXWATCH_METRICAS_PUERTO) ---
+@st.cache_resource
+def iniciar_exportador_metricas():
+    """Un solo servidor de métricas por proceso."""
+    return trazas.iniciar_exportador()
+
+iniciar_exportador_metricas()
+
+# --- Vista oculta de métricas por etapa: /?metricas ---
+if "metricas" in st.query_params:
+    import panel_metricas
+    panel_metricas.mostrar()
+    st.stop()
+
 # --- AÑADIR EL LOGO A LA BARRA LATERAL ---
 # Usa la ruta a tu archivo de imagen
 st.sidebar.image("assets/logo.png")
 # --- FIN DEL CÓDIGO DEL LOGO ---
 st.title("FLEX WATCH Dashboard ✈️")
 
+# --- Precarga de la red en segundo plano (FLEXWATCH_PRECARGA=1) ---
+@st.cache_resource
+def iniciar_precarga():
+    """Un solo hilo de precarga por proceso; mantiene caliente la caché de la red."""
+    return precarga.iniciar_en_segundo_plano()
+
+if precarga.habilitada():
+    iniciar_precarga()
+
 st.sidebar.success("Selecciona una de las páginas de análisis.")
 
 st.markdown(
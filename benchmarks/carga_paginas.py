@@ -0,0 +1,93 @@
+"""
+Tiempo de importación de la capa de servicios y de carga en frío de las páginas.
+
+Cada medición corre en un proceso nuevo, así que incluye las importaciones.
+Para los módulos de `core` (y `scraper.py`) comprueba además que `fpdf`,
+`playwright` y `g4f` no se hayan cargado: se importan recién al usarse. Las
+páginas se ejecutan con `streamlit.testing` (si Streamlit está instalado),
+con la caché en un archivo temporal.
+
+Uso: python benchmarks/carga_paginas.py [--repeticiones N] [--sin-paginas]
+"""
+import argparse
+import glob
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULOS = ["core.analisis", "core.health_check", "core.reporte", "core.faa", "core.weather", "scraper"]
+PESADOS = ["fpdf", "playwright", "g4f"]
+
+_IMPORTAR = """
+import importlib, json, sys, time
+inicio = time.perf_counter()
+importlib.import_module(sys.argv[1])
+print(json.dumps({"segundos": time.perf_counter() - inicio, "pesados": [m for m in sys.argv[2:] if m in sys.modules]}))
+"""
+
+_PAGINA = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+prueba = AppTest.from_file(sys.argv[1], default_timeout=120)
+inicio = time.perf_counter()
+prueba.run()
+print(json.dumps({"segundos": time.perf_counter() - inicio, "errores": [str(e.value) for e in prueba.exception]}))
+"""
+
+
+def _ejecutar(codigo, *argumentos, entorno=None):
+    salida = subprocess.run(
+        [sys.executable, "-c", codigo, *argumentos], cwd=RAIZ, env=entorno, capture_output=True, text=True, check=True,
+    )
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def medir_importaciones(repeticiones):
+    """Por módulo: mediana de segundos de importación y dependencias pesadas cargadas."""
+    entorno = dict(os.environ, PYTHONPATH=RAIZ)
+    resultados = {}
+    for modulo in MODULOS:
+        medidas = [_ejecutar(_IMPORTAR, modulo, *PESADOS, entorno=entorno) for _ in range(repeticiones)]
+        resultados[modulo] = (statistics.median(m["segundos"] for m in medidas), medidas[-1]["pesados"])
+    return resultados
+
+
+def medir_paginas(repeticiones):
+    """Por página: mediana de segundos de la primera ejecución y errores de la última."""
+    directorio = tempfile.mkdtemp(prefix="flexwatch-carga-")
+    entorno = dict(os.environ, PYTHONPATH=RAIZ, FLEXWATCH_CACHE=os.path.join(directorio, "cache.sqlite3"))
+    resultados = {}
+    for pagina in sorted(glob.glob(os.path.join(RAIZ, "pages", "*.py"))):
+        medidas = [_ejecutar(_PAGINA, pagina, entorno=entorno) for _ in range(repeticiones)]
+        resultados[os.path.basename(pagina)] = (statistics.median(m["segundos"] for m in medidas), medidas[-1]["errores"])
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--sin-paginas", action="store_true", help="Solo las importaciones de los módulos.")
+    args = parser.parse_args()
+
+    print(f"{'módulo':<32}{'import ms':>12}  pesados cargados")
+    for modulo, (segundos, pesados) in medir_importaciones(args.repeticiones).items():
+        print(f"{modulo:<32}{segundos * 1000:>12.1f}  {', '.join(pesados) or '-'}")
+
+    if args.sin_paginas:
+        return
+    # Las páginas se miden en procesos nuevos: aquí solo se comprueba que Streamlit esté, sin importarlo
+    if importlib.util.find_spec("streamlit") is None:
+        print("\nStreamlit no está instalado: se omite la carga de páginas.")
+        return
+    print(f"\n{'página (primera ejecución)':<32}{'ms':>12}  errores")
+    for pagina, (segundos, errores) in medir_paginas(args.repeticiones).items():
+        print(f"{pagina:<32}{segundos * 1000:>12.1f}  {'; '.join(errores) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+Servidor local que imita el endpoint de búsqueda de NOTAMs de la FAA.
+
+Responde `POST .../search` como el portal (`notamList`, `totalNotamCount`,
+paginado por `offset`) para ejercitar `fuentes_notam.FuenteHTTP` sin red.
+`GET .../` sirve una página estática con lo que recorre el flujo de
+Playwright (`faa.buscar_y_descargar_notams`): el disclaimer, el buscador, la
+tabla de resultados y el ícono de Excel, que descarga `GET .../export`: un
+libro con los NOTAMs de todos los aeropuertos buscados, los mismos de la
+tabla. No hay con qué escribir .xls, así que es un .xlsx (openpyxl), que
+`faa.leer_excel_notams` reconoce por su contenido aunque se guarde como .xls.
+Con `--grabaciones` reproduce las respuestas JSON guardadas con
+`FLEXWATCH_FAA_GRABAR`; las búsquedas sin grabación se arman a partir de los
+exports .xls de `descargas_notam/`, filtrados por aeropuerto. Con `--clonar`
+cualquier aeropuerto sin NOTAMs de ejemplo recibe los de uno de los exports,
+con las fechas corridas a hoy, para simular una red completa.
+
+Uso: python benchmarks/faa_falso.py [--puerto N] [--grabaciones DIR] [--latencia S]
+y luego FLEXWATCH_FAA_URL=<url impresa>, con FLEXWATCH_FUENTE_NOTAM=http para
+la fuente HTTP o sin ella para el navegador.
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from core import faa  # noqa: E402
+from core.fuentes_notam import CAMPOS_JSON, nombre_grabacion  # noqa: E402
+
+NOTAMS_POR_PAGINA = 30
+# El buscador del portal reducido a lo que usa `core.faa`: mismos selectores y
+# la misma búsqueda paginada; el disclaimer se acepta una vez por pestaña
+PAGINA_PORTAL = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>NOTAM Search (falso)</title></head>
+<body>
+<div id="bienvenida" hidden><button type="button">I've read and understood above statements</button></div>
+<form id="buscador" hidden><input name="designatorsForLocation" type="text" autocomplete="off"></form>
+<div id="resultados"></div>
+<script>
+const bienvenida = document.getElementById("bienvenida");
+const buscador = document.getElementById("buscador");
+const columnas = ["facilityDesignator", "notamNumber", "classification", "issueDate", "startDate", "endDate", "traditionalMessage"];
+const titulos = ["Location", "NOTAM #/LTA #", "Class", "Issue Date (UTC)", "Effective Date (UTC)", "Expiration Date (UTC)", "NOTAM Condition"];
+function mostrarBuscador() { bienvenida.hidden = true; buscador.hidden = false; }
+if (sessionStorage.getItem("aceptado")) { mostrarBuscador(); } else { bienvenida.hidden = false; }
+bienvenida.querySelector("button").addEventListener("click", () => { sessionStorage.setItem("aceptado", "1"); mostrarBuscador(); });
+buscador.addEventListener("submit", async (evento) => {
+  evento.preventDefault();
+  const designadores = buscador.designatorsForLocation.value;
+  const notams = [];
+  for (let total = 1; notams.length < total;) {
+    const respuesta = await fetch("search", {method: "POST", body: new URLSearchParams(
+      {searchType: 0, designatorsForLocation: designadores, offset: notams.length, notamsOnly: "false", radius: 10})});
+    const datos = await respuesta.json();
+    if (!datos.notamList.length) break;
+    notams.push(...datos.notamList);
+    total = datos.totalNotamCount;
+  }
+  const tabla = document.createElement("table");
+  tabla.className = "table table-striped";
+  const encabezado = tabla.insertRow();
+  for (const titulo of titulos) { const th = document.createElement("th"); th.textContent = titulo; encabezado.appendChild(th); }
+  for (const notam of notams) {
+    const fila = tabla.insertRow();
+    for (const campo of columnas) { fila.insertCell().textContent = notam[campo] || ""; }
+  }
+  const excel = document.createElement("a");
+  excel.href = "export?" + new URLSearchParams({designatorsForLocation: designadores});
+  excel.download = "";
+  excel.innerHTML = '<span class="icon-excel">Excel</span>';
+  document.getElementById("resultados").replaceChildren(excel, tabla);
+});
+</script>
+</body></html>
+"""
+
+
+def _fecha_faa(fecha, permanente=False, estimada=False):
+    if permanente:
+        return "PERM"
+    if fecha is None or fecha != fecha:
+        return ""
+    return fecha.strftime("%m/%d/%Y %H%M") + ("EST" if estimada else "")
+
+
+def exportes_de_ejemplo():
+    return sorted(glob.glob(os.path.join(RAIZ, "descargas_notam", "*.xls")))
+
+
+def notams_de_exportes(archivos=None, a_hoy=False):
+    """
+    Los NOTAMs de los exports .xls como objetos del JSON de búsqueda.
+
+    Con `a_hoy` las fechas de cada export se corren para que su NOTAM más
+    reciente se haya emitido ahora, de modo que sigan vigentes.
+    """
+    notams = []
+    for ruta in archivos or exportes_de_ejemplo():
+        df = faa.leer_excel_notams(ruta)
+        desfase = datetime.now(timezone.utc) - df["Issue Date (UTC)"].max() if a_hoy and len(df) else None
+        for fila in df.to_dict("records"):
+            if desfase is not None:
+                for columna in faa.COLUMNAS_FECHA:
+                    fila[columna] = fila[columna] + desfase
+            notam = {campo: str(fila[columna]) for columna, campo in CAMPOS_JSON.items() if columna not in faa.COLUMNAS_FECHA}
+            notam["issueDate"] = _fecha_faa(fila["Issue Date (UTC)"])
+            notam["startDate"] = _fecha_faa(fila["Effective Date (UTC)"])
+            notam["endDate"] = _fecha_faa(fila["Expiration Date (UTC)"], fila["Expiration PERM"], fila["Expiration EST"])
+            notam["traditionalMessage"] = fila["Condition"]
+            notams.append(notam)
+    return notams
+
+
+class ManejadorFAA(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _responder(self, estado, cuerpo):
+        self._enviar(estado, json.dumps(cuerpo).encode("utf-8"), "application/json")
+
+    def _enviar(self, estado, datos, tipo, encabezados=None):
+        self.send_response(estado)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(datos)))
+        for nombre, valor in (encabezados or {}).items():
+            self.send_header(nombre, valor)
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path.rstrip("/").endswith("/export"):
+            campos = parse_qs(url.query)
+            designadores = [d.strip().upper() for d in campos.get("designatorsForLocation", [""])[0].split(",") if d.strip()]
+            if self.server.latencia:
+                time.sleep(self.server.latencia)
+            datos = self.server.export_de(designadores)
+            self.server.exportes += 1
+            self._enviar(200, datos, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", {
+                "Content-Disposition": 'attachment; filename="NOTAM_Search_Results.xlsx"',
+            })
+        elif url.path.rstrip("/").endswith("/notamSearch"):
+            self._enviar(200, PAGINA_PORTAL.encode("utf-8"), "text/html; charset=utf-8")
+        else:
+            self._responder(404, {"error": "not found"})
+
+    def do_POST(self):
+        campos = parse_qs(self.rfile.read(int(self.headers.get("Content-Length") or 0)).decode("utf-8"))
+        if not self.path.rstrip("/").endswith("/search"):
+            self._responder(404, {"error": "not found"})
+            return
+        designadores = [d.strip().upper() for d in campos.get("designatorsForLocation", [""])[0].split(",") if d.strip()]
+        offset = int(campos.get("offset", ["0"])[0])
+        if self.server.latencia:
+            time.sleep(self.server.latencia)
+        self.server.busquedas += 1
+        self._responder(200, self.server.responder(designadores, offset))
+
+    def log_message(self, formato, *args):
+        pass
+
+
+class ServidorFAAFalso(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, direccion, grabaciones=None, exportes=None, latencia=0.0, por_pagina=NOTAMS_POR_PAGINA, clonar=False):
+        super().__init__(direccion, ManejadorFAA)
+        self.grabaciones = grabaciones
+        self.latencia = latencia
+        self.por_pagina = por_pagina
+        self.clonar = clonar
+        exportes = exportes or exportes_de_ejemplo()
+        self.notams = notams_de_exportes(exportes, a_hoy=clonar)
+        self.plantillas = {}
+        for notam in self.notams:
+            self.plantillas.setdefault(notam["facilityDesignator"].upper(), []).append(notam)
+        self.busquedas = 0
+        self.exportes = 0
+
+    def _plantilla(self, designador):
+        """Ubicación de los NOTAMs de ejemplo que recibe `designador` (la suya o, con `clonar`, una fija)."""
+        codigos = faa.codigos_de_ubicacion(designador)
+        propias = [codigo for codigo in sorted(codigos) if codigo in self.plantillas]
+        if propias or not self.clonar or not self.plantillas:
+            return propias[0] if propias else None
+        # Siempre la misma plantilla para el mismo aeropuerto, para que las descargas sean estables
+        ubicaciones = sorted(self.plantillas)
+        return ubicaciones[zlib.crc32(designador.encode()) % len(ubicaciones)]
+
+    def _notams_de(self, designador):
+        codigos = faa.codigos_de_ubicacion(designador)
+        encontrados = [n for codigo in sorted(codigos) for n in self.plantillas.get(codigo, [])]
+        if encontrados or not self.clonar or not self.plantillas:
+            return encontrados
+        plantilla = self.plantillas[self._plantilla(designador)]
+        # Los aeropuertos de EE. UU. figuran con su identificador FAA de tres letras
+        ubicacion = min(codigos, key=len)
+        return [{**n, "facilityDesignator": ubicacion} for n in plantilla]
+
+    def export_de(self, designadores):
+        """Bytes del export de una búsqueda: encabezado del portal y los NOTAMs de cada aeropuerto, en orden."""
+        from openpyxl import Workbook
+
+        libro = Workbook(write_only=True)
+        hoja = libro.create_sheet("NOTAMs")
+        hoja.append([*CAMPOS_JSON, "NOTAM Condition"])
+        for designador in designadores:
+            for notam in self._notams_de(designador):
+                hoja.append([*(notam.get(campo, "") for campo in CAMPOS_JSON.values()), notam["traditionalMessage"]])
+        salida = io.BytesIO()
+        libro.save(salida)
+        return salida.getvalue()
+
+    def responder(self, designadores, offset):
+        if self.grabaciones:
+            ruta = os.path.join(self.grabaciones, nombre_grabacion(designadores, offset))
+            if os.path.exists(ruta):
+                with open(ruta, encoding="utf-8") as f:
+                    return json.load(f)
+        encontrados = [n for d in designadores for n in self._notams_de(d)]
+        pagina = encontrados[offset:offset + self.por_pagina]
+        return {
+            "notamList": pagina,
+            "totalNotamCount": len(encontrados),
+            "startRecordCount": offset + 1 if pagina else 0,
+            "endRecordCount": offset + len(pagina),
+        }
+
+
+def iniciar_servidor(puerto=0, **opciones):
+    """Arranca el servidor en un hilo y devuelve `(servidor, url_base)`; se detiene con `servidor.shutdown()`."""
+    servidor = ServidorFAAFalso(("127.0.0.1", puerto), **opciones)
+    threading.Thread(target=servidor.serve_forever, name="faa-falso", daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_address[1]}/notamSearch/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--grabaciones", help="Carpeta con respuestas JSON grabadas con FLEXWATCH_FAA_GRABAR.")
+    parser.add_argument("--latencia", type=float, default=0.0, help="Segundos de espera por respuesta.")
+    parser.add_argument("--por-pagina", type=int, default=NOTAMS_POR_PAGINA)
+    parser.add_argument("--clonar", action="store_true", help="NOTAMs de ejemplo, con fechas de hoy, para cualquier aeropuerto.")
+    args = parser.parse_args()
+    servidor, url = iniciar_servidor(
+        args.puerto, grabaciones=args.grabaciones, latencia=args.latencia, por_pagina=args.por_pagina, clonar=args.clonar,
+    )
+    print(f"INFO: Servidor FAA falso en {url} ({len(servidor.notams)} NOTAMs de ejemplo).")
+    print(f"INFO: Usar con FLEXWATCH_FAA_URL={url} (y FLEXWATCH_FUENTE_NOTAM=http para la fuente HTTP)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Cliente de IA falso con latencia y tasa de fallos configurables.
+
+Imita la interfaz asíncrona de `g4f.client.AsyncClient` que usa
+`core.llm.ClienteIA` (respuesta completa o en streaming), de modo que la
+cobertura entre modelos, los circuitos y el semáforo se ejercitan igual que
+con los modelos reales. Los prompts de lote de `core.flight_batch` reciben un
+arreglo JSON con un veredicto por vuelo; el resto, un análisis enlatado.
+
+Uso desde un benchmark: `instalar(latencia=1.0, tasa_fallos=0.1)`.
+"""
+import asyncio
+import json
+import math
+import random
+import re
+import threading
+from types import SimpleNamespace
+
+from core import llm
+
+_RE_ID_VUELO = re.compile(r'^- id "([^"]+)"', re.M)
+RESPUESTA_ENLATADA = (
+    "✅ Normal\n\n**Análisis WX:** Sin condiciones adversas en la ventana de operación.\n\n"
+    "**Análisis NOTAM y Pistas:** Sin cierres que afecten la operación; pistas disponibles.\n\n"
+    "**Conclusión:** Operación normal."
+)
+
+
+class ClienteIAFalso:
+    """
+    `chat.completions.create(model=..., messages=..., stream=...)` con latencia log-normal.
+
+    `latencia` es la mediana en segundos y `dispersion` la desviación del
+    logaritmo; `tasa_fallos` (o `fallos_por_modelo[modelo]`) es la
+    probabilidad de que la llamada falle tras parte de su latencia.
+    """
+
+    def __init__(self, latencia=1.0, dispersion=0.5, tasa_fallos=0.0, fallos_por_modelo=None, fragmentos=20, semilla=None):
+        self.latencia = latencia
+        self.dispersion = dispersion
+        self.tasa_fallos = tasa_fallos
+        self.fallos_por_modelo = dict(fallos_por_modelo or {})
+        self.fragmentos = max(1, fragmentos)
+        self.llamadas = 0
+        self.fallos = 0
+        self._azar = random.Random(semilla)
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._crear))
+
+    def _sortear(self, modelo):
+        with self._lock:
+            self.llamadas += 1
+            demora = self._azar.lognormvariate(math.log(self.latencia), self.dispersion) if self.latencia > 0 else 0.0
+            falla = self._azar.random() < self.fallos_por_modelo.get(modelo, self.tasa_fallos)
+            if falla:
+                self.fallos += 1
+                demora *= self._azar.random()
+        return demora, falla
+
+    @staticmethod
+    def contenido(prompt):
+        """Respuesta enlatada: veredictos JSON para los prompts de lote, texto para el resto."""
+        ids = _RE_ID_VUELO.findall(prompt)
+        if not ids:
+            return RESPUESTA_ENLATADA
+        return json.dumps([
+            {"id": i, "estado": "✅ Normal", "analisis_wx": "Sin condiciones adversas.",
+             "analisis_notam": "Sin cierres relevantes.", "conclusion": "Operación normal."}
+            for i in ids
+        ], ensure_ascii=False)
+
+    def _crear(self, model, messages, stream=False):
+        prompt = messages[-1]["content"]
+        if stream:
+            return self._flujo(model, prompt)
+        return self._respuesta(model, prompt)
+
+    async def _respuesta(self, modelo, prompt):
+        demora, falla = self._sortear(modelo)
+        await asyncio.sleep(demora)
+        if falla:
+            raise RuntimeError(f"Fallo simulado de {modelo}")
+        mensaje = SimpleNamespace(content=self.contenido(prompt))
+        return SimpleNamespace(choices=[SimpleNamespace(message=mensaje)])
+
+    async def _flujo(self, modelo, prompt):
+        demora, falla = self._sortear(modelo)
+        texto = self.contenido(prompt)
+        tamano = math.ceil(len(texto) / self.fragmentos)
+        # La mitad de la latencia hasta el primer fragmento y el resto repartido entre los demás
+        await asyncio.sleep(demora / 2)
+        if falla:
+            raise RuntimeError(f"Fallo simulado de {modelo}")
+        for i in range(0, len(texto), tamano):
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=texto[i:i + tamano]))])
+            await asyncio.sleep(demora / 2 / self.fragmentos)
+
+
+def instalar(**opciones):
+    """Reemplaza el cliente de IA del proceso por uno con `ClienteIAFalso`; devuelve el cliente falso."""
+    falso = ClienteIAFalso(**opciones)
+    llm.usar_cliente_ia(llm.ClienteIA(crear_cliente=lambda: falso))
+    return falso
@@ -0,0 +1,114 @@
+"""
+Preparación de un itinerario mensual grande desde CSV/XLSX.
+
+Genera un itinerario sintético (por defecto 30 días de 300 tramos, con fecha
+en `Date` y horas sueltas en `STD`/`STA`, como las exportaciones de
+programación) sobre aeropuertos reales de la tabla IATA, y mide por etapa
+la lectura del archivo, `preparar_itinerario` y la deduplicación de
+aeropuertos y ventanas. Como referencia mide también la conversión fila a
+fila con `iata_a_icao`, la que hacía antes la página.
+
+Uso: python benchmarks/itinerario_masivo.py [--dias 30] [--tramos-por-dia 300]
+     [--aeropuertos 150] [--repeticiones 5] [--xlsx]
+"""
+import argparse
+import io
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import pandas as pd  # noqa: E402
+
+from core import dataset, itinerario  # noqa: E402
+
+
+def itinerario_mensual(dias, tramos_por_dia, aeropuertos, semilla=0):
+    """DataFrame con las columnas del editor de la página; algunos códigos no existen a propósito."""
+    azar = random.Random(semilla)
+    tabla = dataset.obtener_dataset()._arreglo("iata")
+    codigos = [c.decode() for c in azar.sample(list(tabla["iata"]), aeropuertos)] + ["XXX", "ZZ9"]
+    inicio = date.today().replace(day=1)
+    filas = []
+    for dia in range(dias):
+        fecha = inicio + timedelta(days=dia)
+        for i in range(tramos_por_dia):
+            origen, destino = azar.sample(codigos, 2)
+            std = azar.randrange(24 * 60)
+            sta = (std + azar.randrange(45, 600)) % (24 * 60)
+            filas.append({
+                "Order": str(len(filas) + 1), "Flight": f"FW{1000 + i}", "Date": f"{fecha:%d/%m/%Y}",
+                "STD": f"{std // 60:02d}:{std % 60:02d}", "STA": f"{sta // 60:02d}:{sta % 60:02d}",
+                "From": origen, "To": destino, "Reg.": f"N{700 + i % 40}FW",
+            })
+    return pd.DataFrame(filas)
+
+
+def _mediana_ms(fn, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = fn()
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos) * 1000, resultado
+
+
+def por_fila(df, aeropuertos):
+    """La conversión anterior: un `apply` por columna con una búsqueda por celda."""
+    def a_icao(codigo):
+        if pd.isna(codigo) or codigo == "":
+            return ""
+        icao = aeropuertos.iata_a_icao(str(codigo).strip().upper())
+        return itinerario.NO_ENCONTRADO if icao is None else icao
+    df = df.copy()
+    df["From_ICAO"] = df["From"].apply(a_icao)
+    df["To_ICAO"] = df["To"].apply(a_icao)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dias", type=int, default=30)
+    parser.add_argument("--tramos-por-dia", type=int, default=300)
+    parser.add_argument("--aeropuertos", type=int, default=150)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--xlsx", action="store_true", help="Medir también la lectura desde Excel (requiere openpyxl).")
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    aeropuertos = dataset.obtener_dataset()
+    df = itinerario_mensual(args.dias, args.tramos_por_dia, args.aeropuertos, args.semilla)
+    archivos = {"csv": df.to_csv(index=False).encode("utf-8")}
+    if args.xlsx:
+        salida = io.BytesIO()
+        df.to_excel(salida, index=False)
+        archivos["xlsx"] = salida.getvalue()
+
+    print(f"{len(df)} tramos, {args.aeropuertos} aeropuertos")
+    print(f"{'etapa':<28}{'ms (mediana)':>14}")
+    for extension, datos in archivos.items():
+        ms, leido = _mediana_ms(lambda: itinerario.leer_itinerario(datos, f"itinerario.{extension}"), args.repeticiones)
+        print(f"{'leer_' + extension:<28}{ms:>14.1f}")
+    ms, preparado = _mediana_ms(lambda: itinerario.preparar_itinerario(leido, aeropuertos), args.repeticiones)
+    print(f"{'preparar_itinerario':<28}{ms:>14.1f}")
+    ms, ventanas = _mediana_ms(lambda: itinerario.ventanas_por_aeropuerto(preparado), args.repeticiones)
+    print(f"{'ventanas_por_aeropuerto':<28}{ms:>14.1f}")
+    ms, _ = _mediana_ms(lambda: por_fila(leido, aeropuertos), args.repeticiones)
+    print(f"{'referencia: ICAO fila a fila':<28}{ms:>14.1f}")
+
+    sin_hora = int(preparado["STD_UTC"].isna().sum() + preparado["STA_UTC"].isna().sum())
+    print(
+        f"\n{len(ventanas)} aeropuertos a consultar (de {2 * len(preparado)} movimientos; "
+        f"{int(ventanas['movimientos'].sum())} pares aeropuerto/hora distintos), "
+        f"{int((preparado['From_ICAO'] == itinerario.NO_ENCONTRADO).sum())} orígenes no encontrados, "
+        f"{sin_hora} horas sin interpretar."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark del lector de exports de la FAA.
+
+Compara el camino anterior (`pd.read_excel(..., skiprows=4)` con columnas
+renombradas por posición y fechas parseadas después) contra
+`faa.leer_excel_notams` sobre los exports de ejemplo de `descargas_notam/`,
+tanto solo la lectura como la lectura más `notam_parser.parsear_notams`.
+Cada medida es el mejor tiempo de `--repeticiones` ejecuciones.
+
+Uso: python benchmarks/lector_xls.py [--repeticiones N] [archivos.xls ...]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import pandas as pd  # noqa: E402
+
+from core import faa, notam_parser  # noqa: E402
+
+
+def leer_excel_anterior(ruta):
+    """El lector previo: motor genérico de Excel y nombres de columna por posición."""
+    df = pd.read_excel(ruta, skiprows=4)
+    df.columns = faa.COLUMNAS_NOTAM
+    return df
+
+
+def medir(fn, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        fn()
+        tiempos.append(time.perf_counter() - inicio)
+    # El mejor tiempo es el menos afectado por el ruido de la máquina
+    return min(tiempos) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("archivos", nargs="*", help="Exports .xls de la FAA (por defecto, los de descargas_notam/).")
+    parser.add_argument("--repeticiones", type=int, default=100)
+    args = parser.parse_args()
+    archivos = args.archivos or sorted(glob.glob(os.path.join(RAIZ, "descargas_notam", "*.xls")))
+    if not archivos:
+        sys.exit("ERROR: No hay exports .xls para medir.")
+
+    print(f"{'archivo':<36}{'filas':>6}{'lectura ant.':>14}{'lectura nueva':>15}{'+parseo ant.':>14}{'+parseo nuevo':>15}{'memoria ant.':>14}{'memoria nueva':>15}")
+    for ruta in archivos:
+        anterior, nuevo = leer_excel_anterior(ruta), faa.leer_excel_notams(ruta)
+        # Mismo resultado por ambos caminos antes de comparar tiempos
+        pd.testing.assert_frame_equal(
+            notam_parser.parsear_notams(anterior).astype(str), notam_parser.parsear_notams(nuevo).astype(str),
+        )
+        fila = (
+            medir(lambda: leer_excel_anterior(ruta), args.repeticiones),
+            medir(lambda: faa.leer_excel_notams(ruta), args.repeticiones),
+            medir(lambda: notam_parser.parsear_notams(leer_excel_anterior(ruta)), args.repeticiones),
+            medir(lambda: notam_parser.parsear_notams(faa.leer_excel_notams(ruta)), args.repeticiones),
+        )
+        memoria = (anterior.memory_usage(deep=True).sum() / 1024, nuevo.memory_usage(deep=True).sum() / 1024)
+        print(
+            f"{os.path.basename(ruta):<36}{len(nuevo):>6}"
+            + "".join(f"{ms:>13.2f}ms" if i % 2 == 0 else f"{ms:>14.2f}ms" for i, ms in enumerate(fila))
+            + f"{memoria[0]:>12.1f}KB{memoria[1]:>13.1f}KB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Ráfaga de sesiones al cambio de turno: varias sesiones piden lo mismo a la vez.
+
+Cada sesión simulada (un hilo, como las sesiones de Streamlit) arranca al
+mismo tiempo que las demás y recorre lo que hacen las páginas con los mismos
+aeropuertos: NOTAMs por lote con su análisis de IA, y TAF/METAR con la
+narrativa del TAF en streaming. Usa los servicios falsos de `benchmarks/` y
+una caché vacía, así que todas las peticiones llegan mientras las primeras
+siguen en curso. Imprime la latencia por sesión y la carga real sobre la FAA,
+la API meteorológica y la IA, que con la coalescencia de
+`core.peticiones_en_curso` depende de los aeropuertos distintos y no de las
+sesiones.
+
+Uso: python benchmarks/rafaga_sesiones.py [--sesiones 8] [--aeropuertos 10]
+     [--latencia-faa S] [--latencia-wx S] [--latencia-ia S] [--sin-coalescencia]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+_DIRECTORIO_TEMPORAL = tempfile.mkdtemp(prefix="flexwatch-rafaga-")
+os.environ["FLEXWATCH_CACHE"] = os.path.join(_DIRECTORIO_TEMPORAL, "cache.sqlite3")
+
+import faa_falso  # noqa: E402
+import ia_falsa  # noqa: E402
+import wx_falso  # noqa: E402
+
+
+def sesion(aeropuertos, pistas, inicio):
+    """Lo que piden las páginas de NOTAM y WX para `aeropuertos`; devuelve los segundos que tardó."""
+    from core import analisis, faa, weather
+
+    inicio.wait()
+    reloj = time.perf_counter()
+    notams = faa.buscar_notams_por_lote(aeropuertos)
+    for icao in aeropuertos:
+        if notams.get(icao) is not None:
+            analisis.analizar_notams(notams[icao], icao, pistas.get(icao, []))
+    tafs = weather.obtener_tafs(aeropuertos)
+    weather.obtener_metars(aeropuertos)
+    for icao in aeropuertos:
+        if tafs.get(icao):
+            "".join(analisis.analizar_taf(tafs[icao], icao, en_vivo=True))
+    return time.perf_counter() - reloj
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sesiones", type=int, default=8)
+    parser.add_argument("--aeropuertos", type=int, default=10)
+    parser.add_argument("--latencia-faa", type=float, default=0.2)
+    parser.add_argument("--latencia-wx", type=float, default=0.1)
+    parser.add_argument("--latencia-ia", type=float, default=0.5)
+    parser.add_argument("--sin-coalescencia", action="store_true", help="Cada sesión hace sus propias peticiones.")
+    args = parser.parse_args()
+
+    faa_servidor, faa_url = faa_falso.iniciar_servidor(latencia=args.latencia_faa, clonar=True)
+    wx_servidor, wx_url = wx_falso.iniciar_servidor(latencia=args.latencia_wx)
+    os.environ.update({"FLEXWATCH_FUENTE_NOTAM": "http", "FLEXWATCH_FAA_URL": faa_url, "FLEXWATCH_WX_URL": wx_url})
+    ia = ia_falsa.instalar(latencia=args.latencia_ia, tasa_fallos=0)
+    try:
+        from core import peticiones_en_curso, red, runways
+
+        peticiones_en_curso.ACTIVA = not args.sin_coalescencia
+        aeropuertos = red.aeropuertos_red()[:args.aeropuertos]
+        pistas = runways.obtener_indice().cabeceras_por_lote(aeropuertos)
+        inicio = threading.Barrier(args.sesiones)
+        tiempos = [None] * args.sesiones
+
+        def correr(numero):
+            tiempos[numero] = sesion(aeropuertos, pistas, inicio)
+
+        hilos = [threading.Thread(target=correr, args=(n,), name=f"sesion-{n}") for n in range(args.sesiones)]
+        reloj = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        total = time.perf_counter() - reloj
+
+        compartidas = peticiones_en_curso.estadisticas()
+        print(
+            f"{args.sesiones} sesiones × {len(aeropuertos)} aeropuertos "
+            f"({'sin' if args.sin_coalescencia else 'con'} coalescencia)"
+        )
+        print(f"sesión p50 {statistics.median(tiempos):.2f} s · máx. {max(tiempos):.2f} s · ráfaga completa {total:.2f} s")
+        print(
+            f"FAA falsa: {faa_servidor.busquedas} búsquedas · API WX falsa: {wx_servidor.peticiones} peticiones · "
+            f"IA falsa: {ia.llamadas} llamadas"
+        )
+        print(f"{'tipo':<12}{'ejecutadas':>12}{'unidas':>10}")
+        for tipo, datos in compartidas.items():
+            if tipo != "total":
+                print(f"{tipo:<12}{datos['propias']:>12}{datos['unidas']:>10}")
+        faa_servidor.shutdown()
+        wx_servidor.shutdown()
+    finally:
+        shutil.rmtree(_DIRECTORIO_TEMPORAL, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
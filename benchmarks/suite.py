@@ -0,0 +1,238 @@
+"""
+Benchmark de punta a punta sin red: FAA, API meteorológica e IA falsas.
+
+Levanta los servidores locales de `faa_falso.py` (con NOTAMs clonados para
+toda la red) y `wx_falso.py`, instala el cliente de `ia_falsa.py` y usa una
+caché temporal, así que nada sale a internet ni toca la caché real. Mide por
+etapa el número de llamadas, los fallos, la latencia p50/p95 y el throughput:
+
+- `notam_aeropuerto`: NOTAMs de un solo aeropuerto sin caché (lo que pide `scraper.py`).
+- `notam_red`: una búsqueda por lote de toda la red sin caché.
+- `notam_playwright`: `faa.buscar_y_descargar_notams` contra la página del
+  portal falso, con el pool de navegadores (páginas reutilizadas entre
+  búsquedas) y la descarga y lectura del Excel. Se omite sin Playwright.
+- `wx_taf` / `wx_metar`: TAF y METAR de toda la red con la caché vacía.
+- `ia`: `consultar_ia` con cobertura entre los modelos falsos.
+- `health_check_<n>`: el health check completo de `core.health_check` (el mismo
+  que corre la página) sobre un itinerario sintético de n tramos con la caché
+  vacía; la latencia es la de cada tramo desde el inicio.
+
+Al final se imprime el desglose de `core.trazas` de todo el recorrido (páginas
+de la FAA, peticiones de WX, intentos por modelo, lectura de NOTAMs...).
+
+Uso: python benchmarks/suite.py [--tramos 10,50,100,500] [--repeticiones N]
+     [--latencia-ia S] [--fallos-ia P] [--latencia-faa S] [--latencia-wx S] [--sin-lote]
+     [--busquedas-navegador N]
+"""
+import argparse
+import importlib.util
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+# La caché se elige al importar `core.cache`: una temporal para no tocar la real
+_DIRECTORIO_TEMPORAL = tempfile.mkdtemp(prefix="flexwatch-bench-")
+os.environ["FLEXWATCH_CACHE"] = os.path.join(_DIRECTORIO_TEMPORAL, "cache.sqlite3")
+
+import numpy as np  # noqa: E402
+
+import faa_falso  # noqa: E402
+import ia_falsa  # noqa: E402
+import wx_falso  # noqa: E402
+
+
+def _configurar_servicios(args):
+    """Arranca los servidores falsos y apunta la app a ellos; devuelve los servidores."""
+    faa_servidor, faa_url = faa_falso.iniciar_servidor(latencia=args.latencia_faa, clonar=True)
+    wx_servidor, wx_url = wx_falso.iniciar_servidor(latencia=args.latencia_wx)
+    os.environ.update({"FLEXWATCH_FUENTE_NOTAM": "http", "FLEXWATCH_FAA_URL": faa_url, "FLEXWATCH_WX_URL": wx_url})
+    ia = ia_falsa.instalar(latencia=args.latencia_ia, tasa_fallos=args.fallos_ia, semilla=args.semilla)
+    return faa_servidor, wx_servidor, ia
+
+
+class Etapa:
+    """Latencias y fallos de una etapa del benchmark."""
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.latencias = []
+        self.fallos = 0
+        self.segundos = 0.0
+
+    def medir(self, fn, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            self.fallos += 1
+            return None
+        finally:
+            self.latencias.append(time.perf_counter() - inicio)
+
+    def fila(self):
+        p50, p95 = np.percentile(self.latencias, [50, 95]) * 1000 if self.latencias else (0.0, 0.0)
+        por_segundo = len(self.latencias) / self.segundos if self.segundos else 0.0
+        return f"{self.nombre:<22}{len(self.latencias):>6}{self.fallos:>8}{p50:>12.1f}{p95:>12.1f}{self.segundos:>10.2f}{por_segundo:>10.1f}"
+
+
+def _en_paralelo(etapa, fn, argumentos, hilos):
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+        resultados = list(ejecutor.map(lambda argumento: etapa.medir(fn, argumento), argumentos))
+    etapa.segundos += time.perf_counter() - inicio
+    return resultados
+
+
+def descarga_navegador(icao, download_dir):
+    """Una búsqueda por el flujo de Playwright: página del pool, Excel descargado y leído."""
+    from core import faa
+
+    ruta = faa.buscar_y_descargar_notams([icao], download_dir)
+    try:
+        return faa.leer_excel_notams(ruta)
+    finally:
+        os.remove(ruta)
+
+
+def itinerario_sintetico(tramos, aeropuertos, semilla=0):
+    """
+    Tramos al azar sobre la red, con más peso para los primeros aeropuertos (hubs).
+
+    Devuelve el itinerario como lo deja `core.itinerario.preparar_itinerario`
+    (los códigos de la red ya son ICAO, así que se repiten en las columnas IATA).
+    """
+    import pandas as pd
+
+    azar = random.Random(semilla)
+    pesos = [len(aeropuertos) - i for i in range(len(aeropuertos))]
+    inicio = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    filas = []
+    for i in range(tramos):
+        origen = azar.choices(aeropuertos, pesos)[0]
+        destino = azar.choice([a for a in aeropuertos if a != origen])
+        std = inicio + timedelta(minutes=15 * azar.randrange(96))
+        sta = std + timedelta(minutes=azar.randrange(60, 420))
+        filas.append({
+            "Flight": f"FW{100 + i}", "From": origen, "To": destino, "Reg.": f"N{700 + i % 40}FW",
+            "STD": f"{std:%Y-%m-%d %H:%M}", "STA": f"{sta:%Y-%m-%d %H:%M}", "STD_UTC": std, "STA_UTC": sta,
+            "From_IATA": origen, "To_IATA": destino, "From_ICAO": origen, "To_ICAO": destino,
+        })
+    return pd.DataFrame(filas)
+
+
+def health_check(df_itinerario, indice, lote=True):
+    """
+    El health check de la página (`core.health_check`) sin Streamlit.
+
+    Devuelve `({índice: segundos hasta su análisis}, fallidos)`.
+    """
+    from core import health_check as servicio
+    from core import llm_cache
+
+    inicio = time.perf_counter()
+    pistas = servicio.pistas_del_itinerario(df_itinerario, indice)
+    tiempos, fallidos = {}, 0
+    for grupo, resultados in servicio.ejecutar_health_check(df_itinerario, pistas, en_lote=lote):
+        transcurrido = time.perf_counter() - inicio
+        for i in grupo:
+            tiempos[i] = transcurrido
+            fallidos += not llm_cache.es_respuesta_valida(resultados.get(i))
+    return tiempos, fallidos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tramos", default="10,50,100,500", help="Tamaños de itinerario, separados por coma.")
+    parser.add_argument("--repeticiones", type=int, default=5, help="Repeticiones de las etapas de red.")
+    parser.add_argument("--consultas-ia", type=int, default=50)
+    parser.add_argument("--latencia-ia", type=float, default=0.5, help="Mediana de latencia de la IA falsa (s).")
+    parser.add_argument("--fallos-ia", type=float, default=0.05, help="Probabilidad de fallo de cada llamada a la IA.")
+    parser.add_argument("--latencia-faa", type=float, default=0.2, help="Latencia del portal FAA falso (s).")
+    parser.add_argument("--latencia-wx", type=float, default=0.1, help="Latencia de la API meteorológica falsa (s).")
+    parser.add_argument("--sin-lote", action="store_true", help="Un análisis de IA por vuelo en el health check.")
+    parser.add_argument("--busquedas-navegador", type=int, default=10, help="Aeropuertos buscados con Playwright.")
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    try:
+        faa_servidor, wx_servidor, ia = _configurar_servicios(args)
+        # Después de configurar los servicios: `core.weather` lee su URL al importarse
+        from core import browser_pool, faa, red, runways, trazas, weather
+        from core.cache import obtener_cache
+        from core.llm import consultar_ia, es_respuesta_fallida
+
+        cache = obtener_cache()
+        red_aeropuertos = red.aeropuertos_red()
+        indice = runways.obtener_indice()
+        etapas = []
+
+        etapa = Etapa("notam_aeropuerto")
+        _en_paralelo(etapa, lambda icao: faa.buscar_notams_por_lote([icao], usar_cache=False), red_aeropuertos, 4)
+        etapas.append(etapa)
+
+        etapa = Etapa("notam_red")
+        inicio = time.perf_counter()
+        for _ in range(args.repeticiones):
+            etapa.medir(faa.buscar_notams_por_lote, red_aeropuertos, usar_cache=False)
+        etapa.segundos = time.perf_counter() - inicio
+        etapas.append(etapa)
+
+        if importlib.util.find_spec("playwright") is None:
+            print("INFO: Playwright no está instalado; se omite la etapa notam_playwright.")
+        elif args.busquedas_navegador > 0:
+            etapa = Etapa("notam_playwright")
+            descargas = os.path.join(_DIRECTORIO_TEMPORAL, "descargas")
+            _en_paralelo(
+                etapa, lambda icao: descarga_navegador(icao, descargas),
+                red_aeropuertos[:args.busquedas_navegador], browser_pool.TAMANO_POOL,
+            )
+            etapas.append(etapa)
+
+        for nombre, tipo, obtener in (("wx_taf", "taf", weather.obtener_tafs), ("wx_metar", "metar_6h", weather.obtener_metars)):
+            etapa = Etapa(nombre)
+            for _ in range(args.repeticiones):
+                cache.limpiar(tipo)
+                inicio = time.perf_counter()
+                etapa.medir(obtener, red_aeropuertos)
+                etapa.segundos += time.perf_counter() - inicio
+            etapas.append(etapa)
+
+        etapa = Etapa("ia")
+        respuestas = _en_paralelo(etapa, lambda i: consultar_ia(f"Consulta de prueba {i}"), range(args.consultas_ia), 16)
+        etapa.fallos += sum(1 for r in respuestas if es_respuesta_fallida(r))
+        etapas.append(etapa)
+
+        for tramos in (int(t) for t in args.tramos.split(",") if t.strip()):
+            cache.limpiar()
+            etapa = Etapa(f"health_check_{tramos}")
+            inicio = time.perf_counter()
+            tiempos, etapa.fallos = health_check(itinerario_sintetico(tramos, red_aeropuertos, args.semilla), indice, not args.sin_lote)
+            etapa.segundos = time.perf_counter() - inicio
+            etapa.latencias = list(tiempos.values())
+            etapas.append(etapa)
+
+        print(f"{'etapa':<22}{'n':>6}{'fallos':>8}{'p50 ms':>12}{'p95 ms':>12}{'total s':>10}{'por s':>10}")
+        for etapa in etapas:
+            print(etapa.fila())
+        print(f"\n{'tramo (core.trazas)':<22}{'n':>6}{'fallos':>8}{'p50 ms':>12}{'p95 ms':>12}{'total s':>10}")
+        for r in trazas.resumen_por_etapa():
+            print(f"{r['etapa']:<22}{r['tramos']:>6}{r['fallos']:>8}{r['p50_ms']:>12.1f}{r['p95_ms']:>12.1f}{r['total_s']:>10.2f}")
+        print(
+            f"\nFAA falsa: {faa_servidor.busquedas} búsquedas, {faa_servidor.exportes} exports · API WX falsa: {wx_servidor.peticiones} peticiones · "
+            f"IA falsa: {ia.llamadas} llamadas ({ia.fallos} fallos simulados)"
+        )
+        faa_servidor.shutdown()
+        wx_servidor.shutdown()
+    finally:
+        shutil.rmtree(_DIRECTORIO_TEMPORAL, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Servidor local que imita la API de datos de aviationweather.gov.
+
+Responde `GET .../taf` y `GET .../metar` con `ids` separados por coma y
+`format=json`, como la API real (`icaoId`, `rawTAF`, `validTimeTo`, `rawOb`,
+`obsTime`), con un TAF y METARs horarios enlatados por estación. Las
+condiciones de cada estación son estables (dependen solo de su código) y
+algunas estaciones traen un TEMPO con techo bajo para ejercitar los análisis.
+
+Uso: python benchmarks/wx_falso.py [--puerto N] [--latencia S]
+y luego FLEXWATCH_WX_URL=<url impresa>.
+"""
+import argparse
+import json
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Condiciones enlatadas: (viento, visibilidad, nubes, TEMPO o None)
+CONDICIONES = [
+    ("09008KT", "9999", "SCT025", None),
+    ("18012G22KT", "9999", "BKN030", "TEMPO {desde}/{hasta} 4000 SHRA BKN012"),
+    ("VRB03KT", "6000", "FEW015", "TEMPO {desde}/{hasta} 1500 BR OVC004"),
+    ("27015KT", "9999", "SCT040", None),
+]
+
+
+def _condiciones(estacion):
+    return CONDICIONES[zlib.crc32(estacion.encode()) % len(CONDICIONES)]
+
+
+def taf_enlatado(estacion, ahora=None):
+    """Registro de TAF de la API para `estacion`, emitido en el último ciclo de 6 h."""
+    ahora = ahora or datetime.now(timezone.utc)
+    emision = ahora.replace(hour=ahora.hour // 6 * 6, minute=0, second=0, microsecond=0)
+    fin = emision + timedelta(hours=30)
+    viento, visibilidad, nubes, tempo = _condiciones(estacion)
+    validez = f"{emision:%d%H}/{fin:%d%H}"
+    raw = f"TAF {estacion} {emision - timedelta(minutes=20):%d%H%M}Z {validez} {viento} {visibilidad} {nubes}"
+    if tempo:
+        raw += " " + tempo.format(desde=f"{emision + timedelta(hours=6):%d%H}", hasta=f"{emision + timedelta(hours=10):%d%H}")
+    return {"icaoId": estacion, "rawTAF": raw, "validTimeTo": int(fin.timestamp())}
+
+
+def metars_enlatados(estacion, horas, ahora=None):
+    """Registros de METAR de la API para `estacion`: uno por hora, del más reciente al más antiguo."""
+    ahora = ahora or datetime.now(timezone.utc)
+    ultima = ahora.replace(minute=0, second=0, microsecond=0)
+    viento, visibilidad, nubes, _ = _condiciones(estacion)
+    registros = []
+    for hora in range(max(1, int(horas))):
+        observacion = ultima - timedelta(hours=hora)
+        raw = f"METAR {estacion} {observacion:%d%H%M}Z {viento} {visibilidad} {nubes} {24 - hora % 3:02d}/18 Q1013"
+        registros.append({"icaoId": estacion, "rawOb": raw, "obsTime": int(observacion.timestamp())})
+    return registros
+
+
+class ManejadorWX(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _responder(self, estado, cuerpo):
+        datos = json.dumps(cuerpo).encode("utf-8")
+        self.send_response(estado)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        campos = parse_qs(url.query)
+        estaciones = [e.strip().upper() for e in campos.get("ids", [""])[0].split(",") if e.strip()]
+        if self.server.latencia:
+            time.sleep(self.server.latencia)
+        self.server.peticiones += 1
+        if url.path.rstrip("/").endswith("/taf"):
+            self._responder(200, [taf_enlatado(e) for e in estaciones])
+        elif url.path.rstrip("/").endswith("/metar"):
+            horas = campos.get("hours", ["2"])[0]
+            self._responder(200, [r for e in estaciones for r in metars_enlatados(e, float(horas))])
+        else:
+            self._responder(404, {"error": "not found"})
+
+    def log_message(self, formato, *args):
+        pass
+
+
+class ServidorWXFalso(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, direccion, latencia=0.0):
+        super().__init__(direccion, ManejadorWX)
+        self.latencia = latencia
+        self.peticiones = 0
+
+
+def iniciar_servidor(puerto=0, **opciones):
+    """Arranca el servidor en un hilo y devuelve `(servidor, url_base)`; se detiene con `servidor.shutdown()`."""
+    servidor = ServidorWXFalso(("127.0.0.1", puerto), **opciones)
+    threading.Thread(target=servidor.serve_forever, name="wx-falso", daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_address[1]}/api/data"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--puerto", type=int, default=8767)
+    parser.add_argument("--latencia", type=float, default=0.0, help="Segundos de espera por respuesta.")
+    args = parser.parse_args()
+    servidor, url = iniciar_servidor(args.puerto, latencia=args.latencia)
+    print(f"INFO: API meteorológica falsa en {url}")
+    print(f"INFO: Usar con FLEXWATCH_WX_URL={url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+"""
+Núcleo de Flex Watch sin dependencias de interfaz.
+
+Los módulos de este paquete no importan Streamlit: las páginas y `scraper.py`
+los usan como capa común para FAA, meteorología, pistas e IA.
+"""
@@ -0,0 +1,161 @@
+"""
+Análisis de IA de TAF, METAR y NOTAMs, sin dependencias de la interfaz.
+
+Los prompts viven aquí para que las páginas de Streamlit, `scraper.py` y el
+precalentador (`core.precarga`) produzcan exactamente las mismas respuestas y
+compartan sus entradas en la caché de IA. Con `en_vivo=True` la respuesta de
+la IA se devuelve en streaming (un generador de fragmentos de texto); los
+aciertos de caché y los resúmenes locales siguen siendo texto o un único
+fragmento.
+
+Los NOTAMs se registran en `core.notam_store`: si la descarga cambió poco
+respecto de la anterior y esta ya tenía análisis, la IA recibe solo el delta
+(nuevos, modificados y cancelados) junto con ese análisis previo.
+"""
+from core import llm_cache, notam_parser, notam_rules, notam_store, wx_decoder
+from core.cache import expiracion
+from core.llm import consultar_ia, transmitir_ia
+
+TTL_ANALISIS_WX = 3600
+TTL_ANALISIS_NOTAM = 1800
+MAX_CAMBIOS_DELTA = 20
+MAX_CARACTERES_CANCELADO = 160
+
+
+def _consultar(tipo, estacion, clave, prompt, en_vivo, ttl=None, expira=None):
+    if en_vivo:
+        return llm_cache.transmitir_con_cache(tipo, estacion, clave, lambda: transmitir_ia(prompt), ttl=ttl, expira=expira)
+    return llm_cache.consultar_con_cache(tipo, estacion, clave, lambda: consultar_ia(prompt), ttl=ttl, expira=expira)
+
+
+def _al_completar(respuesta, guardar):
+    """Llama a `guardar(texto)` cuando la respuesta (texto o streaming) termina y es válida."""
+    if isinstance(respuesta, str):
+        if llm_cache.es_respuesta_valida(respuesta):
+            guardar(respuesta)
+        return respuesta
+
+    def _flujo():
+        partes = []
+        for texto in respuesta:
+            partes.append(texto)
+            yield texto
+        completa = "".join(partes)
+        if llm_cache.es_respuesta_valida(completa):
+            guardar(completa)
+    return _flujo()
+
+
+def analizar_taf(raw_taf, estacion, en_vivo=False):
+    """Resumen de IA del TAF; se reutiliza entre procesos hasta que el TAF deja de ser válido."""
+    prompt = f"Eres un meteorólogo experto. Traduce el siguiente TAF para la estación {estacion} a un resumen claro y conciso en español, explicando viento, visibilidad, nubes y cualquier cambio (TEMPO, BECMG, FM) de forma práctica sin omitir datos tecnicos. Al final entrega Notas al Piloto y despachador especificando hora de las condiciones mas adversas. (alerta si esta por debajominimos meteorologicos: 500 pies de techo)"
+    full_prompt = f"{prompt}\n\nTAF CRUDO:\n{raw_taf}"
+    valido_hasta = wx_decoder.decodificar_taf(raw_taf)["valido_hasta"]
+    fin_validez = valido_hasta.timestamp() if valido_hasta else None
+    return _consultar(
+        "taf_ia", estacion, llm_cache.clave_taf(raw_taf), full_prompt, en_vivo,
+        expira=expiracion(TTL_ANALISIS_WX, fin_validez),
+    )
+
+
+def analizar_metars(metars, estacion, en_vivo=False):
+    """Tendencia de IA de una secuencia de METARs (del más reciente al más antiguo)."""
+    metar_history = "\n".join(metars)
+    prompt = f"""
+    Eres un meteorólogo experto. A continuación, te proporciono una secuencia cronológica de los METARs más recientes para la estación {estacion}.
+    Tu tarea es analizar estos reportes y determinar la **tendencia** del clima.
+
+    HISTORIAL DE METARs (del más reciente al más antiguo):
+    {metar_history}
+
+    1.  **Tendencia:** Por favor, responde con un resumen breve (una o dos frases) en español, (deben aparecer los datos tecnicos), indicando si las condiciones están **mejorando, empeorando o manteniéndose estables**.
+        Enfócate en cambios de visibilidad, techo de nubes (BKN/OVC) y fenómenos significativos. CUANDO ESTEN MEJORANDO PON UNA FLECHA HACIA ARRIBA (⬆️), SI ESTAN EMPEORANDO PON UNA FLECHA HACIA ABAJO (⬇️) Y SI SE MANTIENEN ESTABLES PON UN SIMBOLO DE IGUAL (=).
+        BRINDA UN PRONOSTICO MUY BREVE DE LO QUE SE ESPERA EN LA PROXIMA HORA.
+    2.  **METAR Vigente:** Indica la información técnica del METAR más reciente (el primero de la lista), incluyendo viento, visibilidad, nubes y cualquier fenómeno significativo.
+    """
+    return _consultar("metar_ia", estacion, llm_cache.clave_metars(metars), prompt, en_vivo, ttl=TTL_ANALISIS_WX)
+
+
+def analizar_notams(df, aeropuerto, pistas, en_vivo=False, evaluacion=None):
+    """
+    Resumen de los NOTAMs de un aeropuerto (DataFrame del export de la FAA).
+
+    Sin NOTAMs críticos se devuelve el resumen de las reglas locales y no se
+    consulta la IA; a la IA solo llegan los NOTAMs que pueden cambiar una
+    decisión de despacho, y solo el delta si la descarga anterior ya tenía
+    análisis y cambiaron como mucho `MAX_CAMBIOS_DELTA` NOTAMs. Quien ya
+    clasificó los NOTAMs puede pasar su `evaluacion` para no repetirla.
+    """
+    almacen = notam_store.obtener_almacen()
+    cambios = almacen.registrar(aeropuerto, df)
+    if df.empty:
+        return f"✅ No se encontraron NOTAMs activos para **{aeropuerto}**."
+    evaluacion = evaluacion or notam_rules.evaluar_aeropuerto(notam_parser.parsear_notams(df), aeropuerto, pistas)
+    if not evaluacion.requiere_ia:
+        return notam_rules.resumen_local(evaluacion)
+
+    estado_pistas = notam_rules.texto_estado_pistas(evaluacion)
+    previo = None
+    if cambios is not None and cambios.hay_cambios and cambios.total <= MAX_CAMBIOS_DELTA:
+        previo = almacen.analisis_previo(aeropuerto, pistas)
+    if previo:
+        prompt = _prompt_delta_notams(aeropuerto, evaluacion, cambios, previo, estado_pistas)
+    else:
+        prompt = _prompt_notams(aeropuerto, evaluacion, estado_pistas)
+    # Clave por contenido (IDs y texto de los NOTAMs, pistas): el mismo conjunto no vuelve
+    # a la IA aunque cambie la metadata del Excel, hasta que cambie su vigencia
+    cambio = notam_parser.proximo_cambio(evaluacion.tabla)
+    respuesta = _consultar(
+        "notam_ia", aeropuerto, llm_cache.clave_notams(df, pistas), prompt, en_vivo,
+        expira=expiracion(TTL_ANALISIS_NOTAM, None if cambio is None else cambio.timestamp()),
+    )
+    return _al_completar(respuesta, lambda texto: almacen.guardar_analisis(aeropuerto, df, texto, pistas))
+
+
+def _prompt_notams(aeropuerto, evaluacion, estado_pistas):
+    datos_texto = notam_parser.compactar_para_prompt(evaluacion.tabla)
+    return f"""
+    Eres un asistente experto en operaciones aéreas. Analiza los siguientes NOTAMs para el aeropuerto {aeropuerto}.
+
+    **Infraestructura de Pistas Disponibles:**
+    {estado_pistas}
+
+    **NOTAMs críticos y relevantes (pre-clasificados localmente, próximas 48 h):**
+    {datos_texto}
+
+    **Tu Tarea:**
+    1. Clasifica los NOTAMs por tipo (CIERRES DE PISTA, OBSTÁCULOS, RODAJE, etc.).
+    2. Al analizar un cierre de pista, compáralo con la lista de pistas disponibles y especifica en tu resumen qué pistas quedan operativas.
+    3. Genera un resumen final destacando solo los puntos más críticos que afecten la operación.
+    4. Presenta el resultado en Markdown.
+    """
+
+
+def _prompt_delta_notams(aeropuerto, evaluacion, cambios, previo, estado_pistas):
+    """Prompt con el análisis anterior y solo los NOTAMs que cambiaron desde entonces."""
+    tabla = evaluacion.tabla
+    cambiados = tabla[tabla["notam_id"].isin(set(cambios.nuevos) | set(cambios.modificados))]
+    datos_texto = notam_parser.compactar_para_prompt(cambiados) if len(cambiados) else "- Ninguno."
+    cancelados = "\n".join(
+        f"- {notam_id}: {texto[:MAX_CARACTERES_CANCELADO]}" for notam_id, texto in sorted(cambios.cancelados.items())
+    ) or "- Ninguno."
+    return f"""
+    Eres un asistente experto en operaciones aéreas. Actualiza el análisis de NOTAMs del aeropuerto {aeropuerto} con los cambios desde la descarga anterior.
+
+    **Infraestructura de Pistas Disponibles:**
+    {estado_pistas}
+
+    **Análisis anterior:**
+    {previo}
+
+    **NOTAMs nuevos o modificados ({len(cambios.nuevos)} nuevos, {len(cambios.modificados)} modificados; próximas 48 h):**
+    {datos_texto}
+
+    **NOTAMs cancelados (ya no figuran en la FAA):**
+    {cancelados}
+
+    **Tu Tarea:**
+    1. Integra los NOTAMs nuevos y modificados en el análisis y elimina lo que dependía de los cancelados.
+    2. Al analizar un cierre de pista, compáralo con la lista de pistas disponibles y especifica qué pistas quedan operativas.
+    3. Devuelve el análisis completo actualizado (no solo los cambios), destacando los puntos más críticos, en Markdown.
+    """
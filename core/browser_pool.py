@@ -0,0 +1,180 @@
+"""
+Pool persistente de navegadores Playwright.
+
+Lanzar Firefox y pasar el disclaimer de la FAA cuesta decenas de segundos, así
+que el pool mantiene navegadores vivos entre llamadas (y entre sesiones de
+Streamlit, porque vive a nivel de módulo) y presta sus páginas ya preparadas.
+
+La API síncrona de Playwright solo puede usarse desde el hilo que la creó, por
+eso cada navegador vive en su propio hilo trabajador y las tareas se le envían
+por una cola. El número de trabajadores es el límite de concurrencia.
+"""
+import atexit
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+from core.trazas import tramo
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:125.0) Gecko/20100101 Firefox/125.0"
+
+TAMANO_POOL = int(os.environ.get("FLEXWATCH_NAVEGADORES", "2"))
+MAX_USOS_POR_PAGINA = int(os.environ.get("FLEXWATCH_MAX_USOS_PAGINA", "25"))
+
+_FIN = object()
+
+
+class _Trabajador(threading.Thread):
+    """Hilo dueño de un navegador, un contexto y una página."""
+
+    def __init__(self, pool, numero):
+        super().__init__(name=f"flexwatch-navegador-{numero}", daemon=True)
+        self.pool = pool
+        self.playwright = None
+        self.browser = None
+        self.context = None
+        self.page = None
+        self.usos = 0
+
+    # --- Ciclo de vida del navegador ---
+    def _pagina_sana(self):
+        try:
+            return (self.browser is not None and self.browser.is_connected()
+                    and self.page is not None and not self.page.is_closed())
+        except Exception:
+            return False
+
+    def _cerrar_contexto(self):
+        try:
+            if self.context is not None:
+                self.context.close()
+        except Exception:
+            pass
+        self.context = None
+        self.page = None
+        self.usos = 0
+
+    def _cerrar_todo(self):
+        self._cerrar_contexto()
+        for recurso, metodo in ((self.browser, "close"), (self.playwright, "stop")):
+            try:
+                if recurso is not None:
+                    getattr(recurso, metodo)()
+            except Exception:
+                pass
+        self.browser = None
+        self.playwright = None
+
+    def _preparar(self):
+        """Deja lista una página nueva, relanzando el navegador si hace falta."""
+        if self.browser is None or not self.browser.is_connected():
+            self._cerrar_todo()
+            from playwright.sync_api import sync_playwright
+            with tramo("navegador.arranque"):
+                self.playwright = sync_playwright().start()
+                self.browser = self.playwright.firefox.launch(headless=True)
+        self._cerrar_contexto()
+        with tramo("navegador.pagina"):
+            self.context = self.browser.new_context(
+                user_agent=USER_AGENT,
+                viewport={"width": 1920, "height": 1080},
+                accept_downloads=True,
+            )
+            self.page = self.context.new_page()
+            if self.pool.preparar_pagina is not None:
+                self.pool.preparar_pagina(self.page)
+
+    # --- Bucle principal ---
+    def run(self):
+        while True:
+            trabajo = self.pool._cola.get()
+            if trabajo is _FIN:
+                self._cerrar_todo()
+                return
+            tarea, futuro = trabajo
+            if not futuro.set_running_or_notify_cancel():
+                continue
+            try:
+                if not self._pagina_sana():
+                    self._preparar()
+                resultado = tarea(self.page)
+            except BaseException as e:
+                # Ante cualquier error se recicla la página para el siguiente préstamo
+                print(f"INFO: Reciclando navegador tras error: {e}")
+                self._cerrar_contexto()
+                futuro.set_exception(e)
+                continue
+            self.usos += 1
+            if self.usos >= self.pool.max_usos:
+                self._cerrar_contexto()
+            futuro.set_result(resultado)
+
+
+class PoolNavegadores:
+    """
+    Presta páginas de Firefox ya preparadas a tareas `tarea(page)`.
+
+    `preparar_pagina(page)` se ejecuta cada vez que se crea una página nueva
+    (por ejemplo, para navegar al portal y aceptar el disclaimer). Las páginas
+    se reciclan tras `max_usos` préstamos o cuando una tarea falla.
+    """
+
+    def __init__(self, tamano=TAMANO_POOL, max_usos=MAX_USOS_POR_PAGINA, preparar_pagina=None):
+        self.tamano = max(1, tamano)
+        self.max_usos = max(1, max_usos)
+        self.preparar_pagina = preparar_pagina
+        self._cola = queue.Queue()
+        self._trabajadores = []
+        self._lock = threading.Lock()
+        self._cerrado = False
+
+    def _arrancar(self):
+        with self._lock:
+            if self._cerrado:
+                raise RuntimeError("El pool de navegadores ya fue cerrado.")
+            while len(self._trabajadores) < self.tamano:
+                trabajador = _Trabajador(self, len(self._trabajadores) + 1)
+                trabajador.start()
+                self._trabajadores.append(trabajador)
+
+    def enviar(self, tarea):
+        """Encola `tarea(page)` y devuelve un `Future` con su resultado."""
+        self._arrancar()
+        futuro = Future()
+        self._cola.put((tarea, futuro))
+        return futuro
+
+    def ejecutar(self, tarea, timeout=None):
+        """Ejecuta `tarea(page)` en una página prestada y espera su resultado."""
+        return self.enviar(tarea).result(timeout=timeout)
+
+    def cerrar(self):
+        with self._lock:
+            if self._cerrado:
+                return
+            self._cerrado = True
+            for _ in self._trabajadores:
+                self._cola.put(_FIN)
+        for trabajador in self._trabajadores:
+            trabajador.join(timeout=10)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def obtener_pool(nombre, preparar_pagina=None, tamano=TAMANO_POOL):
+    """Devuelve el pool compartido `nombre`, creándolo en el primer uso."""
+    with _pools_lock:
+        pool = _pools.get(nombre)
+        if pool is None:
+            pool = PoolNavegadores(tamano=tamano, preparar_pagina=preparar_pagina)
+            _pools[nombre] = pool
+        return pool
+
+
+@atexit.register
+def _cerrar_pools():
+    for pool in list(_pools.values()):
+        pool.cerrar()
@@ -0,0 +1,237 @@
+"""
+Caché persistente compartida entre procesos (SQLite).
+
+Guarda NOTAMs, TAF/METAR y respuestas de la IA con la clave
+`tipo:estación:hash del contenido`, de modo que otra réplica de Streamlit o
+`scraper.py` reutilizan lo que ya consultó cualquier proceso. Cada entrada
+expira según la validez del dato que guarda; cuando el archivo supera el
+tamaño máximo se descartan primero las entradas usadas hace más tiempo (LRU).
+Los aciertos y fallos se cuentan por tipo.
+"""
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+RUTA_CACHE = os.environ.get("FLEXWATCH_CACHE", os.path.join("cache", "flexwatch.sqlite3"))
+MAX_BYTES_CACHE = int(os.environ.get("FLEXWATCH_CACHE_MAX_MB", "256")) * 1024 * 1024
+TTL_MINIMO_SEGUNDOS = 60
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS entradas (
+    clave TEXT PRIMARY KEY,
+    tipo TEXT NOT NULL,
+    estacion TEXT,
+    valor BLOB NOT NULL,
+    tamano INTEGER NOT NULL,
+    expira REAL NOT NULL,
+    ultimo_uso REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entradas_uso ON entradas (ultimo_uso);
+CREATE INDEX IF NOT EXISTS idx_entradas_expira ON entradas (expira);
+CREATE TABLE IF NOT EXISTS contadores (
+    tipo TEXT PRIMARY KEY,
+    aciertos INTEGER NOT NULL DEFAULT 0,
+    fallos INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def hash_contenido(*partes):
+    """Hash estable de las partes (textos, listas, tuplas) que identifican un contenido."""
+    h = hashlib.sha256()
+    for parte in partes:
+        h.update(repr(parte).encode("utf-8"))
+        h.update(b"\x1f")
+    return h.hexdigest()
+
+
+def expiracion(maximo, limite=None):
+    """Epoch de expiración: `maximo` segundos desde ahora sin pasar de `limite` (epoch) ni bajar del mínimo."""
+    ahora = time.time()
+    expira = ahora + maximo
+    if limite is not None:
+        expira = min(expira, limite)
+    return max(expira, ahora + TTL_MINIMO_SEGUNDOS)
+
+
+class CachePersistente:
+    """
+    Caché clave-valor en un archivo SQLite con expiración y desalojo LRU.
+
+    Cada hilo usa su propia conexión; SQLite en modo WAL permite que varios
+    procesos lean y escriban el mismo archivo. Un error de la base de datos
+    nunca interrumpe la consulta: se registra y se trata como un fallo.
+    """
+
+    def __init__(self, ruta=RUTA_CACHE, max_bytes=MAX_BYTES_CACHE):
+        self.ruta = ruta
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+    def _conexion(self):
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            directorio = os.path.dirname(self.ruta)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            conexion = sqlite3.connect(self.ruta, timeout=30, isolation_level=None)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("PRAGMA synchronous=NORMAL")
+            conexion.executescript(_ESQUEMA)
+            self._local.conexion = conexion
+        return conexion
+
+    @staticmethod
+    def clave(tipo, estacion, contenido=None):
+        return f"{tipo}:{estacion or ''}:{contenido or ''}"
+
+    @staticmethod
+    def _contar(conexion, tipo, campo):
+        conexion.execute(
+            f"INSERT INTO contadores (tipo, {campo}) VALUES (?, 1) "
+            f"ON CONFLICT(tipo) DO UPDATE SET {campo} = {campo} + 1",
+            (tipo,),
+        )
+
+    def obtener(self, tipo, estacion, contenido=None):
+        """Devuelve `(encontrado, valor)`; las entradas vencidas cuentan como fallo."""
+        clave = self.clave(tipo, estacion, contenido)
+        ahora = time.time()
+        try:
+            conexion = self._conexion()
+            fila = conexion.execute("SELECT valor, expira FROM entradas WHERE clave = ?", (clave,)).fetchone()
+            if fila is None or fila[1] <= ahora:
+                self._contar(conexion, tipo, "fallos")
+                return False, None
+            conexion.execute("UPDATE entradas SET ultimo_uso = ? WHERE clave = ?", (ahora, clave))
+            self._contar(conexion, tipo, "aciertos")
+            return True, pickle.loads(fila[0])
+        except (sqlite3.Error, pickle.UnpicklingError) as e:
+            print(f"ERROR: Caché no disponible al leer {clave}: {e}")
+            return False, None
+
+    def guardar(self, tipo, estacion, valor, ttl=None, expira=None, contenido=None):
+        """Guarda `valor` hasta `expira` (epoch UTC) o durante `ttl` segundos."""
+        ahora = time.time()
+        expira = ahora + ttl if expira is None else expira
+        if expira <= ahora:
+            return
+        clave = self.clave(tipo, estacion, contenido)
+        datos = pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            conexion = self._conexion()
+            conexion.execute(
+                "INSERT OR REPLACE INTO entradas (clave, tipo, estacion, valor, tamano, expira, ultimo_uso) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (clave, tipo, estacion, sqlite3.Binary(datos), len(datos), expira, ahora),
+            )
+            self._desalojar(conexion, ahora)
+        except sqlite3.Error as e:
+            print(f"ERROR: Caché no disponible al guardar {clave}: {e}")
+
+    @contextmanager
+    def transaccion(self):
+        """
+        Las lecturas y escrituras del bloque, en una sola transacción de escritura.
+
+        `BEGIN IMMEDIATE` toma el bloqueo de escritura del archivo al entrar,
+        así que otro hilo o proceso que abra su propia transacción espera a
+        que termine: un leer-comparar-escribir no pisa lo que otro escribió
+        entre medio. Si la base no está disponible el bloque corre sin
+        transacción, como el resto de la caché.
+        """
+        try:
+            conexion = self._conexion()
+            if conexion.in_transaction:
+                yield
+                return
+            conexion.execute("BEGIN IMMEDIATE")
+        except sqlite3.Error as e:
+            print(f"ERROR: Caché no disponible al abrir una transacción: {e}")
+            yield
+            return
+        try:
+            yield
+        except BaseException:
+            conexion.execute("ROLLBACK")
+            raise
+        try:
+            conexion.execute("COMMIT")
+        except sqlite3.Error as e:
+            print(f"ERROR: Caché no disponible al confirmar una transacción: {e}")
+
+    def _desalojar(self, conexion, ahora):
+        """Borra lo vencido y, si aún se supera `max_bytes`, lo menos usado recientemente."""
+        conexion.execute("DELETE FROM entradas WHERE expira <= ?", (ahora,))
+        exceso = conexion.execute("SELECT COALESCE(SUM(tamano), 0) FROM entradas").fetchone()[0] - self.max_bytes
+        if exceso <= 0:
+            return
+        claves = []
+        for clave, tamano in conexion.execute("SELECT clave, tamano FROM entradas ORDER BY ultimo_uso"):
+            claves.append((clave,))
+            exceso -= tamano
+            if exceso <= 0:
+                break
+        conexion.executemany("DELETE FROM entradas WHERE clave = ?", claves)
+
+    def obtener_o_calcular(self, tipo, estacion, contenido, calcular, ttl=None, expira=None, es_valido=None):
+        """
+        Devuelve el valor guardado o lo calcula con `calcular()` y lo guarda.
+
+        `expira` puede ser una función del valor calculado, para caducar según
+        la validez del propio dato. Si `es_valido(valor)` es falso (p. ej. un
+        error de la IA) el valor se devuelve pero no se guarda.
+        """
+        encontrado, valor = self.obtener(tipo, estacion, contenido)
+        if encontrado:
+            return valor
+        valor = calcular()
+        if es_valido is None or es_valido(valor):
+            self.guardar(tipo, estacion, valor, ttl=ttl, expira=expira(valor) if callable(expira) else expira, contenido=contenido)
+        return valor
+
+    def estadisticas(self):
+        """`{tipo: {aciertos, fallos, tasa_aciertos, entradas, bytes}}` de todos los procesos."""
+        try:
+            conexion = self._conexion()
+            resultado = {
+                tipo: {"aciertos": aciertos, "fallos": fallos, "entradas": 0, "bytes": 0}
+                for tipo, aciertos, fallos in conexion.execute("SELECT tipo, aciertos, fallos FROM contadores")
+            }
+            consulta = "SELECT tipo, COUNT(*), SUM(tamano) FROM entradas WHERE expira > ? GROUP BY tipo"
+            for tipo, entradas, tamano in conexion.execute(consulta, (time.time(),)):
+                datos = resultado.setdefault(tipo, {"aciertos": 0, "fallos": 0})
+                datos.update(entradas=entradas, bytes=tamano)
+        except sqlite3.Error as e:
+            print(f"ERROR: Caché no disponible al leer estadísticas: {e}")
+            return {}
+        for datos in resultado.values():
+            consultas = datos["aciertos"] + datos["fallos"]
+            datos["tasa_aciertos"] = datos["aciertos"] / consultas if consultas else 0.0
+        return resultado
+
+    def limpiar(self, tipo=None):
+        conexion = self._conexion()
+        if tipo is None:
+            conexion.execute("DELETE FROM entradas")
+            conexion.execute("DELETE FROM contadores")
+        else:
+            conexion.execute("DELETE FROM entradas WHERE tipo = ?", (tipo,))
+            conexion.execute("DELETE FROM contadores WHERE tipo = ?", (tipo,))
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def obtener_cache():
+    """Caché persistente compartida por todo el proceso."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CachePersistente()
+        return _cache
@@ -0,0 +1,180 @@
+"""
+Dataset binario precompilado de aeropuertos y pistas.
+
+`compilar` convierte `assets/runways.csv` y la base IATA de `airportsdata` en
+arreglos estructurados de NumPy (`.npy`) ordenados por clave: las pistas
+agrupadas por aeropuerto con sus desplazamientos ICAO→pistas, y la tabla
+IATA→ICAO. `DatasetAeropuertos` los abre con `mmap` bajo demanda, de modo que
+arrancar un proceso no lee el CSV ni carga `airportsdata`, y los workers
+comparten las páginas del archivo a través del sistema operativo.
+
+Para regenerarlo tras actualizar el CSV:
+
+    python -m core.dataset
+"""
+import os
+import sys
+import threading
+
+import numpy as np
+
+RUTA_DATASET = os.path.join("assets", "dataset")
+VERSION_DATASET = 1
+
+PISTAS_DTYPE = np.dtype([
+    ("le_ident", "S8"), ("he_ident", "S8"), ("length_ft", "f4"), ("surface", "i2"), ("closed", "?"),
+])
+AEROPUERTOS_DTYPE = np.dtype([("icao", "S8"), ("inicio", "i4"), ("fin", "i4")])
+IATA_DTYPE = np.dtype([("iata", "S3"), ("icao", "S8")])
+ARCHIVOS = ("pistas", "aeropuertos", "superficies", "iata", "version")
+
+
+def _bytes(serie):
+    return serie.fillna("").str.encode("utf-8").to_numpy()
+
+
+def _guardar(destino, nombre, arreglo):
+    """Escribe `nombre.npy` de forma atómica para no dejar archivos a medias a otros procesos."""
+    ruta = os.path.join(destino, f"{nombre}.npy")
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "wb") as f:
+        np.save(f, arreglo, allow_pickle=False)
+    os.replace(temporal, ruta)
+
+
+def _tabla_iata():
+    """`{IATA: ICAO}` desde `airportsdata`, que solo se necesita al compilar."""
+    import airportsdata
+    return {iata: datos["icao"] for iata, datos in airportsdata.load("IATA").items()}
+
+
+def compilar(ruta_csv=None, destino=RUTA_DATASET, iata_a_icao=None):
+    """Compila el CSV de pistas y la tabla IATA→ICAO en `destino`."""
+    from core.runways import RUTA_PISTAS, leer_csv
+
+    df = leer_csv(ruta_csv or RUTA_PISTAS)
+    df = df[df["airport_ident"].notna()].sort_values("airport_ident", kind="stable").reset_index(drop=True)
+
+    superficies = df["surface"].astype("category")
+    pistas = np.zeros(len(df), dtype=PISTAS_DTYPE)
+    pistas["le_ident"] = _bytes(df["le_ident"])
+    pistas["he_ident"] = _bytes(df["he_ident"])
+    pistas["length_ft"] = df["length_ft"].to_numpy(dtype=np.float32)
+    pistas["surface"] = superficies.cat.codes.to_numpy()
+    pistas["closed"] = df["closed"].fillna(0).to_numpy(dtype=bool)
+
+    # Desplazamientos [inicio, fin) de las pistas de cada aeropuerto, ordenados por ICAO
+    idents = _bytes(df["airport_ident"])
+    claves, inicios = np.unique(idents, return_index=True)
+    aeropuertos = np.zeros(len(claves), dtype=AEROPUERTOS_DTYPE)
+    aeropuertos["icao"] = claves
+    aeropuertos["inicio"] = inicios
+    aeropuertos["fin"] = np.append(inicios[1:], len(df))
+
+    tabla_iata = _tabla_iata() if iata_a_icao is None else iata_a_icao
+    iata = np.array(
+        sorted((k.encode("utf-8"), (v or "").encode("utf-8")) for k, v in tabla_iata.items()),
+        dtype=IATA_DTYPE,
+    )
+
+    os.makedirs(destino, exist_ok=True)
+    _guardar(destino, "pistas", pistas)
+    _guardar(destino, "aeropuertos", aeropuertos)
+    _guardar(destino, "superficies", np.array(superficies.cat.categories.astype(str).tolist(), dtype="U"))
+    _guardar(destino, "iata", iata)
+    # La versión se escribe al final: su presencia indica un dataset completo
+    _guardar(destino, "version", np.array([VERSION_DATASET], dtype=np.int32))
+    return destino
+
+
+def dataset_disponible(ruta=RUTA_DATASET):
+    ruta_version = os.path.join(ruta, "version.npy")
+    if not os.path.exists(ruta_version):
+        return False
+    return int(np.load(ruta_version)[0]) == VERSION_DATASET
+
+
+class DatasetAeropuertos:
+    """Acceso de solo lectura al dataset compilado; cada arreglo se mapea al primer uso."""
+
+    def __init__(self, ruta=RUTA_DATASET):
+        self.ruta = ruta
+        self._arreglos = {}
+        self._lock = threading.Lock()
+
+    def _arreglo(self, nombre):
+        arreglo = self._arreglos.get(nombre)
+        if arreglo is None:
+            with self._lock:
+                arreglo = self._arreglos.get(nombre)
+                if arreglo is None:
+                    ruta = os.path.join(self.ruta, f"{nombre}.npy")
+                    # Las superficies son pocas y de tipo texto: se cargan enteras
+                    arreglo = np.load(ruta, mmap_mode=None if nombre == "superficies" else "r")
+                    self._arreglos[nombre] = arreglo
+        return arreglo
+
+    @staticmethod
+    def _buscar(claves, clave):
+        clave = clave.encode("utf-8")
+        posicion = int(np.searchsorted(claves, clave))
+        return posicion if posicion < len(claves) and claves[posicion] == clave else None
+
+    def filas_pistas(self, icao):
+        """Registros de pistas del aeropuerto (vista sobre el archivo mapeado)."""
+        aeropuertos = self._arreglo("aeropuertos")
+        posicion = self._buscar(aeropuertos["icao"], icao)
+        if posicion is None:
+            return self._arreglo("pistas")[:0]
+        return self._arreglo("pistas")[aeropuertos["inicio"][posicion]:aeropuertos["fin"][posicion]]
+
+    def superficie(self, codigo):
+        return None if codigo < 0 else str(self._arreglo("superficies")[codigo])
+
+    def contiene_aeropuerto(self, icao):
+        return self._buscar(self._arreglo("aeropuertos")["icao"], icao) is not None
+
+    def numero_aeropuertos(self):
+        return len(self._arreglo("aeropuertos"))
+
+    def iata_a_icao(self, iata):
+        """Código ICAO para un código IATA, o None si no está en la base."""
+        tabla = self._arreglo("iata")
+        posicion = self._buscar(tabla["iata"], iata)
+        return None if posicion is None else tabla["icao"][posicion].decode("utf-8")
+
+    def iata_a_icao_lote(self, codigos):
+        """
+        Códigos ICAO para un arreglo de códigos IATA, con una sola búsqueda binaria vectorizada.
+
+        Devuelve un arreglo de texto con `''` donde el código no está en la base.
+        """
+        tabla = self._arreglo("iata")
+        codigos = np.asarray(codigos, dtype="U")
+        # Un código de otra longitud no puede ser IATA (y al pasarlo a S3 se truncaría)
+        validos = np.char.str_len(codigos) == 3
+        claves = np.char.encode(codigos, "utf-8").astype("S3")
+        posiciones = np.minimum(np.searchsorted(tabla["iata"], claves), len(tabla) - 1)
+        encontrados = validos & (tabla["iata"][posiciones] == claves)
+        return np.where(encontrados, tabla["icao"][posiciones].astype("U8"), "")
+
+
+_dataset = None
+_dataset_lock = threading.Lock()
+
+
+def obtener_dataset(ruta=RUTA_DATASET):
+    """Dataset compartido por el proceso; lo compila si todavía no existe."""
+    global _dataset
+    with _dataset_lock:
+        if _dataset is None:
+            if not dataset_disponible(ruta):
+                print(f"INFO: Compilando el dataset de aeropuertos en {ruta}...")
+                compilar(destino=ruta)
+            _dataset = DatasetAeropuertos(ruta)
+        return _dataset
+
+
+if __name__ == "__main__":
+    destino = compilar(destino=sys.argv[1] if len(sys.argv) > 1 else RUTA_DATASET)
+    print(f"Dataset compilado en {destino}")
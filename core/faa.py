@@ -0,0 +1,362 @@
+"""
+Descarga de NOTAMs desde el portal de la FAA (notams.aim.faa.gov).
+
+Las búsquedas se ejecutan sobre páginas prestadas por el pool de navegadores,
+que ya han superado el disclaimer, así que solo la primera descarga de cada
+navegador paga el arranque en frío. Los NOTAMs de cada aeropuerto se guardan
+en la caché persistente, así que un aeropuerto consultado hace poco por otro
+proceso no vuelve a pasar por el portal, y uno que otra sesión está
+descargando en este momento se espera en lugar de buscarse otra vez
+(`core.peticiones_en_curso`). La descarga por lotes pasa por la
+fuente configurada en `core.fuentes_notam` (este flujo de navegador o el
+endpoint JSON del portal).
+"""
+import io
+import os
+import re
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from core import notam_parser, peticiones_en_curso
+from core.browser_pool import obtener_pool
+from core.cache import expiracion, obtener_cache
+from core.trazas import medido, tramo
+
+FAA_NOTAM_URL = "https://notams.aim.faa.gov/notamSearch/"
+BIENVENIDA_LOCATOR = "button:has-text(\"I've read and understood above statements\")"
+INPUT_LOCATOR = "input[name='designatorsForLocation']"
+DOWNLOAD_LOCATOR = "span.icon-excel"
+# Límite de designadores que acepta el buscador en una sola consulta
+MAX_DESIGNADORES_POR_BUSQUEDA = 25
+TTL_NOTAM_SEGUNDOS = 900
+
+COLUMNAS_NOTAM = ["Location", "NOTAM #/LTA #", "Class", "Issue Date (UTC)",
+                  "Effective Date (UTC)", "Expiration Date (UTC)", "Condition"]
+COLUMNAS_FECHA = ["Issue Date (UTC)", "Effective Date (UTC)", "Expiration Date (UTC)"]
+# Marcas de la fecha de expiración (`PERM`, `...EST`) que se pierden al convertirla en fecha
+COLUMNAS_VIGENCIA = ["Expiration PERM", "Expiration EST"]
+# Encabezado del export -> columna normalizada; la condición cambia de título según el tipo de aviso
+_ENCABEZADOS_FAA = {nombre: nombre for nombre in COLUMNAS_NOTAM[:-1]}
+_PREFIJOS_CONDICION = ("NOTAM Condition", "Condition")
+MAX_FILAS_PREAMBULO = 20
+_RE_FECHA_FAA = re.compile(r"(\d{2})/(\d{2})/(\d{4}) (\d{2})(\d{2})")
+
+TABLA_CARGADA_JS = "() => document.querySelectorAll('table.table.table-striped').length > 0 && document.querySelectorAll('table.table.table-striped')[0].rows.length > 1"
+
+
+@medido("faa.bienvenida")
+def manejar_pagina_bienvenida(page, max_retries=5):
+    """Da clic en el disclaimer de la FAA todas las veces que sea necesario."""
+    from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+    for _ in range(max_retries):
+        try:
+            page.wait_for_selector(BIENVENIDA_LOCATOR, timeout=5000)
+            page.click(BIENVENIDA_LOCATOR)
+            time.sleep(2)
+            if "notamSearch" in page.url: break
+        except PlaywrightTimeoutError: break
+        except Exception: break
+
+
+def _cerrar_bienvenida_si_visible(page):
+    """Versión sin espera del disclaimer para páginas que ya lo aceptaron."""
+    try:
+        if page.locator(BIENVENIDA_LOCATOR).is_visible():
+            manejar_pagina_bienvenida(page)
+    except Exception:
+        pass
+
+
+def url_portal():
+    """Buscador de NOTAMs: el de la FAA, u otro servidor con `FLEXWATCH_FAA_URL` (p. ej. `benchmarks/faa_falso.py`)."""
+    return os.environ.get("FLEXWATCH_FAA_URL") or FAA_NOTAM_URL
+
+
+def preparar_pagina_faa(page):
+    """Lleva una página nueva hasta el buscador, pasando el disclaimer."""
+    from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+    page.goto(url_portal(), wait_until="domcontentloaded")
+    manejar_pagina_bienvenida(page)
+    try:
+        page.wait_for_selector(INPUT_LOCATOR, timeout=12000)
+    except PlaywrightTimeoutError:
+        # Si no aparece el input, tal vez el disclaimer sigue, inténtalo otra vez
+        manejar_pagina_bienvenida(page)
+        page.wait_for_selector(INPUT_LOCATOR, timeout=8000)
+    page._flexwatch_busquedas = 0
+
+
+def _volver_al_buscador(page):
+    """Recarga el buscador en una página ya usada para no leer la tabla anterior."""
+    page.goto(url_portal(), wait_until="domcontentloaded")
+    page.wait_for_selector(f"{INPUT_LOCATOR}, {BIENVENIDA_LOCATOR}", timeout=12000)
+    _cerrar_bienvenida_si_visible(page)
+    page.wait_for_selector(INPUT_LOCATOR, timeout=8000)
+
+
+def descargar_excel_en_pagina(page, aeropuertos, download_dir):
+    """Busca los aeropuertos en una página preparada y guarda el Excel resultante."""
+    if getattr(page, "_flexwatch_busquedas", 0) > 0:
+        _volver_al_buscador(page)
+    page._flexwatch_busquedas = getattr(page, "_flexwatch_busquedas", 0) + 1
+
+    page.fill(INPUT_LOCATOR, ", ".join(aeropuertos))
+    page.press(INPUT_LOCATOR, "Enter")
+    _cerrar_bienvenida_si_visible(page)
+    with tramo("faa.tabla", aeropuertos=len(aeropuertos)):
+        page.wait_for_function(TABLA_CARGADA_JS, timeout=30000)
+    with tramo("faa.excel", aeropuertos=len(aeropuertos)):
+        page.click("th:has-text('Location')")
+        time.sleep(1)
+        page.wait_for_selector(DOWNLOAD_LOCATOR, timeout=10000)
+        with page.expect_download() as download_info:
+            page.click(DOWNLOAD_LOCATOR)
+        download = download_info.value
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        copy_path = os.path.join(download_dir, f"NOTAMs_{aeropuertos[0]}_{timestamp}.xls")
+        download.save_as(copy_path)
+    return copy_path
+
+
+def obtener_pool_faa():
+    """Pool compartido de páginas posicionadas en el buscador de la FAA."""
+    return obtener_pool("faa", preparar_pagina=preparar_pagina_faa)
+
+
+@medido("faa.descarga")
+def buscar_y_descargar_notams(aeropuertos, download_dir="descargas_notam", timeout=None):
+    """
+    Descarga el Excel de NOTAMs de la FAA para la lista de aeropuertos.
+
+    Devuelve la ruta al archivo descargado. Los errores de Playwright se
+    propagan para que cada interfaz los presente a su manera.
+    """
+    download_dir = os.path.abspath(download_dir)
+    os.makedirs(download_dir, exist_ok=True)
+    return obtener_pool_faa().ejecutar(
+        lambda page: descargar_excel_en_pagina(page, list(aeropuertos), download_dir),
+        timeout=timeout,
+    )
+
+
+def _columna_normalizada(encabezado):
+    encabezado = str(encabezado).strip()
+    if encabezado.startswith(_PREFIJOS_CONDICION):
+        return "Condition"
+    return _ENCABEZADOS_FAA.get(encabezado)
+
+
+def _buscar_encabezado(filas):
+    """Fila del encabezado y `{columna normalizada: índice}`; valida que estén todas."""
+    for fila, valores in enumerate(filas[:MAX_FILAS_PREAMBULO]):
+        indices = {}
+        for j, valor in enumerate(valores):
+            columna = _columna_normalizada(valor)
+            if columna and columna not in indices:
+                indices[columna] = j
+        if "Location" in indices and "NOTAM #/LTA #" in indices:
+            faltan = [c for c in COLUMNAS_NOTAM if c not in indices]
+            if faltan:
+                raise ValueError(f"El export de la FAA no tiene las columnas esperadas: faltan {', '.join(faltan)}.")
+            return fila, indices
+    raise ValueError("El archivo no parece un export de NOTAMs de la FAA: no se encontró el encabezado.")
+
+
+def _fechas_faa(columnas):
+    """
+    Fechas `MM/DD/YYYY HHMM` de varias columnas a UTC en una sola conversión.
+
+    Devuelve, por columna, `(fechas, permanente, estimada)`; `PERM`, celdas
+    vacías o fechas inválidas quedan como `NaT`.
+    """
+    texto = [str(valor).strip().upper() for valores in columnas for valor in valores]
+    estimado = np.fromiter((t.endswith("EST") for t in texto), dtype=bool, count=len(texto))
+    permanente = np.fromiter((t == "PERM" for t in texto), dtype=bool, count=len(texto))
+    iso = []
+    for t, est in zip(texto, estimado):
+        partes = _RE_FECHA_FAA.fullmatch(t[:-3].rstrip() if est else t)
+        iso.append(f"{partes[3]}-{partes[1]}-{partes[2]}T{partes[4]}:{partes[5]}" if partes else "NaT")
+    try:
+        fechas = pd.DatetimeIndex(np.array(iso, dtype="datetime64[m]")).tz_localize("UTC")
+    except ValueError:
+        # Algún componente fuera de rango (p. ej. mes 13): se descarta solo esa celda
+        fechas = pd.to_datetime(pd.Series(iso, dtype=object), format="%Y-%m-%dT%H:%M", utc=True, errors="coerce")
+        fechas = pd.DatetimeIndex(fechas)
+    resultado, inicio = [], 0
+    for valores in columnas:
+        fin = inicio + len(valores)
+        resultado.append((fechas[inicio:fin], permanente[inicio:fin], estimado[inicio:fin]))
+        inicio = fin
+    return resultado
+
+
+def leer_excel_notams(origen):
+    """
+    Lee el Excel exportado por la FAA (ruta o bytes) en un DataFrame compacto y tipado.
+
+    Lee la primera hoja con python-calamine (un lector nativo, varias veces más
+    rápido que xlrd o `pd.read_excel`; sin él, con xlrd) y valida el
+    encabezado en lugar de asumir su posición.
+    Las columnas son las de `COLUMNAS_NOTAM`; las de `COLUMNAS_FECHA` son
+    fechas UTC (vacías si no hay fecha o es `PERM`), y `COLUMNAS_VIGENCIA`
+    conserva si la expiración era permanente o estimada. `Location` y `Class`
+    son categóricas.
+    """
+    with tramo("faa.leer_excel") as atributos:
+        filas = _filas_excel(origen)
+        fila_encabezado, indices = _buscar_encabezado(filas)
+        datos = filas[fila_encabezado + 1:]
+        df = construir_df_notams({
+            columna: [fila[indices[columna]] if indices[columna] < len(fila) else "" for fila in datos]
+            for columna in COLUMNAS_NOTAM
+        })
+        atributos["filas"] = len(df)
+    return df
+
+
+def _filas_excel(origen):
+    """Filas de la primera hoja como listas de valores; el formato se reconoce por el contenido, no por la extensión."""
+    try:
+        from python_calamine import CalamineWorkbook
+    except ImportError:
+        return _filas_excel_xlrd(origen)
+    if isinstance(origen, (bytes, bytearray)):
+        return CalamineWorkbook.from_filelike(io.BytesIO(bytes(origen))).get_sheet_by_index(0).to_python()
+    with open(origen, "rb") as f:
+        return CalamineWorkbook.from_filelike(f).get_sheet_by_index(0).to_python()
+
+
+def _filas_excel_xlrd(origen):
+    import xlrd
+
+    if isinstance(origen, (bytes, bytearray)):
+        libro = xlrd.open_workbook(file_contents=bytes(origen), on_demand=True)
+    else:
+        libro = xlrd.open_workbook(origen, on_demand=True)
+    try:
+        hoja = libro.sheet_by_index(0)
+        return [hoja.row_values(fila) for fila in range(hoja.nrows)]
+    finally:
+        libro.release_resources()
+
+
+def construir_df_notams(columnas):
+    """
+    DataFrame tipado de NOTAMs a partir de `{columna: valores crudos}` de `COLUMNAS_NOTAM`.
+
+    Es el formato común de todas las fuentes (Excel del portal o JSON de la
+    búsqueda): fechas UTC, marcas de vigencia y columnas categóricas.
+    """
+    # Sin filas totalmente vacías (el export puede traerlas al final)
+    ids = [str(v).strip() for v in columnas["NOTAM #/LTA #"]]
+    condiciones = [str(v) for v in columnas["Condition"]]
+    validas = [i for i, (notam_id, condicion) in enumerate(zip(ids, condiciones)) if notam_id or condicion.strip()]
+    if len(validas) < len(ids):
+        columnas = {c: [valores[i] for i in validas] for c, valores in columnas.items()}
+        ids, condiciones = [ids[i] for i in validas], [condiciones[i] for i in validas]
+
+    fechas = _fechas_faa([columnas[c] for c in COLUMNAS_FECHA])
+    datos = {
+        "Location": pd.Categorical([str(v).strip() for v in columnas["Location"]]),
+        "NOTAM #/LTA #": ids,
+        "Class": pd.Categorical([str(v).strip() for v in columnas["Class"]]),
+    }
+    datos.update((columna, fechas_columna) for columna, (fechas_columna, _, _) in zip(COLUMNAS_FECHA, fechas))
+    datos["Condition"] = condiciones
+    _, datos["Expiration PERM"], datos["Expiration EST"] = fechas[-1]
+    return pd.DataFrame(datos, columns=COLUMNAS_NOTAM + COLUMNAS_VIGENCIA)
+
+
+def codigos_de_ubicacion(icao):
+    """
+    Códigos con los que la FAA puede listar un aeropuerto en la columna Location.
+
+    Los aeropuertos de EE. UU. aparecen con su identificador FAA de tres letras
+    (KMIA -> MIA, PANC -> ANC); el resto aparece con su código ICAO.
+    """
+    icao = icao.strip().upper()
+    codigos = {icao}
+    if len(icao) == 4 and icao[0] in ("K", "P"):
+        codigos.add(icao[1:])
+    return codigos
+
+
+def dividir_por_ubicacion(df, aeropuertos):
+    """Separa un export multi-aeropuerto en un DataFrame por código ICAO."""
+    ubicaciones = df["Location"].astype(str).str.strip().str.upper()
+    return {
+        icao: df[ubicaciones.isin(codigos_de_ubicacion(icao))].reset_index(drop=True)
+        for icao in aeropuertos
+    }
+
+
+def expiracion_notams(df):
+    """
+    Epoch hasta el que se pueden reutilizar los NOTAMs descargados.
+
+    Como máximo `TTL_NOTAM_SEGUNDOS` (pueden publicarse NOTAMs nuevos en
+    cualquier momento) y nunca más allá del próximo NOTAM que entra o sale de
+    vigencia.
+    """
+    cambio = notam_parser.proximo_cambio(notam_parser.parsear_notams(df))
+    return expiracion(TTL_NOTAM_SEGUNDOS, None if cambio is None else cambio.timestamp())
+
+
+def _descargar_por_bloques(aeropuertos, download_dir, max_por_busqueda, fuente):
+    """Un bloque de designadores por consulta a la fuente; guarda cada aeropuerto en la caché."""
+    from core.fuentes_notam import obtener_fuente
+
+    if fuente is None or isinstance(fuente, str):
+        fuente = obtener_fuente(fuente)
+    max_por_busqueda = max_por_busqueda or fuente.max_por_busqueda
+    bloques = [aeropuertos[i:i + max_por_busqueda] for i in range(0, len(aeropuertos), max_por_busqueda)]
+    futuros = [(bloque, fuente.enviar(bloque, download_dir)) for bloque in bloques]
+
+    resultados = {}
+    cache = obtener_cache()
+    for bloque, futuro in futuros:
+        try:
+            df = futuro.result()
+            for icao, df_icao in dividir_por_ubicacion(df, bloque).items():
+                cache.guardar("notam", icao, df_icao, expira=expiracion_notams(df_icao))
+                resultados[icao] = df_icao
+        except Exception as e:
+            print(f"ERROR: Falló la búsqueda de NOTAMs para {', '.join(bloque)}: {e}")
+            resultados.update({icao: None for icao in bloque})
+    return resultados
+
+
+def buscar_notams_por_lote(aeropuertos, download_dir="descargas_notam", max_por_busqueda=None, usar_cache=True, fuente=None):
+    """
+    Descarga los NOTAMs de muchos aeropuertos con una búsqueda por bloque.
+
+    Los aeropuertos vigentes en la caché persistente no se vuelven a buscar y
+    los que otra sesión ya está buscando se esperan. Cada bloque de hasta
+    `max_por_busqueda` designadores es una sola consulta a la `fuente` (nombre
+    o instancia de `core.fuentes_notam`; por defecto la configurada), y los
+    bloques se descargan en paralelo.
+    Devuelve `{icao: DataFrame}`; los aeropuertos cuyo bloque falló quedan con
+    `None`.
+    """
+    aeropuertos = list(dict.fromkeys(a.strip().upper() for a in aeropuertos if a and a.strip()))
+    cache = obtener_cache()
+    resultados = {}
+    if usar_cache:
+        for icao in aeropuertos:
+            encontrado, df = cache.obtener("notam", icao)
+            if encontrado:
+                resultados[icao] = df
+        aeropuertos = [icao for icao in aeropuertos if icao not in resultados]
+    if not aeropuertos:
+        return resultados
+
+    propias, ajenas = peticiones_en_curso.reclamar("notam", aeropuertos)
+    with peticiones_en_curso.liderar("notam", propias) as descargados:
+        if propias:
+            descargados.update(_descargar_por_bloques(list(propias), download_dir, max_por_busqueda, fuente))
+    resultados.update(descargados)
+    resultados.update(peticiones_en_curso.esperar("notam", ajenas))
+    return resultados
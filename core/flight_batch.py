@@ -0,0 +1,192 @@
+"""
+Análisis de varios vuelos en una sola consulta a la IA.
+
+Los vuelos que comparten aeropuertos se agrupan en lotes; el contexto de cada
+aeropuerto (pistas, periodos del TAF y NOTAMs vigentes en las ventanas de
+sus vuelos) se escribe una sola vez en el prompt y la IA devuelve un
+veredicto JSON por vuelo, que luego se reparte a cada fila del itinerario. En un día con hubs que aparecen en muchos tramos
+(KMIA, SKBO) esto evita repetir el mismo contexto en cada consulta. En
+streaming, cada veredicto se entrega en cuanto su objeto JSON se completa
+(`veredictos_en_streaming`).
+"""
+import json
+import re
+from collections import Counter, defaultdict
+
+ESTADOS_VUELO = ("✅ Normal", "⚠️ Monitorear", "❌ En Riesgo")
+MAX_VUELOS_POR_LOTE = 8
+
+_RE_ARREGLO_JSON = re.compile(r"\[.*\]", re.S)
+
+
+def agrupar_vuelos(vuelos, max_por_lote=MAX_VUELOS_POR_LOTE):
+    """
+    Reparte los vuelos en lotes que comparten aeropuertos.
+
+    `vuelos` es `{id: (origen, destino)}`; un aeropuerto `None` (código no
+    encontrado) no une vuelos entre sí. Los vuelos conectados por algún
+    aeropuerto quedan en el mismo grupo, ordenados por su aeropuerto más
+    frecuente, y cada grupo se corta en lotes de hasta `max_por_lote`.
+    Devuelve una lista de listas de ids.
+    """
+    pares = {
+        id_vuelo: tuple(a if a else ("sin_codigo", id_vuelo, lado) for lado, a in enumerate(par))
+        for id_vuelo, par in vuelos.items()
+    }
+    padre = {}
+
+    def raiz(aeropuerto):
+        padre.setdefault(aeropuerto, aeropuerto)
+        while padre[aeropuerto] != aeropuerto:
+            padre[aeropuerto] = padre[padre[aeropuerto]]
+            aeropuerto = padre[aeropuerto]
+        return aeropuerto
+
+    for origen, destino in pares.values():
+        padre[raiz(origen)] = raiz(destino)
+
+    frecuencia = Counter(a for par in pares.values() for a in par)
+
+    def orden(id_vuelo):
+        hub, otro = sorted(pares[id_vuelo], key=lambda a: (-frecuencia[a], str(a)))
+        return -frecuencia[hub], str(hub), str(otro)
+
+    grupos = defaultdict(list)
+    for id_vuelo, (origen, _) in pares.items():
+        grupos[raiz(origen)].append(id_vuelo)
+    lotes = []
+    for ids in grupos.values():
+        ids = sorted(ids, key=orden)
+        lotes.extend(ids[i:i + max_por_lote] for i in range(0, len(ids), max_por_lote))
+    return lotes
+
+
+def prompt_lote(vuelos, aeropuertos):
+    """
+    Prompt con el contexto de cada aeropuerto una sola vez y la lista de vuelos.
+
+    `vuelos` es una lista de dicts con `id`, `vuelo`, `origen`, `destino`,
+    `origen_iata`, `destino_iata`, `matricula`, `std` y `sta`; `aeropuertos`
+    es `{icao: {"pistas": [...], "taf": str, "notams": str}}`.
+    """
+    contexto = []
+    for icao, datos in aeropuertos.items():
+        pistas = ", ".join(datos.get("pistas") or []) or "No disponibles"
+        contexto.append(
+            f"### {icao}\n"
+            f"* Pistas disponibles: [{pistas}]\n"
+            f"* TAF: {datos.get('taf') or 'No disponible'}\n"
+            f"* NOTAMs vigentes en la ventana de sus vuelos:\n{datos.get('notams') or 'No disponibles'}"
+        )
+    lista_vuelos = "\n".join(
+        f"- id \"{v['id']}\": Vuelo {v['vuelo']}, {v['origen']} ({v['origen_iata']}) -> {v['destino']} ({v['destino_iata']}), "
+        f"Matrícula {v['matricula']}, STD {v['std']} UTC, STA {v['sta']} UTC"
+        for v in vuelos
+    )
+    contexto = "\n\n".join(contexto)
+    estados = " | ".join(f'"{estado}"' for estado in ESTADOS_VUELO)
+    return f"""
+Actúa como un despachador de vuelos experto y un meteorólogo. Analiza el 'estado de salud/condiciones' operacional de CADA vuelo de la lista. Todas las horas (STD, STA, TAF, NOTAM) están en UTC.
+
+**Contexto por aeropuerto (se indica una sola vez y aplica a todos los vuelos que lo usan):**
+
+{contexto}
+
+**Vuelos a evaluar:**
+{lista_vuelos}
+
+**Para cada vuelo:**
+1. **Análisis WX:** ¿El TAF del origen o destino muestra condiciones adversas cerca de sus horas de operación?
+2. **Análisis NOTAM y Pistas:** si un NOTAM menciona un cierre de pista, determina el impacto real y menciona qué pistas quedan disponibles.
+3. **Conclusión:** resumen conciso (máximo 3-4 frases) y clasificación.
+
+**Formato de respuesta:** devuelve SOLO un arreglo JSON, sin texto adicional, con un objeto por vuelo:
+[{{"id": "<id>", "estado": {estados}, "analisis_wx": "...", "analisis_notam": "...", "conclusion": "..."}}]
+"""
+
+
+def _estado(valor):
+    texto = str(valor or "").lower()
+    for estado in ESTADOS_VUELO:
+        if estado.split(" ", 1)[1].lower() in texto:
+            return estado
+    return None
+
+
+def formatear_veredicto(veredicto):
+    """Markdown de un veredicto, con el estado al inicio como en el análisis individual."""
+    return (
+        f"{veredicto['estado']}\n\n"
+        f"**Análisis WX:** {veredicto.get('analisis_wx') or 'Sin observaciones.'}\n\n"
+        f"**Análisis NOTAM y Pistas:** {veredicto.get('analisis_notam') or 'Sin observaciones.'}\n\n"
+        f"**Conclusión:** {veredicto.get('conclusion') or ''}"
+    ).strip()
+
+
+def _veredicto(item, ids):
+    """`(id, Markdown)` de un objeto de la respuesta, o `None` si no es de un vuelo pedido o su estado no se reconoce."""
+    if not isinstance(item, dict) or str(item.get("id")) not in ids:
+        return None
+    estado = _estado(item.get("estado"))
+    return (str(item["id"]), formatear_veredicto({**item, "estado": estado})) if estado else None
+
+
+def veredictos_en_streaming(fragmentos, ids):
+    """
+    Genera `(id, análisis en Markdown)` de cada vuelo a medida que su objeto
+    del arreglo JSON termina de llegar en `fragmentos`.
+
+    Al acabar la respuesta se interpreta completa (`interpretar_veredictos`)
+    por si el arreglo no pudo leerse por partes; cada vuelo sale una sola vez.
+    """
+    ids = {str(i) for i in ids}
+    decodificador = json.JSONDecoder()
+    respuesta, posicion, emitidos = "", None, set()
+    for fragmento in fragmentos:
+        respuesta += fragmento
+        if posicion is None:
+            inicio = respuesta.find("[")
+            if inicio < 0:
+                continue
+            posicion = inicio + 1
+        while posicion < len(respuesta) and "}" in fragmento:
+            while posicion < len(respuesta) and respuesta[posicion] in " \t\r\n,":
+                posicion += 1
+            if posicion >= len(respuesta) or respuesta[posicion] != "{":
+                break
+            try:
+                item, posicion = decodificador.raw_decode(respuesta, posicion)
+            except ValueError:
+                # Objeto incompleto: se reintenta con el siguiente fragmento
+                break
+            veredicto = _veredicto(item, ids)
+            if veredicto and veredicto[0] not in emitidos:
+                emitidos.add(veredicto[0])
+                yield veredicto
+    for id_vuelo, analisis in interpretar_veredictos(respuesta, ids).items():
+        if id_vuelo not in emitidos:
+            emitidos.add(id_vuelo)
+            yield id_vuelo, analisis
+
+
+def interpretar_veredictos(respuesta, ids):
+    """
+    Extrae `{id: análisis en Markdown}` de la respuesta JSON de la IA.
+
+    Los vuelos ausentes, con estado no reconocido o con una respuesta que no es
+    JSON válido quedan fuera, para que se analicen de forma individual.
+    """
+    coincidencia = _RE_ARREGLO_JSON.search(respuesta or "")
+    if not coincidencia:
+        return {}
+    try:
+        datos = json.loads(coincidencia.group(0))
+    except ValueError:
+        return {}
+    ids = {str(i) for i in ids}
+    veredictos = {}
+    for item in datos if isinstance(datos, list) else []:
+        veredicto = _veredicto(item, ids)
+        if veredicto:
+            veredictos[veredicto[0]] = veredicto[1]
+    return veredictos
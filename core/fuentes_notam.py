@@ -0,0 +1,190 @@
+"""
+Fuentes intercambiables para descargar NOTAMs de la FAA.
+
+`FuentePlaywright` es el flujo del portal con el pool de navegadores: buscar,
+exportar el Excel y leerlo. `FuenteHTTP` llama directamente al endpoint de
+búsqueda que usa el JavaScript del portal (`notamSearch/search`) sobre una
+sesión HTTP compartida y arma el DataFrame desde el JSON, sin navegador ni
+Excel. Ambas devuelven el mismo DataFrame tipado (`faa.construir_df_notams`).
+
+La fuente se elige con `FLEXWATCH_FUENTE_NOTAM` (`playwright` por defecto o
+`http`). `FLEXWATCH_FAA_URL` apunta ambas fuentes a otro portal, como el
+servidor local de `benchmarks/faa_falso.py` (`faa.url_portal`), y
+`FLEXWATCH_FAA_GRABAR` guarda cada respuesta JSON en una carpeta para poder
+reproducirla después.
+"""
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from core import faa
+from core.trazas import tramo
+
+TIMEOUT_SEGUNDOS = 30
+HILOS_HTTP = 4
+HILOS_PAGINAS = 8
+# Campos del JSON de la búsqueda -> columnas del export en Excel
+CAMPOS_JSON = {
+    "Location": "facilityDesignator",
+    "NOTAM #/LTA #": "notamNumber",
+    "Class": "classification",
+    "Issue Date (UTC)": "issueDate",
+    "Effective Date (UTC)": "startDate",
+    "Expiration Date (UTC)": "endDate",
+}
+
+
+def nombre_grabacion(designadores, offset):
+    """Archivo con el que se graba (y se reproduce) una página de resultados de la búsqueda."""
+    return f"{'_'.join(designadores)}_{offset}.json"
+
+
+class FuenteNotams(ABC):
+    """
+    Interfaz común de las fuentes de NOTAMs.
+
+    `buscar` devuelve el DataFrame de NOTAMs de hasta `max_por_busqueda`
+    aeropuertos en una sola consulta; `enviar` hace lo mismo en segundo plano
+    y devuelve un `Future`.
+    """
+    nombre = None
+    max_por_busqueda = faa.MAX_DESIGNADORES_POR_BUSQUEDA
+    hilos = HILOS_HTTP
+
+    def __init__(self):
+        self._ejecutor = None
+        self._ejecutor_lock = threading.Lock()
+
+    @abstractmethod
+    def buscar(self, aeropuertos, download_dir="descargas_notam"):
+        """DataFrame de NOTAMs de `aeropuertos` (a lo sumo `max_por_busqueda`)."""
+
+    def enviar(self, aeropuertos, download_dir="descargas_notam"):
+        with self._ejecutor_lock:
+            if self._ejecutor is None:
+                self._ejecutor = ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix=f"notam-{self.nombre}")
+        return self._ejecutor.submit(self.buscar, list(aeropuertos), download_dir)
+
+
+class FuentePlaywright(FuenteNotams):
+    """Portal de la FAA en el pool de navegadores: exporta el Excel y lo lee."""
+    nombre = "playwright"
+
+    def buscar(self, aeropuertos, download_dir="descargas_notam"):
+        return self.enviar(aeropuertos, download_dir).result()
+
+    def enviar(self, aeropuertos, download_dir="descargas_notam"):
+        aeropuertos = list(aeropuertos)
+        download_dir = os.path.abspath(download_dir)
+        os.makedirs(download_dir, exist_ok=True)
+
+        def _descargar(page):
+            with tramo("notam.playwright", aeropuertos=len(aeropuertos)) as atributos:
+                ruta = faa.descargar_excel_en_pagina(page, aeropuertos, download_dir)
+                try:
+                    df = faa.leer_excel_notams(ruta)
+                finally:
+                    os.remove(ruta)
+                atributos["notams"] = len(df)
+            return df
+        return faa.obtener_pool_faa().enviar(_descargar)
+
+
+class FuenteHTTP(FuenteNotams):
+    """
+    Endpoint JSON de búsqueda del portal, con conexiones reutilizadas.
+
+    El portal pagina los resultados: la primera página trae `totalNotamCount`
+    y su tamaño, y el resto de los `offset` se piden a la vez en hasta
+    `HILOS_PAGINAS` hilos.
+    """
+    nombre = "http"
+
+    def __init__(self, url_base=None, grabar_en=None):
+        super().__init__()
+        self._ejecutor_paginas = None
+        url_base = url_base or faa.url_portal()
+        self.url_busqueda = url_base.rstrip("/") + "/search"
+        self.grabar_en = grabar_en or os.environ.get("FLEXWATCH_FAA_GRABAR") or None
+        self._sesion = None
+        self._sesion_lock = threading.Lock()
+
+    def sesion(self):
+        """Sesión HTTP compartida para reutilizar conexiones con el portal."""
+        with self._sesion_lock:
+            if self._sesion is None:
+                self._sesion = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=self.hilos * HILOS_PAGINAS)
+                self._sesion.mount("https://", adapter)
+                self._sesion.mount("http://", adapter)
+            return self._sesion
+
+    def _paginas(self, designadores, offsets):
+        """Las páginas de `offsets` en orden, pedidas a la vez en un ejecutor aparte del de `enviar`."""
+        with self._sesion_lock:
+            if self._ejecutor_paginas is None:
+                self._ejecutor_paginas = ThreadPoolExecutor(
+                    max_workers=HILOS_PAGINAS, thread_name_prefix=f"notam-{self.nombre}-pagina",
+                )
+        return list(self._ejecutor_paginas.map(self._pagina, [designadores] * len(offsets), offsets))
+
+    def _pagina(self, designadores, offset):
+        with tramo("notam.http.pagina", aeropuertos=len(designadores), offset=offset) as atributos:
+            respuesta = self.sesion().post(
+                self.url_busqueda,
+                data={
+                    "searchType": 0,
+                    "designatorsForLocation": ",".join(designadores),
+                    "offset": offset,
+                    "notamsOnly": "false",
+                    "radius": 10,
+                },
+                timeout=TIMEOUT_SEGUNDOS,
+            )
+            respuesta.raise_for_status()
+            datos = respuesta.json()
+            atributos["bytes"] = len(respuesta.content)
+        if self.grabar_en:
+            os.makedirs(self.grabar_en, exist_ok=True)
+            with open(os.path.join(self.grabar_en, nombre_grabacion(designadores, offset)), "w", encoding="utf-8") as f:
+                json.dump(datos, f, ensure_ascii=False)
+        return datos
+
+    def buscar(self, aeropuertos, download_dir=None):
+        designadores = [a.strip().upper() for a in aeropuertos]
+        with tramo("notam.http", aeropuertos=len(designadores)) as atributos:
+            datos = self._pagina(designadores, 0)
+            notams = list(datos.get("notamList") or [])
+            total, por_pagina = int(datos.get("totalNotamCount") or 0), len(notams)
+            offsets = range(por_pagina, total, por_pagina) if por_pagina else ()
+            for datos in self._paginas(designadores, offsets):
+                notams.extend(datos.get("notamList") or [])
+            paginas = 1 + len(offsets)
+
+            columnas = {columna: [n.get(campo) or "" for n in notams] for columna, campo in CAMPOS_JSON.items()}
+            # `featureName` (Aerodrome, Obstruction...) solo si la respuesta no trae la clase
+            columnas["Class"] = [n.get("classification") or n.get("featureName") or "" for n in notams]
+            columnas["Condition"] = [(n.get("traditionalMessage") or "").strip() or n.get("icaoMessage") or "" for n in notams]
+            atributos.update(paginas=paginas, notams=len(notams))
+            return faa.construir_df_notams(columnas)
+
+
+FUENTES = {fuente.nombre: fuente for fuente in (FuentePlaywright, FuenteHTTP)}
+
+_fuentes = {}
+_fuentes_lock = threading.Lock()
+
+
+def obtener_fuente(nombre=None):
+    """Fuente compartida por el proceso; por defecto la de `FLEXWATCH_FUENTE_NOTAM`."""
+    nombre = (nombre or os.environ.get("FLEXWATCH_FUENTE_NOTAM") or "playwright").strip().lower()
+    if nombre not in FUENTES:
+        raise ValueError(f"Fuente de NOTAMs desconocida: {nombre} (opciones: {', '.join(FUENTES)})")
+    with _fuentes_lock:
+        if nombre not in _fuentes:
+            _fuentes[nombre] = FUENTES[nombre]()
+        return _fuentes[nombre]
@@ -0,0 +1,291 @@
+"""
+Health check de un itinerario sin dependencias de la interfaz.
+
+Descarga en lote NOTAMs y TAF de todos los aeropuertos del itinerario,
+selecciona para cada tramo solo los NOTAMs y periodos del TAF vigentes
+alrededor de su STD en origen y su STA en destino (`core.ventanas_vuelo`) y
+analiza los vuelos con la IA (en lotes que comparten aeropuertos o uno a
+uno), todo sobre el planificador de recursos. La página de Streamlit solo
+dibuja: recibe los fragmentos del análisis en streaming por
+`al_fragmento(índice, texto)` y los resultados de cada grupo a medida que
+terminan.
+
+Las filas del itinerario son las del editor de la página o de un archivo
+(`Flight`, `From`, `To`, `Reg.`, `STD`, `STA`), preparadas con
+`core.itinerario.preparar_itinerario`.
+"""
+import time
+
+import requests
+
+from core import flight_batch, llm_cache, peticiones_en_curso, runways, trazas
+from core.cache import hash_contenido
+from core.faa import MAX_DESIGNADORES_POR_BUSQUEDA, buscar_notams_por_lote
+from core.itinerario import NO_ENCONTRADO, ventanas_por_aeropuerto
+from core.llm import consultar_ia, transmitir_ia
+from core.scheduler import PlanificadorRecursos, en_orden_de_llegada
+from core.ventanas_vuelo import ContextoVentanas
+from core.weather import obtener_tafs
+
+TTL_ANALISIS_VUELO = 1800
+CURSOR_STREAMING = " ▌"
+
+
+def aeropuertos_validos(df_itinerario):
+    """Códigos ICAO de origen y destino del itinerario, sin repetir y sin los no encontrados."""
+    return ventanas_por_aeropuerto(df_itinerario).index.tolist()
+
+
+def pistas_del_itinerario(df_itinerario, indice=None):
+    """
+    Cabeceras de las pistas de todos los aeropuertos del itinerario, en una sola pasada.
+
+    Sin `runways.csv` el análisis sigue sin datos de pistas (`{}`).
+    """
+    if indice is None:
+        try:
+            indice = runways.obtener_indice()
+        except FileNotFoundError:
+            return {}
+    return indice.cabeceras_por_lote(aeropuertos_validos(df_itinerario))
+
+
+def prompt_vuelo(vuelo, taf_origin, taf_dest, notams_origin, notams_dest, runways_origin, runways_dest):
+    runways_origin_str = ", ".join(runways_origin) if runways_origin else "No disponibles"
+    runways_dest_str = ", ".join(runways_dest) if runways_dest else "No disponibles"
+    return f"""
+    Actúa como un despachador de vuelos experto y un meteorólogo. Tu tarea es analizar el siguiente vuelo y determinar su 'estado de salud/condiciones' operacionales relevantes. Todas las horas proporcionadas (STD, STA, TAF, NOTAM) están en formato UTC.
+
+    **Datos del Vuelo:**
+    * Vuelo: {vuelo['Flight']}
+    * Ruta: {vuelo['From_ICAO']} ({vuelo['From_IATA']}) -> {vuelo['To_ICAO']} ({vuelo['To_IATA']})
+    * Matrícula (Reg.): {vuelo['Reg.']}
+    * Hora de Salida (STD UTC): {vuelo['STD']}
+    * Hora de Llegada (STA UTC): {vuelo['STA']}
+
+    **Infraestructura de Pistas:**
+    * Pistas Disponibles en Origen ({vuelo['From_ICAO']}): [{runways_origin_str}]
+    * Pistas Disponibles en Destino ({vuelo['To_ICAO']}): [{runways_dest_str}]
+
+    **Datos Meteorológicos (periodos del TAF alrededor de STD en origen y de STA en destino, UTC):**
+    * TAF Origen ({vuelo['From_ICAO']}): {taf_origin or "No disponible"}
+    * TAF Destino ({vuelo['To_ICAO']}): {taf_dest or "No disponible"}
+
+    **Datos NOTAM (vigentes alrededor de STD en origen y de STA en destino, UTC):**
+    * NOTAMs Origen ({vuelo['From_ICAO']}): {notams_origin or "No disponibles"}
+    * NOTAMs Destino ({vuelo['To_ICAO']}): {notams_dest or "No disponibles"}
+
+    **Tu Análisis:**
+    1.  **Análisis WX:** ¿El TAF del origen o destino muestra condiciones adversas cerca de las horas de operación?
+    2.  **Análisis NOTAM y Pistas:** Basado en la lista de pistas disponibles, si un NOTAM menciona un cierre de pista, determina el impacto real. ¿Quedan pistas operativas? ¿Son adecuadas? Menciona qué pistas quedan disponibles.
+    3.  **Conclusión:** Proporciona un resumen conciso (máximo 3-4 frases) del estado del vuelo. Clasifícalo con un emoji y una palabra clave al inicio de tu respuesta: `✅ Normal`, `⚠️ Monitorear`, o `❌ En Riesgo`.
+    """
+
+
+def _ruta(vuelo):
+    return f"{vuelo['From_ICAO']}-{vuelo['To_ICAO']}"
+
+
+def analizar_vuelo(vuelo, taf_origin, taf_dest, notams_origin, notams_dest, runways_origin, runways_dest, cache_key=None, al_fragmento=None):
+    """
+    Analiza un vuelo con su propia consulta a la IA.
+
+    Con `al_fragmento(texto)` la respuesta llega en streaming y se le entrega
+    el texto acumulado (con cursor) a medida que crece.
+    """
+    prompt = prompt_vuelo(vuelo, taf_origin, taf_dest, notams_origin, notams_dest, runways_origin, runways_dest)
+    # Sin clave canónica (p. ej. NOTAMs no descargados) se cachea por el prompt completo
+    cache_key = cache_key or hash_contenido(prompt)
+    if al_fragmento is None:
+        return llm_cache.consultar_con_cache(
+            "vuelo_ia", _ruta(vuelo), cache_key, lambda: consultar_ia(prompt), ttl=TTL_ANALISIS_VUELO,
+        )
+    analisis_vuelo = ""
+    for fragmento in llm_cache.transmitir_con_cache(
+        "vuelo_ia", _ruta(vuelo), cache_key, lambda: transmitir_ia(prompt), ttl=TTL_ANALISIS_VUELO,
+    ):
+        analisis_vuelo += fragmento
+        al_fragmento(analisis_vuelo + CURSOR_STREAMING)
+    return analisis_vuelo
+
+
+def reunir_entradas(indice, vuelo, contexto, pistas_lote):
+    """NOTAMs y periodos del TAF de la ventana de un vuelo, sus pistas y su clave de caché."""
+    entradas, huellas = {}, []
+    for lado, extremo, icao in (("origin", "origen", vuelo["From_ICAO"]), ("dest", "destino", vuelo["To_ICAO"])):
+        if icao in ("", NO_ENCONTRADO):
+            datos = {"taf": "Código ICAO no válido" if icao else None, "notams": "No disponible", "huella": None}
+        else:
+            datos = contexto.entradas(icao, [contexto.ventanas[indice][extremo]])
+        entradas[f"taf_{lado}"], entradas[f"notams_{lado}"] = datos["taf"], datos["notams"]
+        entradas[f"runways_{lado}"] = pistas_lote.get(icao, [])
+        huellas.append(datos["huella"])
+    # La clave depende solo de los NOTAMs y periodos del TAF de la ventana: los que vencen o empiezan lejos del vuelo no la invalidan
+    entradas["cache_key"] = None
+    if None not in huellas:
+        entradas["cache_key"] = llm_cache.clave_vuelo(
+            vuelo["From_ICAO"], vuelo["To_ICAO"], vuelo["STD"], vuelo["STA"], entradas["taf_origin"], entradas["taf_dest"],
+            huellas[0], huellas[1], entradas["runways_origin"], entradas["runways_dest"],
+        )
+    return entradas
+
+
+def _tafs_del_itinerario(aeropuertos):
+    """TAF de todos los aeropuertos; si la API meteorológica falla, el análisis sigue sin TAF (`{}`)."""
+    try:
+        return obtener_tafs(aeropuertos)
+    except requests.RequestException as e:
+        print(f"ERROR: No se pudieron obtener los TAF de {', '.join(aeropuertos)}: {e}")
+        return {}
+
+
+@trazas.medido("health_check.ventanas")
+def _contexto_ventanas(df_itinerario, bloques_notam, tafs_lote, pistas_lote, margen_horas):
+    notams_lote = {}
+    for bloque in bloques_notam:
+        notams_lote.update(bloque.result())
+    return ContextoVentanas(df_itinerario, notams_lote, tafs_lote.result(), pistas_lote, margen_horas)
+
+
+def _inicializador(inicializar_hilo, al_unirse):
+    """Prepara cada hilo del planificador: el de la página y el aviso de peticiones compartidas."""
+    if al_unirse is None:
+        return inicializar_hilo
+
+    def inicializar():
+        if inicializar_hilo is not None:
+            inicializar_hilo()
+        peticiones_en_curso.observar(al_unirse)
+    return inicializar
+
+
+def _para_vuelo(al_fragmento, indice):
+    return None if al_fragmento is None else (lambda texto: al_fragmento(indice, texto))
+
+
+def _transmitir_lote(prompt):
+    """`transmitir_ia` del prompt de un lote, compartido con otra sesión que pida el mismo lote a la vez."""
+    clave = hash_contenido("ia", prompt, ())
+    return peticiones_en_curso.transmitir(
+        "ia", clave, lambda: transmitir_ia(prompt), etiqueta=f"prompt de {len(prompt)} caracteres",
+    )
+
+
+@trazas.medido("health_check.grupo")
+def analizar_grupo(vuelos, ventanas_lote, pistas_lote, al_fragmento=None):
+    """
+    Analiza un lote de vuelos que comparten aeropuertos con una sola consulta.
+
+    `vuelos` es una lista de `(índice, fila)` y `ventanas_lote`, el futuro del
+    `ContextoVentanas` del itinerario; devuelve `{índice: análisis}`. En el
+    lote, cada aeropuerto lleva lo vigente en la unión de las ventanas de los
+    vuelos que lo usan.
+    Los vuelos ya cacheados no se envían, cada veredicto se guarda bajo la
+    clave del vuelo y los que falten en la respuesta se analizan por separado,
+    en streaming por `al_fragmento(índice, texto)` si se indica. En streaming
+    la respuesta del lote también llega por partes y cada veredicto se entrega
+    a `al_fragmento` en cuanto está completo.
+    """
+    contexto = ventanas_lote.result()
+    resultados, pendientes = {}, {}
+    for indice, vuelo in vuelos:
+        entradas = reunir_entradas(indice, vuelo, contexto, pistas_lote)
+        if len(vuelos) > 1 and entradas["cache_key"]:
+            encontrado, analisis_vuelo = llm_cache.buscar_respuesta("vuelo_ia", _ruta(vuelo), entradas["cache_key"])
+            if encontrado:
+                resultados[indice] = analisis_vuelo
+                continue
+        pendientes[indice] = (vuelo, entradas)
+
+    if len(pendientes) > 1:
+        lista, aeropuertos, ventanas = [], {}, {}
+        for indice, (vuelo, entradas) in pendientes.items():
+            lista.append({
+                "id": str(indice), "vuelo": vuelo["Flight"], "origen": vuelo["From_ICAO"], "destino": vuelo["To_ICAO"],
+                "origen_iata": vuelo["From_IATA"], "destino_iata": vuelo["To_IATA"], "matricula": vuelo["Reg."],
+                "std": vuelo["STD"], "sta": vuelo["STA"],
+            })
+            for lado, extremo, icao in (("origin", "origen", vuelo["From_ICAO"]), ("dest", "destino", vuelo["To_ICAO"])):
+                aeropuertos.setdefault(icao, {
+                    "pistas": entradas[f"runways_{lado}"], "taf": entradas[f"taf_{lado}"], "notams": entradas[f"notams_{lado}"],
+                })
+                if icao not in ("", NO_ENCONTRADO):
+                    ventanas.setdefault(icao, []).append(contexto.ventanas[indice][extremo])
+        for icao, ventanas_icao in ventanas.items():
+            if len(ventanas_icao) > 1:
+                datos = contexto.entradas(icao, ventanas_icao)
+                aeropuertos[icao].update(taf=datos["taf"], notams=datos["notams"])
+        prompt = flight_batch.prompt_lote(lista, aeropuertos)
+        por_id = {str(indice): indice for indice in pendientes}
+        if al_fragmento is None:
+            veredictos = flight_batch.interpretar_veredictos(consultar_ia(prompt), por_id).items()
+        else:
+            veredictos = flight_batch.veredictos_en_streaming(_transmitir_lote(prompt), por_id)
+        for id_vuelo, veredicto in veredictos:
+            indice = por_id[id_vuelo]
+            vuelo, entradas = pendientes.pop(indice)
+            resultados[indice] = veredicto
+            if al_fragmento is not None:
+                al_fragmento(indice, veredicto)
+            if entradas["cache_key"]:
+                llm_cache.guardar_respuesta(
+                    "vuelo_ia", _ruta(vuelo), entradas["cache_key"], resultados[indice], ttl=TTL_ANALISIS_VUELO,
+                )
+
+    for indice, (vuelo, entradas) in pendientes.items():
+        resultados[indice] = analizar_vuelo(vuelo, **entradas, al_fragmento=_para_vuelo(al_fragmento, indice))
+    return resultados
+
+
+def ejecutar_health_check(df_itinerario, pistas_lote=None, en_lote=True, al_fragmento=None, inicializar_hilo=None,
+                          download_dir="descargas_notam", margen_horas=None, al_unirse=None):
+    """
+    Analiza todos los vuelos de un itinerario preparado con `core.itinerario.preparar_itinerario`.
+
+    Genera `(índices del grupo, {índice: análisis})` a medida que termina cada
+    grupo de vuelos; un grupo que falla trae el error como análisis de cada
+    vuelo. Cada recurso corre en paralelo con su propio límite; los grupos
+    arrancan en cuanto están las descargas y las ventanas de cada tramo
+    (`STD`/`STA` ± `margen_horas`, por defecto `ventanas_vuelo.MARGEN_HORAS`).
+    `inicializar_hilo` se pasa al planificador (la página adjunta ahí su
+    contexto de Streamlit). `al_unirse(tipo, etiquetas)` avisa cuando una
+    descarga o un análisis se une a la misma petición ya en curso en otra
+    sesión (`core.peticiones_en_curso`).
+    """
+    inicio = time.time()
+    validos = aeropuertos_validos(df_itinerario)
+    pistas_lote = pistas_del_itinerario(df_itinerario) if pistas_lote is None else pistas_lote
+    with PlanificadorRecursos(inicializar_hilo=_inicializador(inicializar_hilo, al_unirse)) as planificador:
+        # Una tarea por búsqueda en la FAA: el límite del recurso "notam" acota las búsquedas simultáneas
+        bloques_notam = [
+            planificador.enviar("notam", buscar_notams_por_lote, validos[i:i + MAX_DESIGNADORES_POR_BUSQUEDA],
+                                download_dir=download_dir)
+            for i in range(0, len(validos), MAX_DESIGNADORES_POR_BUSQUEDA)
+        ]
+        tafs_lote = planificador.enviar("wx", _tafs_del_itinerario, validos)
+        ventanas_lote = planificador.despues_de(
+            [*bloques_notam, tafs_lote], "notam", _contexto_ventanas,
+            df_itinerario, bloques_notam, tafs_lote, pistas_lote, margen_horas,
+        )
+        if en_lote:
+            aeropuertos = set(validos)
+            grupos = flight_batch.agrupar_vuelos({
+                indice: tuple(icao if icao in aeropuertos else None for icao in (vuelo["From_ICAO"], vuelo["To_ICAO"]))
+                for indice, vuelo in df_itinerario.iterrows()
+            })
+        else:
+            grupos = [[indice] for indice in df_itinerario.index]
+        futuros = {}
+        for grupo in grupos:
+            vuelos = [(indice, df_itinerario.loc[indice]) for indice in grupo]
+            futuros[tuple(grupo)] = planificador.despues_de(
+                [ventanas_lote], "ia", analizar_grupo, vuelos, ventanas_lote, pistas_lote, al_fragmento,
+            )
+
+        for grupo, futuro in en_orden_de_llegada(futuros):
+            try:
+                resultados = futuro.result()
+            except Exception as e:
+                resultados = {indice: f"❌ Error al analizar el vuelo: {e}" for indice in grupo}
+            yield grupo, resultados
+    trazas.registrar("health_check", inicio, time.time() - inicio, vuelos=len(df_itinerario), lote=en_lote)
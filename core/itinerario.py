@@ -0,0 +1,192 @@
+"""
+Ingesta de itinerarios: CSV/XLSX o tablas pegadas, preparados en bloque.
+
+Todo el itinerario se procesa por columnas, sin recorrer filas, y cada valor
+distinto se trabaja una sola vez: los códigos IATA se normalizan y se buscan
+en bloque en la tabla IATA→ICAO precompilada (`core.dataset`), y `STD`/`STA`
+se convierten a `STD_UTC`/`STA_UTC` interpretando cada fecha y cada hora
+distinta con `to_datetime` por formato. Un itinerario mensual de miles de
+tramos queda listo en decenas de milisegundos.
+
+`ventanas_por_aeropuerto` deduplica los pares aeropuerto/hora antes de
+cualquier descarga: cada aeropuerto se consulta una sola vez, con la ventana
+que cubre todos sus movimientos.
+"""
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+from core import dataset
+
+NO_ENCONTRADO = "NO ENCONTRADO"
+COLUMNAS_OBLIGATORIAS = ("Flight", "From", "To", "STD", "STA")
+COLUMNAS_OPCIONALES = ("Order", "Date", "Reg.")
+EXTENSIONES_EXCEL = (".xlsx", ".xlsm", ".xls")
+SEPARADORES_CSV = (",", ";", "\t", "|")
+# Formatos que se prueban en bloque antes de interpretar celda a celda
+FORMATOS_HORA = ("ISO8601", "%d/%m/%Y %H:%M", "%d/%m/%Y %H:%M:%S", "%d-%m-%Y %H:%M", "%d.%m.%Y %H:%M")
+FORMATOS_FECHA = ("ISO8601", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y")
+_RE_SOLO_HORA = r"\d{1,2}:\d{2}(?::\d{2})?"
+# Fechas de celdas Excel leídas como texto (`2024-05-01 00:00:00`)
+_RE_MEDIANOCHE = r"[ T]00:00(?::00)?$"
+
+
+def _separador(datos):
+    """El separador más frecuente en la cabecera del CSV."""
+    cabecera = datos.split(b"\n", 1)[0].decode("utf-8", "replace")
+    return max(SEPARADORES_CSV, key=cabecera.count)
+
+
+def normalizar_columnas(df):
+    """
+    Renombra las columnas conocidas sin distinguir mayúsculas ni espacios
+    (`flight`, ` STD `, `reg` -> `Flight`, `STD`, `Reg.`) y añade las opcionales.
+
+    Lanza `ValueError` si falta alguna columna obligatoria.
+    """
+    conocidas = {c.lower().rstrip("."): c for c in COLUMNAS_OBLIGATORIAS + COLUMNAS_OPCIONALES}
+    df = df.rename(columns=lambda c: conocidas.get(str(c).strip().lower().rstrip("."), str(c).strip()))
+    faltantes = [c for c in COLUMNAS_OBLIGATORIAS if c not in df.columns]
+    if faltantes:
+        raise ValueError(f"Faltan columnas en el itinerario: {', '.join(faltantes)}")
+    for columna in COLUMNAS_OPCIONALES:
+        if columna not in df.columns:
+            df[columna] = ""
+    if (df["Order"] == "").all():
+        df["Order"] = [str(i) for i in range(1, len(df) + 1)]
+    return df
+
+
+def leer_itinerario(origen, nombre=None):
+    """
+    Itinerario desde un CSV o Excel (ruta, bytes o archivo subido con `.name`).
+
+    Todas las celdas se leen como texto; las filas vacías se descartan.
+    """
+    nombre = nombre or getattr(origen, "name", origen if isinstance(origen, str) else "")
+    if isinstance(origen, str):
+        with open(origen, "rb") as f:
+            datos = f.read()
+    elif isinstance(origen, (bytes, bytearray)):
+        datos = bytes(origen)
+    else:
+        datos = origen.read()
+    if os.path.splitext(str(nombre).lower())[1] in EXTENSIONES_EXCEL:
+        try:
+            # calamine lee un Excel de miles de filas varias veces más rápido que openpyxl
+            df = pd.read_excel(io.BytesIO(datos), dtype=str, engine="calamine")
+        except ImportError:
+            df = pd.read_excel(io.BytesIO(datos), dtype=str)
+    else:
+        df = pd.read_csv(io.BytesIO(datos), dtype=str, sep=_separador(datos), encoding="utf-8-sig", skipinitialspace=True)
+    return normalizar_columnas(df.dropna(how="all").reset_index(drop=True))
+
+
+def _por_valor(serie, fn):
+    """
+    Aplica `fn` (una operación por columnas) una sola vez por valor distinto de
+    `serie` y reparte el resultado: en un itinerario las fechas, horas y
+    aeropuertos se repiten miles de veces.
+    """
+    posiciones, unicos = pd.factorize(serie, use_na_sentinel=False)
+    resultado = pd.Series(fn(pd.Series(unicos, dtype=object))).take(posiciones)
+    resultado.index = serie.index
+    return resultado
+
+
+def _texto(valores):
+    return valores.astype("string").fillna("").str.strip()
+
+
+def _codigos(serie):
+    return _por_valor(serie, lambda valores: _texto(valores).str.upper())
+
+
+def _a_icao(codigos_iata, aeropuertos):
+    """ICAO de cada código IATA ya normalizado, buscando una sola vez cada código distinto."""
+    def buscar(unicos):
+        unicos = np.asarray(unicos, dtype="U")
+        icao = aeropuertos.iata_a_icao_lote(unicos)
+        return np.where(unicos == "", "", np.where(icao == "", NO_ENCONTRADO, icao))
+    return _por_valor(codigos_iata, buscar).to_numpy()
+
+
+def _leer_fechas(texto, formatos):
+    """
+    Cada formato se prueba en bloque sobre lo que aún no se pudo leer; solo el
+    resto se interpreta celda a celda (día primero, como en las exportaciones
+    locales). Lo vacío o ilegible queda como `NaT`.
+    """
+    resultado = pd.Series(pd.NaT, index=texto.index, dtype="datetime64[ns, UTC]")
+    for formato in formatos + ("mixed",):
+        pendientes = resultado.isna() & (texto != "")
+        if not pendientes.any():
+            break
+        resultado[pendientes] = pd.to_datetime(
+            texto[pendientes], utc=True, errors="coerce", format=formato, dayfirst=formato == "mixed",
+        )
+    return resultado
+
+
+def _hora_del_dia(texto):
+    """`13:05` o `13:05:30` como desplazamiento desde medianoche."""
+    texto = texto.mask(texto.str.count(":") == 1, texto + ":00")
+    return pd.to_timedelta(texto.mask(texto == "", None), errors="coerce")
+
+
+def _horas_utc(horas, fechas):
+    """
+    `STD`/`STA` como fechas UTC; las celdas con solo hora (`13:05`) toman la
+    fecha de la columna `Date` (o la de hoy si no la hay).
+
+    Fechas, horas y fechas completas se interpretan una vez por valor distinto.
+    """
+    texto = _por_valor(horas, _texto)
+    solo_hora = _por_valor(texto, lambda valores: valores.str.fullmatch(_RE_SOLO_HORA).fillna(False)).astype(bool)
+    completas = _por_valor(texto.where(~solo_hora, ""), lambda valores: _leer_fechas(valores, FORMATOS_HORA))
+    dias = _por_valor(fechas.where(solo_hora, ""), lambda valores: _leer_fechas(valores, FORMATOS_FECHA))
+    horas_del_dia = _por_valor(texto.where(solo_hora, ""), _hora_del_dia)
+    return completas.mask(solo_hora, dias + horas_del_dia), solo_hora
+
+
+def preparar_itinerario(df_itinerario, aeropuertos=None):
+    """
+    Copia del itinerario con `From_IATA`/`To_IATA`, `From_ICAO`/`To_ICAO` y `STD_UTC`/`STA_UTC`.
+
+    Los códigos vacíos quedan como `''` y los que no están en la base como
+    `NO_ENCONTRADO`. Una llegada con solo hora anterior a la salida se pasa al
+    día siguiente (vuelo nocturno). `STD`/`STA` conservan el texto original.
+    """
+    aeropuertos = aeropuertos or dataset.obtener_dataset()
+    df = normalizar_columnas(df_itinerario.copy())
+    df["From_IATA"] = _codigos(df["From"])
+    df["To_IATA"] = _codigos(df["To"])
+    # Origen y destino en una sola búsqueda: los mismos códigos se repiten en ambas columnas
+    icao = _a_icao(pd.concat([df["From_IATA"], df["To_IATA"]], ignore_index=True), aeropuertos)
+    df["From_ICAO"], df["To_ICAO"] = icao[:len(df)], icao[len(df):]
+
+    hoy = pd.Timestamp.now(tz="UTC").strftime("%Y-%m-%d")
+    fechas = _por_valor(df["Date"], lambda valores: _texto(valores).str.replace(_RE_MEDIANOCHE, "", regex=True).replace("", hoy))
+    df["STD_UTC"], _ = _horas_utc(df["STD"], fechas)
+    df["STA_UTC"], sta_solo_hora = _horas_utc(df["STA"], fechas)
+    nocturnos = sta_solo_hora & (df["STA_UTC"] < df["STD_UTC"])
+    df.loc[nocturnos, "STA_UTC"] += pd.Timedelta(days=1)
+    return df
+
+
+def ventanas_por_aeropuerto(df_itinerario):
+    """
+    Aeropuertos válidos del itinerario preparado, cada uno una sola vez.
+
+    Los movimientos (salidas en `STD_UTC`, llegadas en `STA_UTC`) se
+    deduplican por par aeropuerto/hora; por aeropuerto se devuelven `desde`,
+    `hasta` y el número de `movimientos` distintos, en orden de aparición.
+    """
+    pares = pd.concat([
+        pd.DataFrame({"icao": df_itinerario["From_ICAO"], "hora": df_itinerario["STD_UTC"]}),
+        pd.DataFrame({"icao": df_itinerario["To_ICAO"], "hora": df_itinerario["STA_UTC"]}),
+    ], ignore_index=True)
+    pares = pares[(pares["icao"] != "") & (pares["icao"] != NO_ENCONTRADO)].drop_duplicates()
+    return pares.groupby("icao", sort=False)["hora"].agg(desde="min", hasta="max", movimientos="size")
@@ -0,0 +1,378 @@
+"""
+Cliente de IA compartido, asíncrono y con peticiones de cobertura.
+
+Sustituye el recorrido secuencial de `AI_MODELS`: se lanza el primer modelo
+disponible y, si no ha respondido cuando vence su plazo de cobertura (la
+mediana de sus latencias recientes), se lanza también el siguiente; gana la
+primera respuesta válida y las demás se cancelan. Un fallo lanza el siguiente
+modelo de inmediato. Cada modelo tiene su propio tiempo máximo y un circuito
+que lo aparta durante un rato tras varios fallos seguidos, y un semáforo
+limita las consultas simultáneas del proceso.
+
+Las respuestas también pueden recibirse en streaming (`transmitir_ia`): la
+carrera de cobertura se decide con el primer fragmento de texto y el resto se
+entrega a medida que llega, para que las páginas muestren texto útil en
+segundos en lugar de esperar la respuesta completa.
+
+Las corrutinas corren en un bucle de eventos propio en segundo plano, de modo
+que las páginas de Streamlit y sus hilos trabajadores usan las versiones
+síncronas `consultar_ia` y `transmitir_ia` sin gestionar `asyncio`.
+"""
+import asyncio
+import os
+import statistics
+import threading
+import time
+from collections import deque
+
+from core import peticiones_en_curso, trazas
+from core.cache import hash_contenido
+
+MODELOS_IA = ["gpt-4o-mini", "gemini-2.5-flash", "grok-3", "gpt-4.1-mini"]
+MENSAJE_FALLO_IA = "❌ Todos los modelos de IA fallaron. Por favor, inténtalo de nuevo más tarde."
+
+TIMEOUT_MODELO_SEGUNDOS = float(os.environ.get("FLEXWATCH_IA_TIMEOUT", "90"))
+MAX_CONSULTAS_SIMULTANEAS = int(os.environ.get("FLEXWATCH_IA_CONCURRENCIA", "6"))
+COBERTURA_INICIAL_SEGUNDOS = 10.0
+COBERTURA_MINIMA_SEGUNDOS = 2.0
+FALLOS_PARA_ABRIR_CIRCUITO = 3
+ENFRIAMIENTO_CIRCUITO_SEGUNDOS = 120
+MUESTRAS_LATENCIA = 50
+
+
+class ErrorIA(Exception):
+    """Ningún modelo devolvió una respuesta válida."""
+
+
+class CircuitoModelo:
+    """Latencias recientes y estado del circuito de un modelo."""
+
+    def __init__(self, modelo):
+        self.modelo = modelo
+        self.latencias = deque(maxlen=MUESTRAS_LATENCIA)
+        self.fallos_consecutivos = 0
+        self.abierto_hasta = 0.0
+        self._lock = threading.Lock()
+
+    def disponible(self):
+        """Cerrado, o abierto pero ya enfriado (se deja pasar una consulta de prueba)."""
+        return time.monotonic() >= self.abierto_hasta
+
+    def plazo_cobertura(self):
+        """Segundos a esperar antes de lanzar el siguiente modelo: la mediana de latencias."""
+        with self._lock:
+            if not self.latencias:
+                return COBERTURA_INICIAL_SEGUNDOS
+            return max(COBERTURA_MINIMA_SEGUNDOS, statistics.median(self.latencias))
+
+    def registrar_exito(self, latencia):
+        with self._lock:
+            self.latencias.append(latencia)
+            self.fallos_consecutivos = 0
+            self.abierto_hasta = 0.0
+
+    def registrar_fallo(self):
+        with self._lock:
+            self.fallos_consecutivos += 1
+            if self.fallos_consecutivos >= FALLOS_PARA_ABRIR_CIRCUITO:
+                self.abierto_hasta = time.monotonic() + ENFRIAMIENTO_CIRCUITO_SEGUNDOS
+                print(f"INFO: Circuito abierto para {self.modelo} durante {ENFRIAMIENTO_CIRCUITO_SEGUNDOS} s.")
+
+
+def _crear_cliente_g4f():
+    from g4f.client import AsyncClient
+    return AsyncClient()
+
+
+class ClienteIA:
+    """
+    Consulta varios modelos con cobertura, circuito por modelo y límite de concurrencia.
+
+    `crear_cliente` devuelve un cliente con la interfaz asíncrona de g4f
+    (`await cliente.chat.completions.create(model=..., messages=...)`).
+    """
+
+    def __init__(self, modelos=None, timeout=TIMEOUT_MODELO_SEGUNDOS, max_simultaneas=MAX_CONSULTAS_SIMULTANEAS, crear_cliente=_crear_cliente_g4f):
+        self.modelos = list(modelos or MODELOS_IA)
+        self.timeout = timeout
+        self.max_simultaneas = max_simultaneas
+        self._crear_cliente = crear_cliente
+        self._cliente = None
+        self._circuitos = {}
+        self._lock = threading.Lock()
+        self._bucle = None
+        self._semaforo = None
+
+    def circuito(self, modelo):
+        with self._lock:
+            if modelo not in self._circuitos:
+                self._circuitos[modelo] = CircuitoModelo(modelo)
+            return self._circuitos[modelo]
+
+    def _preparar(self):
+        if self._cliente is None:
+            self._cliente = self._crear_cliente()
+        if self._semaforo is None:
+            self._semaforo = asyncio.Semaphore(self.max_simultaneas)
+
+    def _candidatos(self, modelos):
+        """Modelos con el circuito cerrado, en orden; si todos están abiertos, se prueban igual."""
+        modelos = list(modelos or self.modelos)
+        disponibles = [m for m in modelos if self.circuito(m).disponible()]
+        return disponibles or modelos
+
+    @staticmethod
+    def _trazar(etapa, modelo, prompt, inicio, error=None, **atributos):
+        """Registra un intento contra un modelo; `inicio` es de `time.monotonic()`."""
+        duracion = time.monotonic() - inicio
+        trazas.registrar(
+            etapa, time.time() - duracion, duracion, ok=error is None, error=error,
+            modelo=modelo, caracteres_prompt=len(prompt), **atributos,
+        )
+
+    async def _llamar(self, modelo, prompt):
+        circuito = self.circuito(modelo)
+        async with self._semaforo:
+            inicio = time.monotonic()
+            try:
+                respuesta = await asyncio.wait_for(
+                    self._cliente.chat.completions.create(model=modelo, messages=[{"role": "user", "content": prompt}]),
+                    timeout=self.timeout,
+                )
+                contenido = respuesta.choices[0].message.content if respuesta.choices else None
+                if not contenido:
+                    raise ErrorIA("Respuesta de IA vacía.")
+            except asyncio.CancelledError:
+                # Cancelada porque otro modelo respondió antes: no es un fallo del modelo
+                self._trazar("ia.intento", modelo, prompt, inicio, cancelado=True)
+                raise
+            except Exception as e:
+                circuito.registrar_fallo()
+                self._trazar("ia.intento", modelo, prompt, inicio, error=f"{type(e).__name__}: {e}"[:300])
+                print(f"Modelo {modelo} falló con error: {e}")
+                raise
+            circuito.registrar_exito(time.monotonic() - inicio)
+            self._trazar("ia.intento", modelo, prompt, inicio, caracteres_respuesta=len(contenido))
+            return contenido
+
+    async def _carrera(self, modelos, intentar, descartar=None):
+        """
+        Lanza `intentar(modelo)` con cobertura y devuelve `(modelo, resultado)` del primero que lo logra.
+
+        Los intentos que siguen en curso se cancelan; si otro terminó a la vez
+        con éxito, su resultado se entrega a `descartar`. Lanza `ErrorIA` si
+        todos fallan.
+        """
+        restantes = deque(self._candidatos(modelos))
+        en_curso = {}
+        errores = []
+
+        def lanzar_siguiente():
+            modelo = restantes.popleft()
+            if en_curso:
+                print(f"INFO: Lanzando {modelo} como cobertura...")
+            en_curso[asyncio.ensure_future(intentar(modelo))] = modelo
+            return modelo
+
+        ultimo = lanzar_siguiente()
+        ganador = None
+        try:
+            while en_curso and ganador is None:
+                plazo = self.circuito(ultimo).plazo_cobertura() if restantes else None
+                terminadas, _ = await asyncio.wait(en_curso, timeout=plazo, return_when=asyncio.FIRST_COMPLETED)
+                for tarea in terminadas:
+                    modelo = en_curso.pop(tarea)
+                    if tarea.exception() is not None:
+                        errores.append(f"{modelo}: {tarea.exception()}")
+                    elif ganador is None:
+                        ganador = (modelo, tarea.result())
+                    elif descartar is not None:
+                        await descartar(tarea.result())
+                # Venció el plazo de cobertura o falló un modelo: entra el siguiente
+                if ganador is None and restantes:
+                    ultimo = lanzar_siguiente()
+        finally:
+            for tarea in en_curso:
+                tarea.cancel()
+        if ganador is None:
+            raise ErrorIA("; ".join(errores) or "Sin modelos disponibles.")
+        return ganador
+
+    async def consultar_async(self, prompt, modelos=None):
+        """Devuelve la primera respuesta válida entre los modelos; lanza `ErrorIA` si todos fallan."""
+        self._preparar()
+        _, contenido = await self._carrera(modelos, lambda modelo: self._llamar(modelo, prompt))
+        return contenido
+
+    @staticmethod
+    async def _siguiente_texto(flujo):
+        """Siguiente fragmento de texto no vacío del flujo, o `None` cuando termina."""
+        while True:
+            try:
+                fragmento = await flujo.__anext__()
+            except StopAsyncIteration:
+                return None
+            texto = fragmento.choices[0].delta.content if fragmento.choices else None
+            if texto:
+                return texto
+
+    async def _cerrar_flujo(self, abierto):
+        flujo = abierto[0]
+        self._semaforo.release()
+        if hasattr(flujo, "aclose"):
+            try:
+                await flujo.aclose()
+            except Exception:
+                pass
+
+    async def _abrir_flujo(self, modelo, prompt):
+        """Abre el streaming de `modelo` y espera su primer texto; devuelve `(flujo, texto, inicio)`."""
+        circuito = self.circuito(modelo)
+        await self._semaforo.acquire()
+        inicio = time.monotonic()
+        flujo = None
+        try:
+            flujo = self._cliente.chat.completions.create(
+                model=modelo, messages=[{"role": "user", "content": prompt}], stream=True,
+            ).__aiter__()
+            texto = await asyncio.wait_for(self._siguiente_texto(flujo), timeout=self.timeout)
+            if texto is None:
+                raise ErrorIA("Respuesta de IA vacía.")
+            return flujo, texto, inicio
+        except BaseException as e:
+            self._semaforo.release()
+            if flujo is not None and hasattr(flujo, "aclose"):
+                asyncio.ensure_future(flujo.aclose())
+            if isinstance(e, asyncio.CancelledError):
+                self._trazar("ia.flujo", modelo, prompt, inicio, cancelado=True)
+            else:
+                circuito.registrar_fallo()
+                self._trazar("ia.flujo", modelo, prompt, inicio, error=f"{type(e).__name__}: {e}"[:300])
+                print(f"Modelo {modelo} falló con error: {e}")
+            raise
+
+    async def transmitir_async(self, prompt, modelos=None):
+        """
+        Generador asíncrono con los fragmentos de texto de la respuesta.
+
+        La cobertura entre modelos se decide con el primer fragmento; si el
+        modelo elegido se corta después, se lanza `ErrorIA` (el texto ya
+        entregado no puede cambiarse de modelo).
+        """
+        self._preparar()
+        modelo, abierto = await self._carrera(
+            modelos, lambda modelo: self._abrir_flujo(modelo, prompt), descartar=self._cerrar_flujo,
+        )
+        flujo, texto, inicio = abierto
+        circuito = self.circuito(modelo)
+        primer_fragmento = round(time.monotonic() - inicio, 3)
+        caracteres = 0
+        try:
+            while texto is not None:
+                caracteres += len(texto)
+                yield texto
+                texto = await asyncio.wait_for(self._siguiente_texto(flujo), timeout=self.timeout)
+        except asyncio.CancelledError:
+            raise
+        except GeneratorExit:
+            self._trazar("ia.flujo", modelo, prompt, inicio, primer_fragmento_s=primer_fragmento, caracteres_respuesta=caracteres, cancelado=True)
+            raise
+        except Exception as e:
+            circuito.registrar_fallo()
+            self._trazar("ia.flujo", modelo, prompt, inicio, error=f"{type(e).__name__}: {e}"[:300], primer_fragmento_s=primer_fragmento)
+            print(f"Modelo {modelo} se interrumpió con error: {e}")
+            raise ErrorIA(f"{modelo} se interrumpió: {e}") from e
+        else:
+            circuito.registrar_exito(time.monotonic() - inicio)
+            self._trazar("ia.flujo", modelo, prompt, inicio, primer_fragmento_s=primer_fragmento, caracteres_respuesta=caracteres)
+        finally:
+            await self._cerrar_flujo(abierto)
+
+    def _bucle_de_fondo(self):
+        with self._lock:
+            if self._bucle is None:
+                self._bucle = asyncio.new_event_loop()
+                threading.Thread(target=self._bucle.run_forever, name="flexwatch-ia", daemon=True).start()
+            return self._bucle
+
+    def consultar(self, prompt, modelos=None):
+        """Versión síncrona de `consultar_async` para cualquier hilo."""
+        with trazas.tramo("ia.consulta", caracteres_prompt=len(prompt)) as atributos:
+            futuro = asyncio.run_coroutine_threadsafe(self.consultar_async(prompt, modelos), self._bucle_de_fondo())
+            contenido = futuro.result()
+            atributos["caracteres_respuesta"] = len(contenido)
+        return contenido
+
+    def transmitir(self, prompt, modelos=None):
+        """Versión síncrona de `transmitir_async`: un generador de fragmentos de texto."""
+        bucle = self._bucle_de_fondo()
+        flujo = self.transmitir_async(prompt, modelos)
+        try:
+            while True:
+                try:
+                    yield asyncio.run_coroutine_threadsafe(flujo.__anext__(), bucle).result()
+                except StopAsyncIteration:
+                    return
+        finally:
+            # Si quien consume deja de leer, se cierra el streaming y se libera el cupo
+            asyncio.run_coroutine_threadsafe(flujo.aclose(), bucle).result()
+
+
+_cliente = None
+_cliente_lock = threading.Lock()
+
+
+def obtener_cliente_ia():
+    """Cliente de IA compartido por el proceso."""
+    global _cliente
+    with _cliente_lock:
+        if _cliente is None:
+            _cliente = ClienteIA()
+        return _cliente
+
+
+def usar_cliente_ia(cliente):
+    """Reemplaza el cliente compartido del proceso (p. ej. un `ClienteIA` con un cliente falso)."""
+    global _cliente
+    with _cliente_lock:
+        _cliente = cliente
+
+
+def es_respuesta_fallida(texto):
+    """La respuesta es, o termina en, el aviso de que la IA falló."""
+    return str(texto or "").rstrip().endswith(MENSAJE_FALLO_IA)
+
+
+def transmitir_ia(prompt, modelos=None):
+    """
+    Fragmentos de la respuesta de la IA a medida que llegan.
+
+    Si ningún modelo responde, o el elegido se corta a mitad de respuesta, el
+    último fragmento es `MENSAJE_FALLO_IA`.
+    """
+    emitido = False
+    try:
+        for texto in obtener_cliente_ia().transmitir(prompt, modelos):
+            emitido = True
+            yield texto
+    except ErrorIA as e:
+        print(f"ERROR: {e}")
+        yield f"\n\n{MENSAJE_FALLO_IA}" if emitido else MENSAJE_FALLO_IA
+
+
+def consultar_ia(prompt, modelos=None):
+    """
+    Respuesta de la IA, o `MENSAJE_FALLO_IA` si todos los modelos fallaron.
+
+    El mismo prompt pedido a la vez desde varias sesiones (p. ej. el mismo lote
+    de vuelos) se consulta una sola vez.
+    """
+    def _consultar():
+        try:
+            return obtener_cliente_ia().consultar(prompt, modelos)
+        except ErrorIA as e:
+            print(f"ERROR: {e}")
+            return MENSAJE_FALLO_IA
+
+    clave = hash_contenido("ia", prompt, tuple(modelos or ()))
+    return peticiones_en_curso.ejecutar("ia", clave, _consultar, etiqueta=f"prompt de {len(prompt)} caracteres")
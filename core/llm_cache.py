@@ -0,0 +1,141 @@
+"""
+Caché de respuestas de la IA direccionada por contenido.
+
+La clave de cada respuesta es un hash canónico de los datos que realmente
+determinan el análisis: los NOTAMs (identificador y texto, ordenados), el TAF
+o los METAR normalizados, las pistas y la ventana del vuelo. Así, dos
+descargas del mismo conjunto de NOTAMs con distinta metadata, o el mismo
+vuelo con otra columna del itinerario cambiada, reutilizan la respuesta. Las
+respuestas viven en la caché persistente de `core.cache`, con su desalojo
+LRU y sus contadores de aciertos por tipo. Las respuestas en streaming se
+guardan una sola vez, cuando terminan completas. Mientras una clave se está
+calculando, quien pide la misma espera esa respuesta en lugar de volver a
+consultar la IA (`core.peticiones_en_curso`).
+"""
+import pandas as pd
+
+from core import peticiones_en_curso
+from core.cache import hash_contenido, obtener_cache
+from core.llm import es_respuesta_fallida
+
+TIPOS_IA = ("notam_ia", "taf_ia", "metar_ia", "vuelo_ia")
+_PREFIJOS_ERROR_IA = ("❌ Todos los modelos", "❌ Error")
+
+
+def normalizar_reporte(raw):
+    """TAF/METAR en mayúsculas, sin `=` final y con espacios simples."""
+    return " ".join(str(raw or "").upper().replace("=", " ").split())
+
+
+def huella_notams(df):
+    """
+    Conjunto canónico de NOTAMs de un export de la FAA: pares `(id, texto)` ordenados.
+
+    Ignora el orden de las filas, los espacios y cualquier otra columna o
+    metadata del archivo descargado.
+    """
+    if df is None:
+        return None
+    if df.empty:
+        return ()
+    ids = df["NOTAM #/LTA #"].fillna("").astype(str).str.strip()
+    textos = df["Condition"].fillna("").astype(str).map(lambda texto: " ".join(texto.split()))
+    return tuple(sorted(set(zip(ids, textos))))
+
+
+def ventana_vuelo(std, sta):
+    """STD/STA normalizados a `AAAA-MM-DDTHH:MM` (o el texto limpio si no es una fecha)."""
+    def _normalizar(valor):
+        if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+            return ""
+        fecha = pd.to_datetime(str(valor).strip(), errors="coerce")
+        return str(valor).strip() if pd.isna(fecha) else fecha.strftime("%Y-%m-%dT%H:%M")
+    return _normalizar(std), _normalizar(sta)
+
+
+def clave_notams(df, pistas):
+    return hash_contenido("notams", huella_notams(df), tuple(sorted(pistas or ())))
+
+
+def clave_taf(raw_taf):
+    return hash_contenido("taf", normalizar_reporte(raw_taf))
+
+
+def clave_metars(metars):
+    return hash_contenido("metar", tuple(normalizar_reporte(m) for m in metars or ()))
+
+
+def clave_vuelo(origen, destino, std, sta, taf_origen, taf_destino, notams_origen, notams_destino, pistas_origen, pistas_destino):
+    """Clave del análisis de un vuelo; `notams_*` son las huellas de `huella_notams`."""
+    return hash_contenido(
+        "vuelo", origen, destino, ventana_vuelo(std, sta),
+        normalizar_reporte(taf_origen), normalizar_reporte(taf_destino),
+        notams_origen, notams_destino,
+        tuple(sorted(pistas_origen or ())), tuple(sorted(pistas_destino or ())),
+    )
+
+
+def es_respuesta_valida(respuesta):
+    """Los mensajes de error de la IA (todos los modelos fallaron o la respuesta se cortó) no se guardan."""
+    return bool(respuesta) and not str(respuesta).startswith(_PREFIJOS_ERROR_IA) and not es_respuesta_fallida(respuesta)
+
+
+def consultar_con_cache(tipo, estacion, clave, consultar, ttl=None, expira=None):
+    """Devuelve la respuesta guardada para `clave` o llama a `consultar()` y la guarda."""
+    return peticiones_en_curso.ejecutar(
+        tipo, (estacion, clave),
+        lambda: obtener_cache().obtener_o_calcular(
+            tipo, estacion, clave, consultar, ttl=ttl, expira=expira, es_valido=es_respuesta_valida,
+        ),
+        etiqueta=estacion,
+    )
+
+
+def transmitir_con_cache(tipo, estacion, clave, transmitir, ttl=None, expira=None):
+    """
+    Versión en streaming de `consultar_con_cache`: un generador de fragmentos de texto.
+
+    Un acierto se entrega de una vez; si no, se reenvían los fragmentos de
+    `transmitir()` y la respuesta se guarda solo cuando llega completa y es
+    válida. Quien pide una clave que ya se está transmitiendo recibe la
+    respuesta completa cuando termina.
+    """
+    encontrado, respuesta = buscar_respuesta(tipo, estacion, clave)
+    if encontrado:
+        yield respuesta
+        return
+
+    def _transmitir_y_guardar():
+        partes = []
+        for texto in transmitir():
+            partes.append(texto)
+            yield texto
+        respuesta = "".join(partes)
+        guardar_respuesta(tipo, estacion, clave, respuesta, ttl=ttl, expira=expira(respuesta) if callable(expira) else expira)
+
+    yield from peticiones_en_curso.transmitir(tipo, (estacion, clave), _transmitir_y_guardar, etiqueta=estacion)
+
+
+def buscar_respuesta(tipo, estacion, clave):
+    """`(encontrada, respuesta)` guardada para `clave`, sin calcularla."""
+    return obtener_cache().obtener(tipo, estacion, clave)
+
+
+def guardar_respuesta(tipo, estacion, clave, respuesta, ttl=None, expira=None):
+    """Guarda una respuesta obtenida fuera de `consultar_con_cache` (p. ej. de un lote)."""
+    if es_respuesta_valida(respuesta):
+        obtener_cache().guardar(tipo, estacion, respuesta, ttl=ttl, expira=expira, contenido=clave)
+
+
+def estadisticas_ia():
+    """Aciertos, fallos, entradas y tasa de aciertos de la caché de IA, por tipo y en total."""
+    estadisticas = {tipo: datos for tipo, datos in obtener_cache().estadisticas().items() if tipo in TIPOS_IA}
+    aciertos = sum(datos["aciertos"] for datos in estadisticas.values())
+    consultas = aciertos + sum(datos["fallos"] for datos in estadisticas.values())
+    estadisticas["total"] = {
+        "aciertos": aciertos,
+        "fallos": consultas - aciertos,
+        "entradas": sum(datos.get("entradas", 0) for datos in estadisticas.values()),
+        "tasa_aciertos": aciertos / consultas if consultas else 0.0,
+    }
+    return estadisticas
@@ -0,0 +1,260 @@
+"""
+Parser local de NOTAMs exportados por la FAA.
+
+Convierte el texto libre de la columna `Condition` en una tabla tipada
+(categoría, pistas, calles de rodaje, radioayudas, vigencia en UTC y
+criticidad) para que la IA solo reciba el subconjunto que puede cambiar una
+decisión de despacho, en lugar de `df.to_string()` con cientos de filas.
+"""
+import re
+
+import pandas as pd
+
+CRITICO, RELEVANTE, RUTINARIO = "CRÍTICO", "RELEVANTE", "RUTINARIO"
+NIVELES_CRITICIDAD = (CRITICO, RELEVANTE, RUTINARIO)
+
+PISTA, RODAJE, OBSTACULO, NAVAID, COMBUSTIBLE, ESPACIO_AEREO = (
+    "PISTA", "RODAJE", "OBSTÁCULO", "NAVAID", "COMBUSTIBLE", "ESPACIO AÉREO")
+ILUMINACION, AERODROMO, PROCEDIMIENTOS, COMUNICACIONES, SERVICIOS, OTROS = (
+    "ILUMINACIÓN", "AERÓDROMO", "PROCEDIMIENTOS", "COMUNICACIONES", "SERVICIOS", "OTROS")
+
+COLUMNAS_TABLA = [
+    "location", "notam_id", "clase", "q_code", "categoria", "pistas", "rodajes", "navaids",
+    "cerrado", "fuera_servicio", "inicio", "fin", "permanente", "estimado", "criticidad", "texto",
+]
+
+FORMATO_FECHA_FAA = "%m/%d/%Y %H%M"
+_FORMATO_VIGENCIA = "%Y-%m-%d %H%MZ"
+
+# Segunda y tercera letra del código Q (sujeto) -> categoría
+_CATEGORIA_POR_Q = {"MR": PISTA, "MT": PISTA, "MD": PISTA, "MS": PISTA, "MX": RODAJE, "FU": COMBUSTIBLE}
+_CATEGORIA_POR_LETRA_Q = {
+    "M": AERODROMO, "F": AERODROMO, "L": ILUMINACION, "I": NAVAID, "N": NAVAID, "G": NAVAID,
+    "O": OBSTACULO, "A": ESPACIO_AEREO, "R": ESPACIO_AEREO, "W": ESPACIO_AEREO,
+    "C": COMUNICACIONES, "S": SERVICIOS, "P": PROCEDIMIENTOS,
+}
+# Palabra clave de los NOTAM domésticos de la FAA (!MIA 08/038 MIA RWY ...) -> categoría
+_CATEGORIA_POR_PALABRA = {
+    "RWY": PISTA, "TWY": RODAJE, "APRON": AERODROMO, "AD": AERODROMO, "OBST": OBSTACULO,
+    "NAV": NAVAID, "COM": COMUNICACIONES, "SVC": SERVICIOS, "AIRSPACE": ESPACIO_AEREO,
+    "IAP": PROCEDIMIENTOS, "SID": PROCEDIMIENTOS, "STAR": PROCEDIMIENTOS, "ODP": PROCEDIMIENTOS,
+    "CHART": PROCEDIMIENTOS, "DATA": PROCEDIMIENTOS, "ROUTE": PROCEDIMIENTOS, "VFP": PROCEDIMIENTOS,
+    "SPECIAL": PROCEDIMIENTOS,
+}
+
+_RE_Q_CODE = re.compile(r"Q\)\s*[A-Z]{4}/Q([A-Z]{4})")
+_RE_CAMPO_E = re.compile(r"\bE\)\s*(.*?)(?=\s[FG]\)\s|$)", re.S)
+_RE_ENCABEZADO_FAA = re.compile(r"^!\w+\s+\d+/\d+\s+\w+\s+")
+_RE_PALABRA_CLAVE_FAA = re.compile(r"^!\w+\s+\d+/\d+\s+\w+\s+(\w+)")
+_RE_VIGENCIA_FAA = re.compile(r"\s*\d{10}-(?:\d{10}(?:EST)?|PERM)\s*$")
+_RE_PISTA = re.compile(r"\bRWY\s+(\d{1,2}[LRC]?)(?:\s*/\s*(\d{1,2}[LRC]?))?")
+_ALFABETO_FONETICO = {
+    "ALFA": "A", "ALPHA": "A", "BRAVO": "B", "CHARLIE": "C", "DELTA": "D", "ECHO": "E", "FOXTROT": "F",
+    "GOLF": "G", "HOTEL": "H", "INDIA": "I", "JULIETT": "J", "JULIET": "J", "KILO": "K", "LIMA": "L",
+    "MIKE": "M", "NOVEMBER": "N", "OSCAR": "O", "PAPA": "P", "QUEBEC": "Q", "ROMEO": "R", "SIERRA": "S",
+    "TANGO": "T", "UNIFORM": "U", "VICTOR": "V", "WHISKEY": "W", "XRAY": "X", "YANKEE": "Y", "ZULU": "Z",
+}
+_IDENT_RODAJE = r"(?:%s|[A-Z]{1,2}\d{0,2})\b" % "|".join(_ALFABETO_FONETICO)
+_RE_RODAJE = re.compile(r"\bTWY\s+(%s(?:\s*,\s*%s)*)" % (_IDENT_RODAJE, _IDENT_RODAJE))
+_RE_NAVAID = re.compile(r"\b(ILS|LOC|GP|GS|VOR|DME|NDB|TACAN|VORTAC|GLS)\b")
+_RE_CERRADO = re.compile(r"\b(?:CLSD|CLOSED)\b")
+_RE_FUERA_SERVICIO = re.compile(r"(?:\bU/S\b|\bUNSERVICEABLE\b|\bOUT OF SERVICE\b|\bOTS\b|\bINOP\b|\bNOT AVBL\b|\bUNAVBL\b)")
+_RE_COMBUSTIBLE = re.compile(r"\bFUEL\b")
+_RE_AD_CERRADO = re.compile(r"\b(AD|AP|AIRPORT|AERODROME)\s+(CLSD|CLOSED)\b")
+_RE_UMBRAL_O_DISTANCIAS = re.compile(r"\b(THR DISPLACED|DISPLACED THR|DTHR|TORA|TODA|ASDA|LDA|DECLARED DIST)")
+_RE_SENALIZACION = re.compile(r"\b(MARKINGS?|SIGNS?)\b")
+_RE_ILS = re.compile(r"\b(ILS|LOC|GP|GS|GLS)\b")
+
+
+def normalizar_pista(ident):
+    """Lleva un designador de pista a dos dígitos (9 -> 09, 8R -> 08R)."""
+    numero = re.match(r"\d+", ident).group()
+    return numero.zfill(2) + ident[len(numero):]
+
+
+def _pistas(texto):
+    pistas = []
+    for extremo_1, extremo_2 in _RE_PISTA.findall(texto):
+        for ident in (extremo_1, extremo_2):
+            if ident and normalizar_pista(ident) not in pistas:
+                pistas.append(normalizar_pista(ident))
+    return tuple(pistas)
+
+
+def _rodajes(texto):
+    rodajes = []
+    for grupo in _RE_RODAJE.findall(texto):
+        for ident in grupo.split(","):
+            ident = _ALFABETO_FONETICO.get(ident.strip(), ident.strip())
+            if ident and ident not in rodajes:
+                rodajes.append(ident)
+    return tuple(rodajes)
+
+
+def _texto_operativo(condicion):
+    """Extrae el cuerpo del NOTAM: campo E) en formato OACI o el texto FAA sin encabezado."""
+    campo_e = _RE_CAMPO_E.search(condicion)
+    if campo_e:
+        texto = campo_e.group(1)
+    else:
+        texto = _RE_VIGENCIA_FAA.sub("", _RE_ENCABEZADO_FAA.sub("", condicion.strip()))
+    return " ".join(texto.split())
+
+
+def _categoria(q_code, palabra_clave, clase, texto):
+    if q_code:
+        categoria = _CATEGORIA_POR_Q.get(q_code[:2]) or _CATEGORIA_POR_LETRA_Q.get(q_code[0], OTROS)
+    elif palabra_clave in _CATEGORIA_POR_PALABRA:
+        categoria = _CATEGORIA_POR_PALABRA[palabra_clave]
+    elif clase == "LTA":
+        categoria = OTROS
+    elif _RE_PISTA.search(texto):
+        categoria = PISTA
+    else:
+        categoria = OTROS
+    if categoria in (AERODROMO, SERVICIOS, OTROS) and _RE_COMBUSTIBLE.search(texto):
+        categoria = COMBUSTIBLE
+    return categoria
+
+
+def _criticidad(fila):
+    # Los patrones están en mayúsculas, como los NOTAM; hay exports con partes en minúsculas
+    categoria, texto = fila["categoria"], fila["texto"].upper()
+    cerrado, fuera_servicio = fila["cerrado"], fila["fuera_servicio"]
+    if categoria == PISTA and (cerrado or _RE_UMBRAL_O_DISTANCIAS.search(texto)):
+        return CRITICO
+    if categoria == AERODROMO and _RE_AD_CERRADO.search(texto):
+        return CRITICO
+    if categoria == COMBUSTIBLE and (cerrado or fuera_servicio):
+        return CRITICO
+    if categoria == NAVAID and fuera_servicio and _RE_ILS.search(texto):
+        return CRITICO
+    if categoria == PISTA:
+        return RUTINARIO if _RE_SENALIZACION.search(texto) else RELEVANTE
+    if categoria in (ESPACIO_AEREO, PROCEDIMIENTOS):
+        return RELEVANTE
+    if categoria in (RODAJE, AERODROMO) and cerrado:
+        return RELEVANTE
+    if categoria in (ILUMINACION, NAVAID, COMUNICACIONES, COMBUSTIBLE) and (cerrado or fuera_servicio):
+        return RELEVANTE
+    return RUTINARIO
+
+
+def _fecha_utc(columna):
+    if pd.api.types.is_datetime64_any_dtype(columna):
+        return columna
+    texto = columna.astype("string").str.strip().str.replace(r"EST$", "", regex=True)
+    return pd.to_datetime(texto, format=FORMATO_FECHA_FAA, utc=True, errors="coerce")
+
+
+def parsear_notams(df):
+    """
+    Convierte el DataFrame del Excel de la FAA en una tabla tipada de NOTAMs.
+
+    La tabla tiene las columnas de `COLUMNAS_TABLA`; `inicio` y `fin` son
+    fechas UTC (`fin` vacío si el NOTAM es permanente) y `criticidad` es uno
+    de `NIVELES_CRITICIDAD`.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=COLUMNAS_TABLA)
+
+    condicion = df["Condition"].fillna("").astype(str)
+    clase = df["Class"].fillna("").astype(str).str.strip()
+
+    tabla = pd.DataFrame({
+        "location": df["Location"].fillna("").astype(str).str.strip(),
+        "notam_id": df["NOTAM #/LTA #"].fillna("").astype(str).str.strip(),
+        "clase": clase,
+        "q_code": condicion.str.extract(_RE_Q_CODE, expand=False).fillna(""),
+        "texto": condicion.map(_texto_operativo),
+    })
+    palabra_clave = condicion.str.extract(_RE_PALABRA_CLAVE_FAA, expand=False).fillna("")
+    texto_mayus = tabla["texto"].str.upper()
+
+    tabla["categoria"] = [
+        _categoria(q, palabra, cls, texto)
+        for q, palabra, cls, texto in zip(tabla["q_code"], palabra_clave, clase, texto_mayus)
+    ]
+    tabla["pistas"] = texto_mayus.map(_pistas)
+    tabla["rodajes"] = texto_mayus.map(_rodajes)
+    tabla["navaids"] = texto_mayus.map(lambda t: tuple(dict.fromkeys(_RE_NAVAID.findall(t))))
+    tabla["cerrado"] = texto_mayus.str.contains(_RE_CERRADO) | tabla["q_code"].str[2:].eq("LC")
+    tabla["fuera_servicio"] = texto_mayus.str.contains(_RE_FUERA_SERVICIO) | tabla["q_code"].str[2:].isin(["AS", "AU"])
+    tabla["inicio"] = _fecha_utc(df["Effective Date (UTC)"])
+    tabla["fin"] = _fecha_utc(df["Expiration Date (UTC)"])
+    if "Expiration PERM" in df.columns:
+        # Export leído con `faa.leer_excel_notams`: fechas ya tipadas y marcas aparte
+        tabla["permanente"] = df["Expiration PERM"].to_numpy(dtype=bool)
+        tabla["estimado"] = df["Expiration EST"].to_numpy(dtype=bool)
+    else:
+        expiracion = df["Expiration Date (UTC)"].fillna("").astype(str).str.strip().str.upper()
+        tabla["permanente"] = expiracion.eq("PERM")
+        tabla["estimado"] = expiracion.str.endswith("EST")
+    tabla["criticidad"] = tabla.apply(_criticidad, axis=1) if len(tabla) else []
+    return tabla[COLUMNAS_TABLA].reset_index(drop=True)
+
+
+def vigentes_entre(tabla, desde, hasta):
+    """Filtra los NOTAMs cuya vigencia se solapa con [desde, hasta]; un extremo vacío es abierto."""
+    empieza_antes = tabla["inicio"].isna() | (pd.isna(hasta) or tabla["inicio"] <= hasta)
+    termina_despues = tabla["fin"].isna() | (pd.isna(desde) or tabla["fin"] >= desde)
+    return tabla[empieza_antes & termina_despues]
+
+
+def proximo_cambio(tabla, ahora=None):
+    """Primer instante futuro en que algún NOTAM entra o sale de vigencia, o None."""
+    if tabla.empty:
+        return None
+    ahora = pd.Timestamp.now(tz="UTC") if ahora is None else pd.Timestamp(ahora)
+    instantes = pd.concat([tabla["inicio"], tabla["fin"]]).dropna()
+    futuros = instantes[instantes > ahora]
+    return futuros.min() if len(futuros) else None
+
+
+def _recortar(texto, max_caracteres):
+    return texto if len(texto) <= max_caracteres else texto[:max_caracteres - 1].rstrip() + "…"
+
+
+def vigencia_texto(fila):
+    """Vigencia legible de una fila de la tabla, p. ej. `2025-08-06 0300Z → PERM`."""
+    inicio = fila["inicio"].strftime(_FORMATO_VIGENCIA) if pd.notna(fila["inicio"]) else "?"
+    if fila["permanente"]:
+        fin = "PERM"
+    elif pd.notna(fila["fin"]):
+        fin = fila["fin"].strftime(_FORMATO_VIGENCIA) + (" EST" if fila["estimado"] else "")
+    else:
+        fin = "?"
+    return f"{inicio} → {fin}"
+
+
+def lineas_para_prompt(seleccion, max_caracteres=300):
+    """Una línea por NOTAM: criticidad, id, categoría, vigencia y texto recortado."""
+    return [
+        f"- [{fila['criticidad']}] {fila['notam_id']} {fila['categoria']} ({vigencia_texto(fila)}): {_recortar(fila['texto'], max_caracteres)}"
+        for _, fila in seleccion.iterrows()
+    ]
+
+
+def compactar_para_prompt(tabla, ahora=None, horizonte_horas=48, niveles=(CRITICO, RELEVANTE), max_caracteres=300):
+    """
+    Texto compacto con los NOTAMs de `niveles` vigentes en las próximas horas.
+
+    Los NOTAMs omitidos se resumen en una línea de conteo por categoría para
+    que la IA sepa que existen sin tener que leerlos.
+    """
+    ahora = pd.Timestamp.now(tz="UTC") if ahora is None else pd.Timestamp(ahora)
+    vigentes = vigentes_entre(tabla, ahora, ahora + pd.Timedelta(hours=horizonte_horas))
+    seleccion = vigentes[vigentes["criticidad"].isin(niveles)]
+    seleccion = seleccion.assign(
+        _orden=seleccion["criticidad"].map({nivel: i for i, nivel in enumerate(NIVELES_CRITICIDAD)})
+    ).sort_values(["_orden", "categoria", "inicio"])
+
+    lineas = lineas_para_prompt(seleccion, max_caracteres)
+    omitidos = len(tabla) - len(seleccion)
+    if omitidos:
+        conteo = tabla.drop(seleccion.index)["categoria"].value_counts()
+        detalle = ", ".join(f"{cantidad} {categoria}" for categoria, cantidad in conteo.items())
+        lineas.append(f"- Omitidos {omitidos} NOTAMs rutinarios o fuera de la ventana de {horizonte_horas} h ({detalle}).")
+    if not len(seleccion):
+        lineas.insert(0, "- Sin NOTAMs críticos ni relevantes en la ventana analizada.")
+    return "\n".join(lineas)
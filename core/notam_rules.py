@@ -0,0 +1,114 @@
+"""
+Pre-clasificador determinista de NOTAMs por aeropuerto.
+
+Sobre la tabla de `notam_parser` cruza los cierres de pista con las pistas
+reales del aeropuerto y decide si hace falta la IA: solo los aeropuertos con
+NOTAMs críticos vigentes se envían al modelo; el resto recibe al instante un
+resumen generado localmente.
+"""
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from core.notam_parser import (
+    CRITICO, RELEVANTE, PISTA, NIVELES_CRITICIDAD, vigentes_entre, normalizar_pista, vigencia_texto,
+)
+
+MAX_PUNTOS_RESUMEN_LOCAL = 10
+
+
+@dataclass
+class EvaluacionNotams:
+    """Resultado de las reglas locales para un aeropuerto."""
+    aeropuerto: str
+    tabla: pd.DataFrame
+    vigentes: pd.DataFrame
+    pistas_aeropuerto: list
+    cierres_pista: list = field(default_factory=list)
+
+    @property
+    def criticos(self):
+        return self.vigentes[self.vigentes["criticidad"] == CRITICO]
+
+    @property
+    def relevantes(self):
+        return self.vigentes[self.vigentes["criticidad"] == RELEVANTE]
+
+    @property
+    def requiere_ia(self):
+        return not self.criticos.empty
+
+
+def _cierres_de_pista(tabla):
+    return tabla[(tabla["categoria"] == PISTA) & tabla["cerrado"] & tabla["pistas"].map(bool)]
+
+
+def aplicar_reglas(tabla, pistas_aeropuerto):
+    """
+    Ajusta la criticidad de los cierres de pista según las pistas disponibles.
+
+    Un cierre que deja otras pistas operativas durante toda su vigencia baja a
+    RELEVANTE; si en algún momento no queda ninguna pista (o no conocemos las
+    pistas del aeropuerto) se mantiene CRÍTICO. Devuelve la tabla ajustada y
+    la lista de cierres con las pistas que quedan operativas.
+    """
+    tabla = tabla.copy()
+    disponibles = {normalizar_pista(p) for p in pistas_aeropuerto if p and p[0].isdigit()}
+    cierres = _cierres_de_pista(tabla)
+    detalle = []
+    for indice, cierre in cierres.iterrows():
+        # Cierres que coinciden en el tiempo con este también restan pistas
+        simultaneos = vigentes_entre(cierres, cierre["inicio"], cierre["fin"])
+        cerradas = {p for pistas in simultaneos["pistas"] for p in pistas}
+        operativas = sorted(disponibles - cerradas)
+        if disponibles and operativas:
+            tabla.at[indice, "criticidad"] = RELEVANTE
+        detalle.append({
+            "notam_id": cierre["notam_id"],
+            "pistas": "/".join(cierre["pistas"]),
+            "vigencia": vigencia_texto(cierre),
+            "operativas": operativas,
+        })
+    return tabla, detalle
+
+
+def evaluar_aeropuerto(tabla, aeropuerto, pistas_aeropuerto, ahora=None, horizonte_horas=48):
+    """Aplica las reglas y se queda con los NOTAMs vigentes en la ventana de análisis."""
+    ahora = pd.Timestamp.now(tz="UTC") if ahora is None else pd.Timestamp(ahora)
+    tabla, cierres = aplicar_reglas(tabla, pistas_aeropuerto)
+    vigentes = vigentes_entre(tabla, ahora, ahora + pd.Timedelta(hours=horizonte_horas))
+    cierres_vigentes = [c for c in cierres if c["notam_id"] in set(vigentes["notam_id"])]
+    return EvaluacionNotams(aeropuerto, tabla, vigentes, list(pistas_aeropuerto), cierres_vigentes)
+
+
+def texto_estado_pistas(evaluacion):
+    """Línea con las pistas del aeropuerto y los cierres vigentes."""
+    pistas = ", ".join(evaluacion.pistas_aeropuerto) if evaluacion.pistas_aeropuerto else "No encontradas"
+    if not evaluacion.cierres_pista:
+        return f"Pistas en {evaluacion.aeropuerto}: [{pistas}]. Sin cierres de pista en la ventana."
+    cierres = "; ".join(
+        f"RWY {c['pistas']} CLSD {c['vigencia']} (operativas: {', '.join(c['operativas']) or 'ninguna'})"
+        for c in evaluacion.cierres_pista
+    )
+    return f"Pistas en {evaluacion.aeropuerto}: [{pistas}]. Cierres: {cierres}"
+
+
+def resumen_local(evaluacion, horizonte_horas=48):
+    """Resumen en Markdown para aeropuertos sin NOTAMs críticos, sin llamar a la IA."""
+    lineas = [
+        f"✅ **{evaluacion.aeropuerto}**: sin NOTAMs críticos en las próximas {horizonte_horas} h "
+        f"(clasificación local, sin IA).",
+        "",
+        f"🛬 {texto_estado_pistas(evaluacion)}",
+    ]
+    relevantes = evaluacion.relevantes
+    relevantes = relevantes.assign(_no_pista=relevantes["categoria"] != PISTA).sort_values(["_no_pista", "categoria", "inicio"])
+    if not relevantes.empty:
+        lineas += ["", "**Puntos a considerar:**"]
+        for _, fila in relevantes.head(MAX_PUNTOS_RESUMEN_LOCAL).iterrows():
+            lineas.append(f"- **{fila['categoria']}** `{fila['notam_id']}` ({vigencia_texto(fila)}): {fila['texto']}")
+        if len(relevantes) > MAX_PUNTOS_RESUMEN_LOCAL:
+            lineas.append(f"- … y {len(relevantes) - MAX_PUNTOS_RESUMEN_LOCAL} NOTAMs relevantes más.")
+    conteo = evaluacion.tabla["criticidad"].value_counts().reindex(NIVELES_CRITICIDAD, fill_value=0)
+    lineas += ["", "**Total en el export:** " + ", ".join(f"{cantidad} {nivel}" for nivel, cantidad in conteo.items())]
+    return "\n".join(lineas)
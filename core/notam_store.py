@@ -0,0 +1,138 @@
+"""
+Almacén de la última descarga de NOTAMs por aeropuerto y sus diferencias.
+
+Cada export de la FAA se reduce a `{NOTAM #/LTA #: texto}` y se compara con
+la descarga anterior del mismo aeropuerto: NOTAMs nuevos, cancelados (ya no
+aparecen) y modificados (mismo identificador, otro texto). El registro guarda
+la descarga actual, la anterior y el análisis de IA de cada una, de modo que
+un refresco con pocos cambios solo envía a la IA el delta junto con el
+análisis previo, y la interfaz puede mostrar qué cambió. Vive en la caché
+persistente de `core.cache`, compartida entre procesos.
+"""
+import threading
+import time
+from dataclasses import dataclass, field
+
+from core.cache import obtener_cache
+
+TIPO_REGISTRO = "notam_registro"
+DIAS_REGISTRO = 7
+
+
+@dataclass
+class CambiosNotams:
+    """Diferencias entre dos descargas de un aeropuerto; cada campo es `{id: texto}`."""
+    nuevos: dict = field(default_factory=dict)
+    modificados: dict = field(default_factory=dict)
+    cancelados: dict = field(default_factory=dict)
+    desde: float = None
+
+    @property
+    def hay_cambios(self):
+        return bool(self.nuevos or self.modificados or self.cancelados)
+
+    @property
+    def total(self):
+        return len(self.nuevos) + len(self.modificados) + len(self.cancelados)
+
+
+def notams_por_id(df):
+    """`{NOTAM #/LTA #: texto}` de un export de la FAA, con los espacios normalizados."""
+    if df is None or df.empty:
+        return {}
+    ids = df["NOTAM #/LTA #"].fillna("").astype(str).str.strip()
+    textos = df["Condition"].fillna("").astype(str).map(lambda texto: " ".join(texto.split()))
+    return {notam_id: texto for notam_id, texto in zip(ids, textos) if notam_id}
+
+
+def comparar(anterior, actual, desde=None):
+    """`CambiosNotams` entre dos diccionarios de `notams_por_id`."""
+    return CambiosNotams(
+        nuevos={i: t for i, t in actual.items() if i not in anterior},
+        modificados={i: t for i, t in actual.items() if i in anterior and anterior[i] != t},
+        cancelados={i: t for i, t in anterior.items() if i not in actual},
+        desde=desde,
+    )
+
+
+class AlmacenNotams:
+    """
+    Última y penúltima descarga de NOTAMs por aeropuerto, con su análisis.
+
+    `registrar` es idempotente: volver a registrar la misma descarga (otra
+    recarga de la página, otra réplica) no borra los cambios ya calculados.
+    Cada leer-comparar-escribir es una transacción de la caché, así que
+    también es seguro entre procesos.
+    """
+
+    def __init__(self, cache=None):
+        self._cache = cache
+
+    @property
+    def cache(self):
+        return self._cache or obtener_cache()
+
+    def _leer(self, icao):
+        encontrado, registro = self.cache.obtener(TIPO_REGISTRO, icao)
+        return registro if encontrado else None
+
+    def _escribir(self, icao, registro):
+        self.cache.guardar(TIPO_REGISTRO, icao, registro, ttl=DIAS_REGISTRO * 86400)
+
+    def registrar(self, icao, df):
+        """
+        Guarda la descarga y devuelve sus `CambiosNotams` respecto de la anterior.
+
+        Devuelve `None` si es la primera descarga registrada del aeropuerto.
+        """
+        notams = notams_por_id(df)
+        with self.cache.transaccion():
+            registro = self._leer(icao)
+            if registro is not None and registro["actual"]["notams"] == notams:
+                anterior = registro["anterior"]
+                return None if anterior is None else comparar(anterior["notams"], notams, anterior["fecha"])
+            anterior = registro["actual"] if registro else None
+            self._escribir(icao, {
+                "actual": {"notams": notams, "fecha": time.time(), "analisis": None, "pistas": None},
+                "anterior": anterior,
+            })
+        return None if anterior is None else comparar(anterior["notams"], notams, anterior["fecha"])
+
+    def cambios(self, icao):
+        """Los `CambiosNotams` de la última descarga registrada, o `None`."""
+        registro = self._leer(icao)
+        if registro is None or registro["anterior"] is None:
+            return None
+        anterior = registro["anterior"]
+        return comparar(anterior["notams"], registro["actual"]["notams"], anterior["fecha"])
+
+    def analisis_previo(self, icao, pistas):
+        """Análisis de la descarga anterior, si se hizo con las mismas pistas."""
+        registro = self._leer(icao)
+        anterior = registro and registro["anterior"]
+        if not anterior or anterior["analisis"] is None or anterior["pistas"] != tuple(sorted(pistas or ())):
+            return None
+        return anterior["analisis"]
+
+    def guardar_analisis(self, icao, df, analisis, pistas):
+        """Asocia `analisis` a la descarga actual si sigue siendo la misma que `df`."""
+        notams = notams_por_id(df)
+        with self.cache.transaccion():
+            registro = self._leer(icao)
+            if registro is None or registro["actual"]["notams"] != notams:
+                return
+            registro["actual"].update(analisis=analisis, pistas=tuple(sorted(pistas or ())))
+            self._escribir(icao, registro)
+
+
+_almacen = None
+_almacen_lock = threading.Lock()
+
+
+def obtener_almacen():
+    """Almacén de NOTAMs compartido por el proceso."""
+    global _almacen
+    with _almacen_lock:
+        if _almacen is None:
+            _almacen = AlmacenNotams()
+        return _almacen
@@ -0,0 +1,199 @@
+"""
+Coalescencia de peticiones idénticas en curso (single-flight).
+
+Streamlit atiende todas las sesiones en hilos del mismo proceso. Al cambio de
+turno varios despachadores abren la misma página casi a la vez y, como la
+caché persistente solo sirve cuando la primera petición ya terminó, cada
+sesión lanzaría su propio scraping de la FAA o su propia consulta a la IA con
+los mismos datos. Aquí la primera petición de cada clave (un aeropuerto, una
+estación o el hash del contenido de un análisis) la ejecuta y las que llegan
+mientras sigue en curso esperan su mismo `Future`: la carga del navegador y
+de los modelos queda proporcional a los aeropuertos distintos, no a las
+sesiones. Entre procesos (otra réplica, `scraper.py`) sigue mandando la caché.
+
+Quien se une a una petición en curso deja un tramo en `core.trazas`
+(`en_curso.<tipo>`, con la espera) y avisa al observador de su hilo
+(`avisos`), que las páginas usan para mostrar que se unieron a una petición
+existente. `FLEXWATCH_COALESCENCIA=0` la desactiva.
+"""
+import os
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from core import trazas
+
+ACTIVA = os.environ.get("FLEXWATCH_COALESCENCIA", "1") != "0"
+DESCRIPCIONES = {
+    "notam": "descarga de NOTAMs",
+    "taf": "TAF",
+    "notam_ia": "análisis de IA de NOTAMs",
+    "taf_ia": "análisis de IA del TAF",
+    "metar_ia": "tendencia de IA de los METAR",
+    "vuelo_ia": "análisis de IA del vuelo",
+    "ia": "consulta a la IA",
+}
+
+_en_curso = {}
+_contadores = {}
+_lock = threading.Lock()
+_hilo = threading.local()
+
+
+class PeticionAbandonada(Exception):
+    """Quien ejecutaba la petición dejó de leerla (p. ej. cerró un streaming) antes de terminar."""
+
+
+def describir(tipo, etiquetas):
+    """Texto de un aviso: `'descarga de NOTAMs: SKBO, SKRG'`."""
+    descripcion = DESCRIPCIONES.get(tipo) or ("METAR" if tipo.startswith("metar_") else tipo)
+    return f"{descripcion}: {', '.join(str(e) for e in etiquetas)}"
+
+
+def observar(al_unirse):
+    """
+    Fija el aviso `al_unirse(tipo, etiquetas)` de este hilo (`None` lo quita)
+    y devuelve el anterior. Los hilos trabajadores de una sola ejecución (p. ej.
+    los del planificador del health check) lo fijan al arrancar.
+    """
+    anterior = getattr(_hilo, "al_unirse", None)
+    _hilo.al_unirse = al_unirse
+    return anterior
+
+
+@contextmanager
+def avisos(al_unirse):
+    """`al_unirse(tipo, etiquetas)` cada vez que este hilo se une a una petición en curso dentro del bloque."""
+    anterior = observar(al_unirse)
+    try:
+        yield
+    finally:
+        observar(anterior)
+
+
+def _avisar(tipo, etiquetas):
+    al_unirse = getattr(_hilo, "al_unirse", None)
+    if al_unirse is None:
+        return
+    try:
+        al_unirse(tipo, etiquetas)
+    except Exception as e:
+        print(f"ERROR: Falló el aviso de petición compartida: {e}")
+
+
+def reclamar(tipo, claves, etiqueta=None):
+    """
+    Reparte `claves` entre las que ejecuta quien llama y las que ya están en curso.
+
+    Devuelve `(propias, ajenas)`, ambos `{clave: Future}`. Las propias se
+    resuelven con `liderar`; las ajenas se esperan con `esperar`. El aviso
+    muestra `etiqueta` o, sin ella, las claves compartidas.
+    """
+    propias, ajenas = {}, {}
+    with _lock:
+        for clave in dict.fromkeys(claves):
+            futuro = _en_curso.get((tipo, clave)) if ACTIVA else None
+            if futuro is None:
+                futuro = Future()
+                if ACTIVA:
+                    _en_curso[(tipo, clave)] = futuro
+                propias[clave] = futuro
+            else:
+                ajenas[clave] = futuro
+        contador = _contadores.setdefault(tipo, {"propias": 0, "unidas": 0})
+        contador["propias"] += len(propias)
+        contador["unidas"] += len(ajenas)
+    if ajenas:
+        _avisar(tipo, [etiqueta] if etiqueta is not None else list(ajenas))
+    return propias, ajenas
+
+
+@contextmanager
+def liderar(tipo, propias):
+    """
+    Bloque que calcula las claves `propias`: rellena el diccionario que se
+    entrega con `{clave: valor}`. Al salir se retiran de curso y sus futuros se
+    resuelven (las claves que falten, con `None`); si el bloque falla, quienes
+    esperaban reciben la misma excepción.
+
+    Quien lidera debe guardar en la caché antes de salir, para que lo que
+    llegue después la encuentre.
+    """
+    resultados = {}
+    try:
+        yield resultados
+    except BaseException as e:
+        error = e if isinstance(e, Exception) else PeticionAbandonada(f"{tipo} abandonada: {type(e).__name__}")
+        _retirar(tipo, propias)
+        for futuro in propias.values():
+            futuro.set_exception(error)
+        raise
+    _retirar(tipo, propias)
+    for clave, futuro in propias.items():
+        futuro.set_result(resultados.get(clave))
+
+
+def _retirar(tipo, claves):
+    with _lock:
+        for clave in claves:
+            _en_curso.pop((tipo, clave), None)
+
+
+def esperar(tipo, ajenas):
+    """`{clave: valor}` de las peticiones en curso de otros; la espera queda en `en_curso.<tipo>`."""
+    if not ajenas:
+        return {}
+    with trazas.tramo(f"en_curso.{tipo}", claves=len(ajenas)):
+        return {clave: futuro.result() for clave, futuro in ajenas.items()}
+
+
+def ejecutar(tipo, clave, calcular, etiqueta=None):
+    """`calcular()` una sola vez por `(tipo, clave)` entre todos los hilos que lo piden a la vez."""
+    propias, ajenas = reclamar(tipo, [clave], etiqueta)
+    if ajenas:
+        return esperar(tipo, ajenas)[clave]
+    with liderar(tipo, propias) as resultados:
+        resultados[clave] = calcular()
+    return resultados[clave]
+
+
+def transmitir(tipo, clave, transmitir_fn, etiqueta=None):
+    """
+    Versión en streaming de `ejecutar`: quien lidera reenvía los fragmentos de
+    `transmitir_fn()` a medida que llegan y quienes se unen reciben la
+    respuesta completa de una vez. Si el líder abandona el streaming, el
+    primero que esperaba lo vuelve a pedir.
+    """
+    propias, ajenas = reclamar(tipo, [clave], etiqueta)
+    if ajenas:
+        try:
+            respuesta = esperar(tipo, ajenas)[clave]
+        except PeticionAbandonada:
+            yield from transmitir(tipo, clave, transmitir_fn, etiqueta)
+            return
+        yield respuesta
+        return
+    with liderar(tipo, propias) as resultados:
+        partes = []
+        for texto in transmitir_fn():
+            partes.append(texto)
+            yield texto
+        resultados[clave] = "".join(partes)
+
+
+def estadisticas():
+    """`{tipo: {propias, unidas}}` de este proceso, más las peticiones que siguen `en_curso`."""
+    with _lock:
+        copia = {tipo: dict(datos) for tipo, datos in _contadores.items()}
+        en_curso = len(_en_curso)
+    copia["total"] = {
+        "propias": sum(datos["propias"] for datos in copia.values()),
+        "unidas": sum(datos["unidas"] for datos in copia.values()),
+        "en_curso": en_curso,
+    }
+    return copia
+
+
+def limpiar_estadisticas():
+    with _lock:
+        _contadores.clear()
@@ -0,0 +1,204 @@
+"""
+Precalentamiento en segundo plano de la red de aeropuertos.
+
+Descarga TAF/METAR y NOTAMs de toda la red (`core.red`) y ejecuta sus
+análisis de IA para dejar la caché compartida (`core.cache`) caliente: un
+briefing de un aeropuerto de la red se sirve entonces sin esperar a la FAA,
+a aviationweather.gov ni a la IA. Las ejecuciones se alinean con los ciclos
+de emisión de TAF (y se repiten cada `INTERVALO_SEGUNDOS` entre ciclos para
+seguir a los NOTAMs y METAR), con un desfase aleatorio para que varias
+réplicas no consulten a la vez. Los turnos caen en las mismas horas para
+todas las réplicas: la primera que toma uno lo marca en la caché y las demás
+lo saltan.
+
+Puede correr como hilo dentro de la app (`iniciar_en_segundo_plano`, con
+`FLEXWATCH_PRECARGA=1`; desactivado por defecto) o como proceso aparte:
+`python -m core.precarga [--una-vez]`. El hilo lo arranca `Main.py` la
+primera vez que se abre, así que una sesión que entra directo a otra página
+no lo inicia.
+"""
+import argparse
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from core import analisis, faa, red, runways, weather
+from core.cache import obtener_cache
+from core.scheduler import PlanificadorRecursos
+
+# Los TAF de 00/06/12/18 UTC se emiten unos 20-40 minutos antes de su validez
+HORAS_CICLO_TAF_UTC = (5, 11, 17, 23)
+MINUTO_CICLO_TAF = 45
+INTERVALO_SEGUNDOS = int(os.environ.get("FLEXWATCH_PRECARGA_INTERVALO", "900"))
+JITTER_SEGUNDOS = int(os.environ.get("FLEXWATCH_PRECARGA_JITTER", "120"))
+JITTER_TAREA_SEGUNDOS = 2.0
+LIMITES_PRECARGA = {"notam": 1, "wx": 2, "ia": int(os.environ.get("FLEXWATCH_PRECARGA_IA", "2"))}
+
+
+def habilitada():
+    """El hilo de precarga dentro de la app se activa con `FLEXWATCH_PRECARGA=1`."""
+    return os.environ.get("FLEXWATCH_PRECARGA", "").strip().lower() in ("1", "true", "si", "sí")
+
+
+def proximo_ciclo_taf(ahora=None):
+    """Fecha UTC del próximo ciclo de emisión de TAF posterior a `ahora`."""
+    ahora = ahora or datetime.now(timezone.utc)
+    base = ahora.replace(minute=MINUTO_CICLO_TAF, second=0, microsecond=0)
+    candidatos = [
+        base.replace(hour=hora) + timedelta(days=dia)
+        for dia in (0, 1) for hora in HORAS_CICLO_TAF_UTC
+    ]
+    return min(c for c in candidatos if c > ahora)
+
+
+def turno_vigente(ahora=None, intervalo=INTERVALO_SEGUNDOS):
+    """Inicio del turno de precarga en curso: el último múltiplo de `intervalo` (UTC)."""
+    ahora = ahora or datetime.now(timezone.utc)
+    return datetime.fromtimestamp(ahora.timestamp() // intervalo * intervalo, timezone.utc)
+
+
+def proximo_turno(ahora=None, intervalo=INTERVALO_SEGUNDOS):
+    """El próximo ciclo de TAF o el próximo múltiplo de `intervalo`, lo que llegue antes (sin desfase)."""
+    ahora = ahora or datetime.now(timezone.utc)
+    return min(proximo_ciclo_taf(ahora), turno_vigente(ahora, intervalo) + timedelta(seconds=intervalo))
+
+
+def _tomar_turno(turno, duracion):
+    """Marca el turno en la caché compartida; `False` si otra réplica ya lo tomó."""
+    cache = obtener_cache()
+    encontrado, _ = cache.obtener("precarga", "red", turno)
+    if encontrado:
+        return False
+    cache.guardar("precarga", "red", os.getpid(), ttl=duracion, contenido=turno)
+    return True
+
+
+def _con_jitter(fn, *args, **kwargs):
+    time.sleep(random.uniform(0, JITTER_TAREA_SEGUNDOS))
+    return fn(*args, **kwargs)
+
+
+def precargar_red(aeropuertos=None, incluir_notams=True, incluir_ia=True, download_dir="descargas_notam", limites=None):
+    """
+    Una pasada completa de precarga; devuelve un resumen con los conteos y la duración.
+
+    Todo pasa por las mismas funciones que usan las páginas, así que lo que ya
+    está vigente en la caché no se vuelve a pedir.
+    """
+    aeropuertos = list(aeropuertos or red.aeropuertos_red())
+    inicio = time.monotonic()
+    resumen = {"aeropuertos": len(aeropuertos), "tafs": 0, "metars": 0, "notams": 0, "analisis_ia": 0, "errores": 0}
+    indice = runways.obtener_indice()
+    with PlanificadorRecursos(limites or LIMITES_PRECARGA) as planificador:
+        tafs = planificador.enviar("wx", weather.obtener_tafs, aeropuertos)
+        metars = planificador.enviar("wx", weather.obtener_metars, aeropuertos)
+        notams = planificador.enviar("notam", faa.buscar_notams_por_lote, aeropuertos, download_dir=download_dir) if incluir_notams else None
+
+        tareas = []
+        for nombre, futuro in (("tafs", tafs), ("metars", metars), ("notams", notams)):
+            if futuro is None:
+                continue
+            try:
+                datos = futuro.result()
+            except Exception as e:
+                print(f"ERROR: Precarga de {nombre} fallida: {e}")
+                resumen["errores"] += 1
+                continue
+            resumen[nombre] = sum(1 for valor in datos.values() if valor is not None and len(valor))
+            if not incluir_ia:
+                continue
+            for icao, valor in datos.items():
+                if valor is None or not len(valor):
+                    continue
+                if nombre == "tafs":
+                    tareas.append(planificador.enviar("ia", _con_jitter, analisis.analizar_taf, valor, icao))
+                elif nombre == "metars":
+                    tareas.append(planificador.enviar("ia", _con_jitter, analisis.analizar_metars, tuple(valor), icao))
+                else:
+                    tareas.append(planificador.enviar("ia", _con_jitter, analisis.analizar_notams, valor, icao, indice.cabeceras(icao)))
+
+        for tarea in tareas:
+            try:
+                tarea.result()
+                resumen["analisis_ia"] += 1
+            except Exception as e:
+                print(f"ERROR: Análisis de precarga fallido: {e}")
+                resumen["errores"] += 1
+    resumen["segundos"] = round(time.monotonic() - inicio, 1)
+    return resumen
+
+
+class Precalentador(threading.Thread):
+    """Hilo que repite `precargar_red` en cada `proximo_turno` hasta que se detiene."""
+
+    def __init__(self, aeropuertos=None, intervalo=INTERVALO_SEGUNDOS, jitter=JITTER_SEGUNDOS, **opciones):
+        super().__init__(name="flexwatch-precarga", daemon=True)
+        self.aeropuertos = aeropuertos
+        self.intervalo = intervalo
+        self.jitter = jitter
+        self.opciones = opciones
+        self.ultimo_resumen = None
+        self._detener = threading.Event()
+
+    def detener(self):
+        self._detener.set()
+
+    def ejecutar_turno(self, turno):
+        if not _tomar_turno(turno.strftime("%Y%m%dT%H%M"), self.intervalo * 2):
+            print("INFO: Otra réplica ya está precargando la red; se omite este turno.")
+            return None
+        self.ultimo_resumen = precargar_red(self.aeropuertos, **self.opciones)
+        print(f"INFO: Precarga de la red completada: {self.ultimo_resumen}")
+        return self.ultimo_resumen
+
+    def run(self):
+        # Al arrancar se toma el turno en curso; el desfase escalona a las réplicas que inician juntas
+        turno = turno_vigente(intervalo=self.intervalo)
+        espera = random.uniform(0, self.jitter)
+        while not self._detener.wait(espera):
+            try:
+                self.ejecutar_turno(turno)
+            except Exception as e:
+                print(f"ERROR: Precarga de la red fallida: {e}")
+            ahora = datetime.now(timezone.utc)
+            turno = proximo_turno(ahora, self.intervalo)
+            espera = (turno - ahora).total_seconds() + random.uniform(0, self.jitter)
+
+
+_precalentador = None
+_precalentador_lock = threading.Lock()
+
+
+def iniciar_en_segundo_plano(**opciones):
+    """Arranca (una vez por proceso) el hilo de precarga y lo devuelve."""
+    global _precalentador
+    with _precalentador_lock:
+        if _precalentador is None or not _precalentador.is_alive():
+            _precalentador = Precalentador(**opciones)
+            _precalentador.start()
+        return _precalentador
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precarga TAF/METAR, NOTAMs y análisis de IA de la red en la caché compartida.")
+    parser.add_argument("--una-vez", action="store_true", help="Ejecuta una sola pasada y termina.")
+    parser.add_argument("--aeropuertos", help="Códigos ICAO separados por coma (por defecto, toda la red).")
+    parser.add_argument("--sin-ia", action="store_true", help="Solo descarga los datos, sin análisis de IA.")
+    args = parser.parse_args()
+    aeropuertos = [a.strip().upper() for a in args.aeropuertos.split(",") if a.strip()] if args.aeropuertos else None
+    if args.una_vez:
+        print(f"INFO: Precarga de la red completada: {precargar_red(aeropuertos, incluir_ia=not args.sin_ia)}")
+        return
+    precalentador = Precalentador(aeropuertos, incluir_ia=not args.sin_ia)
+    precalentador.start()
+    try:
+        while precalentador.is_alive():
+            precalentador.join(timeout=1)
+    except KeyboardInterrupt:
+        precalentador.detener()
+
+
+if __name__ == "__main__":
+    main()
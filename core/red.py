@@ -0,0 +1,27 @@
+"""
+Red de aeropuertos de la operación.
+
+Es la lista que las páginas de WX y NOTAM ofrecen por país y la que el
+precalentador (`core.precarga`) mantiene caliente en la caché compartida.
+"""
+import os
+
+AEROPUERTOS_POR_PAIS = {
+    "🇺🇸 Estados Unidos": ["KMIA", "KLAX", "KJFK"], "🇨🇴 Colombia": ["SKBO", "SKRG"], "🇧🇷 Brasil": ["SBFL", "SBEG", "SBKP","SBVT"],
+    "🇲🇽 México": ["MMGL", "MMSM"], "🇪🇨 Ecuador": ["SEQM", "SEGU"], "🇦🇷 Argentina": ["SAEZ"],
+    "🇨🇱 Chile": ["SCEL"], "🇵🇪 Perú": ["SPJC"], "🇨🇷 Costa Rica": ["MROC"],
+    "🇸🇻 El Salvador": ["MSLP"], "🇺🇾 Uruguay": ["SUMU"], "🇬🇹 Guatemala": ["MGGT"],
+}
+
+
+def aeropuertos_red():
+    """
+    Códigos ICAO de la red, sin repetir y en orden.
+
+    `FLEXWATCH_RED_EXTRA` (códigos separados por coma) añade aeropuertos que
+    no aparecen en la selección por país.
+    """
+    extra = os.environ.get("FLEXWATCH_RED_EXTRA", "")
+    codigos = [icao for aeropuertos in AEROPUERTOS_POR_PAIS.values() for icao in aeropuertos]
+    codigos += [c.strip().upper() for c in extra.split(",") if c.strip()]
+    return list(dict.fromkeys(codigos))
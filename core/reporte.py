@@ -0,0 +1,70 @@
+"""
+Reporte PDF del health check de un itinerario.
+
+`fpdf` se importa al generar el primer reporte: cargarlo cuesta casi medio
+segundo y solo hace falta cuando hay un análisis que exportar.
+"""
+from datetime import datetime
+
+from core import trazas
+
+_clase_pdf = None
+
+
+def _hora(valor):
+    """Solo la hora de un STD/STA con fecha (`'2024-05-01 13:05'` -> `'13:05'`)."""
+    texto = str(valor)
+    return texto.split(" ")[-1] if " " in texto else texto
+
+
+def _pdf():
+    global _clase_pdf
+    if _clase_pdf is None:
+        from fpdf import FPDF
+
+        class PDF(FPDF):
+            def header(self):
+                self.set_font('Helvetica', 'B', 12)
+                self.cell(0, 10, 'Briefing Operacional', 0, 1, 'C')
+                self.ln(5)
+
+            def footer(self):
+                self.set_y(-15)
+                self.set_font('Helvetica', 'I', 8)
+                self.cell(0, 10, f'Página {self.page_no()}', 0, 0, 'C')
+
+        _clase_pdf = PDF
+    return _clase_pdf()
+
+
+@trazas.medido("pdf.reporte")
+def crear_reporte_pdf(df_reporte):
+    """PDF (bytes) con el análisis de cada vuelo de `df_reporte` (columna `AI_Analysis`)."""
+    pdf = _pdf()
+    pdf.add_page()
+    pdf.set_auto_page_break(auto=True, margin=15)
+
+    pdf.set_font('Helvetica', 'B', 16)
+    fecha_reporte = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    pdf.cell(0, 10, f"Análisis de Itinerario - {fecha_reporte}", 0, 1, 'L')
+    pdf.set_font('Helvetica', 'I', 10)
+    pdf.cell(0, 10, "(Todas las horas en UTC)", 0, 1, 'L')
+    pdf.ln(10)
+
+    for _, fila in df_reporte.iterrows():
+        pdf.set_font('Helvetica', 'B', 12)
+        pdf.cell(0, 10, f"Vuelo: {fila['Flight']} ({fila['From_IATA']} -> {fila['To_IATA']})", 0, 1)
+
+        pdf.set_font('Helvetica', '', 10)
+        pdf.cell(0, 10, f"Matrícula: {fila['Reg.'] or 'N/A'}  |  STD (UTC): {_hora(fila['STD'])}  |  STA (UTC): {_hora(fila['STA'])}", 0, 1)
+
+        pdf.set_font('Helvetica', '', 10)
+        pdf.multi_cell(0, 5, fila['AI_Analysis'].encode('latin-1', 'replace').decode('latin-1'))
+
+        pdf.ln(5)
+        pdf.line(pdf.get_x(), pdf.get_y(), pdf.get_x() + 190, pdf.get_y())
+        pdf.ln(5)
+
+    # fpdf2 devuelve un bytearray; el fpdf original, un str en latin-1
+    salida = pdf.output(dest='S')
+    return salida.encode('latin-1') if isinstance(salida, str) else bytes(salida)
@@ -0,0 +1,94 @@
+"""
+Índice de pistas por aeropuerto a partir de `assets/runways.csv` (OurAirports).
+
+El CSV se compila una vez en el dataset binario de `core.dataset`, donde las
+pistas están agrupadas por `airport_ident` con sus desplazamientos: cada
+consulta va directa a las filas del aeropuerto en lugar de recorrer las 47k
+pistas. Las pistas cerradas se marcan y no cuentan como disponibles.
+"""
+import os
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from core import dataset
+
+RUTA_PISTAS = os.path.join("assets", "runways.csv")
+COLUMNAS_PISTAS = ["airport_ident", "length_ft", "surface", "closed", "le_ident", "he_ident"]
+
+Pista = namedtuple("Pista", ["le_ident", "he_ident", "length_ft", "surface", "closed"])
+
+
+def leer_csv(ruta=RUTA_PISTAS):
+    """Lee solo las columnas de `runways.csv` que usa la aplicación."""
+    return pd.read_csv(
+        ruta,
+        usecols=COLUMNAS_PISTAS,
+        dtype={"airport_ident": str, "le_ident": str, "he_ident": str, "surface": str},
+    )
+
+
+class IndicePistas:
+    """Pistas agrupadas por aeropuerto con búsqueda directa por código ICAO."""
+
+    def __init__(self, datos):
+        self._datos = datos
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._datos.numero_aeropuertos()
+
+    def __contains__(self, icao):
+        return self._datos.contiene_aeropuerto(icao)
+
+    def pistas(self, icao):
+        """Tupla de `Pista` (cabeceras, longitud, superficie, cerrada) del aeropuerto."""
+        icao = (icao or "").strip().upper()
+        with self._lock:
+            if icao in self._cache:
+                return self._cache[icao]
+        resultado = tuple(
+            Pista(
+                fila["le_ident"].decode("utf-8") or None,
+                fila["he_ident"].decode("utf-8") or None,
+                None if np.isnan(fila["length_ft"]) else int(fila["length_ft"]),
+                self._datos.superficie(int(fila["surface"])),
+                bool(fila["closed"]),
+            )
+            for fila in self._datos.filas_pistas(icao)
+        )
+        with self._lock:
+            self._cache[icao] = resultado
+        return resultado
+
+    def cabeceras(self, icao, incluir_cerradas=False):
+        """Lista ordenada de cabeceras (p. ej. `['08L', '26R']`) del aeropuerto."""
+        idents = set()
+        for pista in self.pistas(icao):
+            if pista.closed and not incluir_cerradas:
+                continue
+            idents.update(i for i in (pista.le_ident, pista.he_ident) if i)
+        return sorted(idents)
+
+    def cabeceras_por_lote(self, aeropuertos, incluir_cerradas=False):
+        """`{icao: cabeceras}` para todos los aeropuertos de un itinerario o briefing."""
+        return {
+            icao: self.cabeceras(icao, incluir_cerradas)
+            for icao in dict.fromkeys(a for a in aeropuertos if isinstance(a, str) and a)
+        }
+
+
+_indice = None
+_indice_lock = threading.Lock()
+
+
+def obtener_indice(ruta=dataset.RUTA_DATASET):
+    """Índice de pistas compartido por el proceso sobre el dataset compilado."""
+    global _indice
+    with _indice_lock:
+        if _indice is None:
+            _indice = IndicePistas(dataset.obtener_dataset(ruta))
+        return _indice
@@ -0,0 +1,104 @@
+"""
+Planificador de tareas con límites de concurrencia por recurso.
+
+Cada recurso (scraping de NOTAM, API meteorológica, modelos de IA) tiene su
+propio grupo de hilos, de modo que una ráfaga de llamadas a la IA no deja sin
+turno a las descargas y viceversa. Las tareas que dependen de otras se
+programan con `despues_de`, que no bloquea ningún hilo mientras espera.
+"""
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+LIMITES_POR_DEFECTO = {"notam": 2, "wx": 8, "ia": 4}
+
+
+class PlanificadorRecursos:
+    """
+    Ejecuta funciones en paralelo respetando un límite por recurso.
+
+    `inicializar_hilo` se llama al arrancar cada hilo trabajador; las páginas
+    lo usan para adjuntar el contexto de Streamlit a los hilos.
+    """
+
+    def __init__(self, limites=None, inicializar_hilo=None):
+        self.limites = dict(LIMITES_POR_DEFECTO if limites is None else limites)
+        self._ejecutores = {
+            recurso: ThreadPoolExecutor(
+                max_workers=max(1, limite),
+                thread_name_prefix=f"flexwatch-{recurso}",
+                initializer=inicializar_hilo,
+            )
+            for recurso, limite in self.limites.items()
+        }
+
+    def enviar(self, recurso, fn, *args, **kwargs):
+        """Programa `fn(*args, **kwargs)` en el grupo de hilos de `recurso`."""
+        try:
+            ejecutor = self._ejecutores[recurso]
+        except KeyError:
+            raise ValueError(f"Recurso desconocido: {recurso}") from None
+        return ejecutor.submit(fn, *args, **kwargs)
+
+    def despues_de(self, dependencias, recurso, fn, *args, **kwargs):
+        """
+        Programa `fn` en `recurso` cuando terminen todas las `dependencias`.
+
+        Si alguna dependencia falla, el futuro devuelto falla con la misma
+        excepción sin ejecutar `fn`.
+        """
+        resultado = Future()
+        pendientes = list(dependencias)
+        if not pendientes:
+            _encadenar(self.enviar(recurso, fn, *args, **kwargs), resultado)
+            return resultado
+
+        restantes = [len(pendientes)]
+        lock = threading.Lock()
+
+        def _dependencia_lista(_):
+            with lock:
+                restantes[0] -= 1
+                if restantes[0]:
+                    return
+            for dependencia in pendientes:
+                if dependencia.exception() is not None:
+                    resultado.set_exception(dependencia.exception())
+                    return
+            try:
+                _encadenar(self.enviar(recurso, fn, *args, **kwargs), resultado)
+            except Exception as e:
+                resultado.set_exception(e)
+
+        for dependencia in pendientes:
+            dependencia.add_done_callback(_dependencia_lista)
+        return resultado
+
+    def cerrar(self, esperar=True):
+        for ejecutor in self._ejecutores.values():
+            ejecutor.shutdown(wait=esperar, cancel_futures=not esperar)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar(esperar=exc[0] is None)
+        return False
+
+
+def _encadenar(origen, destino):
+    """Copia el resultado (o la excepción) de `origen` en `destino`."""
+    def _copiar(futuro):
+        if futuro.cancelled():
+            destino.cancel()
+        elif futuro.exception() is not None:
+            destino.set_exception(futuro.exception())
+        else:
+            destino.set_result(futuro.result())
+    origen.add_done_callback(_copiar)
+
+
+def en_orden_de_llegada(futuros):
+    """Itera `(clave, futuro)` de un dict `{clave: futuro}` a medida que terminan."""
+    claves = {futuro: clave for clave, futuro in futuros.items()}
+    for futuro in as_completed(claves):
+        yield claves[futuro], futuro
@@ -0,0 +1,156 @@
+"""
+Trazas ligeras por etapa: duración, resultado y atributos de cada tramo.
+
+Cada tramo (`with tramo("faa.tabla", aeropuertos=3):`) se guarda en un búfer
+circular en memoria del proceso, del que la vista de métricas calcula p50/p95
+por etapa. Con `FLEXWATCH_TRAZAS_ARCHIVO` cada tramo se añade además como una
+línea JSON a ese archivo, y con `FLEXWATCH_METRICAS_PUERTO` un hilo sirve
+`/metrics` en formato de texto de Prometheus. Registrar un tramo cuesta unos
+microsegundos, así que la instrumentación está siempre activa.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+CAPACIDAD = int(os.environ.get("FLEXWATCH_TRAZAS_CAPACIDAD", "5000"))
+ARCHIVO_TRAZAS = os.environ.get("FLEXWATCH_TRAZAS_ARCHIVO") or None
+PUERTO_METRICAS = int(os.environ.get("FLEXWATCH_METRICAS_PUERTO", "0"))
+CUANTILES = (0.5, 0.95)
+
+_tramos = deque(maxlen=CAPACIDAD)
+_lock = threading.Lock()
+_archivo_lock = threading.Lock()
+
+
+def registrar(nombre, inicio, duracion, ok=True, error=None, **atributos):
+    """Guarda un tramo ya medido (`inicio` en epoch, `duracion` en segundos)."""
+    registro = {"etapa": nombre, "inicio": inicio, "duracion": duracion, "ok": ok, "hilo": threading.current_thread().name}
+    if error:
+        registro["error"] = error
+    if atributos:
+        registro["atributos"] = atributos
+    with _lock:
+        _tramos.append(registro)
+    if ARCHIVO_TRAZAS:
+        linea = json.dumps(registro, ensure_ascii=False, default=str)
+        with _archivo_lock:
+            with open(ARCHIVO_TRAZAS, "a", encoding="utf-8") as f:
+                f.write(linea + "\n")
+    return registro
+
+
+@contextmanager
+def tramo(nombre, **atributos):
+    """
+    Mide el bloque como un tramo de la etapa `nombre`.
+
+    Devuelve el diccionario de atributos, que el bloque puede completar (p. ej.
+    con el tamaño de la respuesta). Una excepción marca el tramo como fallido
+    y se propaga.
+    """
+    inicio, reloj = time.time(), time.perf_counter()
+    try:
+        yield atributos
+    except BaseException as e:
+        registrar(nombre, inicio, time.perf_counter() - reloj, ok=False, error=f"{type(e).__name__}: {e}"[:300], **atributos)
+        raise
+    registrar(nombre, inicio, time.perf_counter() - reloj, **atributos)
+
+
+def medido(nombre):
+    """Decorador: cada llamada a la función es un tramo de la etapa `nombre`."""
+    def decorador(fn):
+        @wraps(fn)
+        def envoltura(*args, **kwargs):
+            with tramo(nombre):
+                return fn(*args, **kwargs)
+        return envoltura
+    return decorador
+
+
+def tramos(desde=None, etapa=None):
+    """Copia de los tramos del búfer, opcionalmente desde un epoch y de una etapa."""
+    with _lock:
+        copia = list(_tramos)
+    return [t for t in copia if (desde is None or t["inicio"] >= desde) and (etapa is None or t["etapa"] == etapa)]
+
+
+def resumen_por_etapa(desde=None):
+    """Por etapa: tramos, fallos, p50/p95/máximo en ms y total en segundos, ordenado por tiempo total."""
+    por_etapa = {}
+    for t in tramos(desde):
+        por_etapa.setdefault(t["etapa"], []).append(t)
+    resumen = []
+    for etapa, lista in por_etapa.items():
+        duraciones = np.array([t["duracion"] for t in lista])
+        p50, p95 = np.quantile(duraciones, CUANTILES) * 1000
+        resumen.append({
+            "etapa": etapa, "tramos": len(lista), "fallos": sum(1 for t in lista if not t["ok"]),
+            "p50_ms": float(p50), "p95_ms": float(p95), "max_ms": float(duraciones.max() * 1000), "total_s": float(duraciones.sum()),
+            "ultimo": max(t["inicio"] for t in lista),
+        })
+    return sorted(resumen, key=lambda r: -r["total_s"])
+
+
+def texto_prometheus():
+    """Las etapas del búfer como un `summary` de Prometheus más un contador de fallos."""
+    lineas = [
+        "# HELP flexwatch_etapa_segundos Duración de los tramos por etapa (búfer en memoria).",
+        "# TYPE flexwatch_etapa_segundos summary",
+    ]
+    fallos = []
+    for r in resumen_por_etapa():
+        etiqueta = r["etapa"].replace("\\", "\\\\").replace('"', '\\"')
+        for cuantil, valor in zip(CUANTILES, (r["p50_ms"], r["p95_ms"])):
+            lineas.append(f'flexwatch_etapa_segundos{{etapa="{etiqueta}",quantile="{cuantil}"}} {valor / 1000:.6f}')
+        lineas.append(f'flexwatch_etapa_segundos_sum{{etapa="{etiqueta}"}} {r["total_s"]:.6f}')
+        lineas.append(f'flexwatch_etapa_segundos_count{{etapa="{etiqueta}"}} {r["tramos"]}')
+        fallos.append(f'flexwatch_etapa_fallos{{etapa="{etiqueta}"}} {r["fallos"]}')
+    lineas += ["# HELP flexwatch_etapa_fallos Tramos fallidos por etapa (búfer en memoria).", "# TYPE flexwatch_etapa_fallos gauge"]
+    return "\n".join(lineas + fallos) + "\n"
+
+
+def limpiar():
+    with _lock:
+        _tramos.clear()
+
+
+class _ManejadorMetricas(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        datos = texto_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+_servidor = None
+_servidor_lock = threading.Lock()
+
+
+def iniciar_exportador(puerto=None):
+    """Sirve `/metrics` (una vez por proceso) si hay puerto configurado; devuelve el servidor o `None`."""
+    global _servidor
+    puerto = PUERTO_METRICAS if puerto is None else puerto
+    if not puerto:
+        return None
+    with _servidor_lock:
+        if _servidor is None:
+            _servidor = ThreadingHTTPServer(("0.0.0.0", puerto), _ManejadorMetricas)
+            _servidor.daemon_threads = True
+            threading.Thread(target=_servidor.serve_forever, name="flexwatch-metricas", daemon=True).start()
+        return _servidor
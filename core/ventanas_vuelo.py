@@ -0,0 +1,247 @@
+"""
+Selección por tramo de los NOTAMs y periodos del TAF que tocan cada vuelo.
+
+`IndiceIntervalos` guarda intervalos `[inicio, fin]` agrupados por aeropuerto
+y ordenados por inicio. Las consultas de todos los tramos se resuelven de una
+vez: por aeropuerto, los candidatos de cada ventana son el prefijo de
+intervalos que empiezan antes de su fin (`searchsorted`), y dentro de ese
+prefijo una tabla dispersa de máximos del fin encuentra, uno a uno, los que
+terminan después de su inicio sin mirar los demás. Cada consulta cuesta
+O(log N + k) para k intervalos encontrados, así que un día completo de tramos
+no vuelve a escanear los NOTAMs de cada aeropuerto por cada vuelo.
+
+`ContextoVentanas` construye un índice con los NOTAMs (Effective/Expiration,
+con las reglas de pistas aplicadas) y otro con los periodos del TAF (BASE, FM,
+BECMG, TEMPO, PROB) y, para cada tramo, selecciona lo vigente en la ventana de
+salida (`STD ± margen` en origen) y de llegada (`STA ± margen` en destino).
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from core import notam_parser, notam_rules, wx_decoder
+
+MARGEN_HORAS = float(os.environ.get("FLEXWATCH_MARGEN_VENTANA_H", "2"))
+NIVELES_PROMPT = (notam_parser.CRITICO, notam_parser.RELEVANTE)
+_MINIMO, _MAXIMO = np.iinfo(np.int64).min, np.iinfo(np.int64).max
+_FORMATO_PERIODO = "%d/%H%MZ"
+
+
+def _tabla_maximos(valores):
+    """
+    Tabla dispersa para consultar máximos por rango: la fila `j` tiene en `i`
+    la posición del máximo de `valores[i:i + 2**j]` (el resto de la fila no se usa).
+    """
+    tabla = [np.arange(len(valores))]
+    ancho = 1
+    while 2 * ancho <= len(valores):
+        previa = tabla[-1]
+        izquierda, derecha = previa[:len(valores) - 2 * ancho + 1], previa[ancho:len(valores) - ancho + 1]
+        fila = np.arange(len(valores))
+        fila[:len(izquierda)] = np.where(valores[izquierda] >= valores[derecha], izquierda, derecha)
+        tabla.append(fila)
+        ancho *= 2
+    return np.vstack(tabla)
+
+
+def _nanosegundos(fechas, vacio):
+    """Fechas (UTC o ingenuas en UTC) como enteros en ns; las vacías valen `vacio` (extremo abierto)."""
+    fechas = pd.Series(pd.to_datetime(pd.Series(fechas), utc=True), dtype="datetime64[ns, UTC]")
+    valores = fechas.dt.tz_localize(None).to_numpy(dtype="datetime64[ns]").view("i8")
+    return np.where(fechas.isna().to_numpy(), vacio, valores)
+
+
+class IndiceIntervalos:
+    """Intervalos cerrados por clave (aeropuerto); un extremo vacío es abierto."""
+
+    def __init__(self, claves, inicios, fines):
+        codigos, self.claves = pd.factorize(pd.Series(claves, dtype=object))
+        inicios = _nanosegundos(inicios, _MINIMO)
+        fines = _nanosegundos(fines, _MAXIMO)
+        orden = np.lexsort((inicios, codigos))
+        # Posiciones originales, e inicios y fines ordenados por clave y luego por inicio
+        self.posiciones = orden
+        self._inicios = inicios[orden]
+        self._fines = fines[orden]
+        self._limites = np.searchsorted(codigos[orden], np.arange(len(self.claves) + 1))
+        self._maximos = _tabla_maximos(self._fines)
+
+    def __len__(self):
+        return len(self.posiciones)
+
+    def solapados(self, claves, desdes, hastas):
+        """
+        Para cada consulta `(clave, desde, hasta)`, las posiciones originales de
+        los intervalos de esa clave que se solapan con `[desde, hasta]`.
+
+        Devuelve una lista de arreglos, uno por consulta y en el mismo orden,
+        con los intervalos ordenados por inicio.
+        """
+        codigos = self.claves.get_indexer(pd.Series(claves, dtype=object))
+        desdes = _nanosegundos(desdes, _MINIMO)
+        hastas = _nanosegundos(hastas, _MAXIMO)
+        if not len(codigos):
+            return []
+        # Rango [bajo, alto) de cada consulta: el prefijo de su clave que empieza antes de `hasta`
+        bajos = np.zeros(len(codigos), dtype=np.intp)
+        altos = np.zeros(len(codigos), dtype=np.intp)
+        orden = np.argsort(codigos, kind="stable")
+        cortes = np.searchsorted(codigos[orden], np.arange(len(self.claves) + 1))
+        for codigo in range(len(self.claves)):
+            consultas = orden[cortes[codigo]:cortes[codigo + 1]]
+            inicio, fin = self._limites[codigo], self._limites[codigo + 1]
+            bajos[consultas] = inicio
+            altos[consultas] = inicio + np.searchsorted(self._inicios[inicio:fin], hastas[consultas], side="right")
+
+        # Se toma el de mayor fin de cada rango: si termina antes de `desde`, ninguno
+        # del rango solapa; si no, se reporta y se sigue por los dos lados.
+        consultas = np.flatnonzero(altos > bajos)
+        bajos, altos = bajos[consultas], altos[consultas]
+        encontradas, encontrados = [], []
+        while len(consultas):
+            nivel = np.frexp(altos - bajos)[1] - 1
+            izquierda = self._maximos[nivel, bajos]
+            derecha = self._maximos[nivel, altos - np.left_shift(1, nivel)]
+            maximo = np.where(self._fines[izquierda] >= self._fines[derecha], izquierda, derecha)
+            solapa = self._fines[maximo] >= desdes[consultas]
+            consultas, bajos, altos, maximo = consultas[solapa], bajos[solapa], altos[solapa], maximo[solapa]
+            encontradas.append(consultas)
+            encontrados.append(maximo)
+            consultas = np.concatenate([consultas, consultas])
+            bajos, altos = np.concatenate([bajos, maximo + 1]), np.concatenate([maximo, altos])
+            quedan = altos > bajos
+            consultas, bajos, altos = consultas[quedan], bajos[quedan], altos[quedan]
+
+        encontradas = np.concatenate(encontradas) if encontradas else np.zeros(0, dtype=np.intp)
+        encontrados = np.concatenate(encontrados) if encontrados else np.zeros(0, dtype=np.intp)
+        orden = np.lexsort((encontrados, encontradas))
+        partes = np.cumsum(np.bincount(encontradas, minlength=len(codigos)))[:-1]
+        return np.split(self.posiciones[encontrados[orden]], partes)
+
+
+def _tabla_notams(notams_por_icao, pistas_por_icao):
+    """
+    NOTAMs parseados de todos los aeropuertos con la criticidad ajustada a sus
+    pistas, en el orden del prompt (criticidad, categoría, inicio).
+    """
+    tablas = []
+    for icao, df in notams_por_icao.items():
+        if df is None or df.empty:
+            continue
+        tabla, _ = notam_rules.aplicar_reglas(notam_parser.parsear_notams(df), pistas_por_icao.get(icao, []))
+        tablas.append(tabla.assign(aeropuerto=icao))
+    if not tablas:
+        return pd.DataFrame(columns=notam_parser.COLUMNAS_TABLA + ["aeropuerto"])
+    tabla = pd.concat(tablas, ignore_index=True)
+    orden = tabla["criticidad"].map({nivel: i for i, nivel in enumerate(notam_parser.NIVELES_CRITICIDAD)})
+    return tabla.assign(_orden=orden).sort_values(["_orden", "categoria", "inicio"], kind="stable").drop(columns="_orden").reset_index(drop=True)
+
+
+def _tabla_taf(tafs_por_icao):
+    """Periodos decodificados de los TAF de todos los aeropuertos."""
+    filas = []
+    for icao, raw in tafs_por_icao.items():
+        if not raw:
+            continue
+        for segmento in wx_decoder.decodificar_taf(raw)["segmentos"]:
+            filas.append({"aeropuerto": icao, "tipo": segmento["tipo"], "inicio": segmento["inicio"], "fin": segmento["fin"], "texto": segmento["texto"]})
+    return pd.DataFrame(filas, columns=["aeropuerto", "tipo", "inicio", "fin", "texto"])
+
+
+class ContextoVentanas:
+    """
+    NOTAMs y periodos del TAF de cada tramo de un itinerario preparado.
+
+    `notams_por_icao` es `{icao: DataFrame del export de la FAA}` (o `None` si
+    la descarga falló) y `tafs_por_icao`, `{icao: TAF crudo}`.
+
+    Las líneas del prompt de cada NOTAM y periodo se escriben una sola vez al
+    construirlo; los textos de cada tramo solo indexan por posición.
+    """
+
+    def __init__(self, df_itinerario, notams_por_icao, tafs_por_icao, pistas_por_icao, margen_horas=None):
+        self.margen = pd.Timedelta(hours=MARGEN_HORAS if margen_horas is None else margen_horas)
+        self.notams_por_icao = notams_por_icao
+        self.tafs_por_icao = tafs_por_icao
+        self.notams = _tabla_notams(notams_por_icao, pistas_por_icao)
+        self.taf = _tabla_taf(tafs_por_icao)
+        self._aeropuertos_taf = set(self.taf["aeropuerto"])
+        # Con la tabla ya en el orden del prompt, posiciones ordenadas = líneas ordenadas
+        self._relevantes = self.notams["criticidad"].isin(NIVELES_PROMPT).to_numpy()
+        self._lineas_notams = np.array([""] * len(self.notams), dtype=object)
+        self._lineas_notams[self._relevantes] = notam_parser.lineas_para_prompt(self.notams[self._relevantes])
+        self._pares_notams = list(zip(self.notams["notam_id"], self.notams["texto"]))
+        self._lineas_taf = np.array([
+            f"{fila.tipo} {_periodo(fila.inicio, fila.fin)} {fila.texto}".strip() for fila in self.taf.itertuples()
+        ], dtype=object)
+        indice_notams = IndiceIntervalos(self.notams["aeropuerto"], self.notams["inicio"], self.notams["fin"])
+        indice_taf = IndiceIntervalos(self.taf["aeropuerto"], self.taf["inicio"], self.taf["fin"])
+
+        # Una consulta por extremo de cada tramo: salidas y luego llegadas
+        icaos = pd.concat([df_itinerario["From_ICAO"], df_itinerario["To_ICAO"]], ignore_index=True)
+        horas = pd.concat([df_itinerario["STD_UTC"], df_itinerario["STA_UTC"]], ignore_index=True)
+        desdes, hastas = horas - self.margen, horas + self.margen
+        notams = indice_notams.solapados(icaos, desdes, hastas)
+        periodos = indice_taf.solapados(icaos, desdes, hastas)
+        self.ventanas = {}
+        for posicion, indice in enumerate(df_itinerario.index):
+            llegada = posicion + len(df_itinerario)
+            self.ventanas[indice] = {
+                "origen": (notams[posicion], periodos[posicion], desdes[posicion], hastas[posicion]),
+                "destino": (notams[llegada], periodos[llegada], desdes[llegada], hastas[llegada]),
+            }
+
+    def texto_notams(self, icao, posiciones):
+        """Líneas de los NOTAMs críticos y relevantes de `posiciones`, con el conteo de los omitidos."""
+        if self.notams_por_icao.get(icao) is None:
+            return "No se pudieron obtener los NOTAMs."
+        posiciones = np.sort(posiciones)
+        relevantes = posiciones[self._relevantes[posiciones]]
+        lineas = self._lineas_notams[relevantes].tolist()
+        omitidos = len(self.notams_por_icao[icao]) - len(relevantes)
+        if omitidos:
+            lineas.append(f"- Omitidos {omitidos} NOTAMs rutinarios o fuera de la ventana del vuelo.")
+        if not len(relevantes):
+            lineas.insert(0, "- Sin NOTAMs críticos ni relevantes en la ventana del vuelo.")
+        return "\n".join(lineas)
+
+    def texto_taf(self, icao, posiciones, desde, hasta):
+        """Periodos del TAF de `posiciones`; sin periodos decodificados se devuelve el TAF completo."""
+        raw = self.tafs_por_icao.get(icao)
+        if not raw or icao not in self._aeropuertos_taf:
+            return raw
+        ventana = f"{desde:{_FORMATO_PERIODO}}–{hasta:{_FORMATO_PERIODO}}" if pd.notna(desde) and pd.notna(hasta) else "sin hora"
+        if not len(posiciones):
+            return f"Ningún periodo del TAF cubre la ventana {ventana}."
+        return f"Periodos en la ventana {ventana}: " + " | ".join(self._lineas_taf[np.sort(posiciones)])
+
+    def huella_notams(self, icao, posiciones):
+        """Pares `(id, texto)` ordenados de la selección, para la clave de caché; `None` sin descarga."""
+        if self.notams_por_icao.get(icao) is None:
+            return None
+        return tuple(sorted({self._pares_notams[posicion] for posicion in posiciones}))
+
+    def entradas(self, icao, ventanas):
+        """
+        TAF, NOTAMs y huella de NOTAMs de `icao` para una o varias ventanas
+        (las de `self.ventanas`); varias se unen, como en un lote de vuelos que
+        comparten el aeropuerto.
+        """
+        notams = np.unique(np.concatenate([v[0] for v in ventanas]))
+        periodos = np.unique(np.concatenate([v[1] for v in ventanas]))
+        desdes = [v[2] for v in ventanas if pd.notna(v[2])]
+        hastas = [v[3] for v in ventanas if pd.notna(v[3])]
+        desde = min(desdes) if len(desdes) == len(ventanas) else pd.NaT
+        hasta = max(hastas) if len(hastas) == len(ventanas) else pd.NaT
+        return {
+            "taf": self.texto_taf(icao, periodos, desde, hasta),
+            "notams": self.texto_notams(icao, notams),
+            "huella": self.huella_notams(icao, notams),
+        }
+
+
+def _periodo(inicio, fin):
+    inicio = f"{inicio:{_FORMATO_PERIODO}}" if pd.notna(inicio) else "?"
+    fin = f"{fin:{_FORMATO_PERIODO}}" if pd.notna(fin) else "?"
+    return f"{inicio}–{fin}"
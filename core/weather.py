@@ -0,0 +1,151 @@
+"""
+Consulta de TAF y METAR en aviationweather.gov por lotes.
+
+La API acepta varias estaciones separadas por coma en `ids`, así que cada
+briefing o itinerario se resuelve con una o pocas peticiones sobre una sesión
+HTTP compartida. Los resultados se guardan por estación en la caché
+persistente, compartida con otras réplicas y con `scraper.py`, hasta que el
+dato deja de ser vigente: el fin de validez del TAF o la hora del siguiente
+METAR rutinario, con un máximo para no perder enmiendas ni SPECI. Las
+estaciones que otra sesión está descargando en ese momento se esperan en
+lugar de pedirse otra vez (`core.peticiones_en_curso`).
+"""
+import os
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+from core import peticiones_en_curso
+from core.cache import expiracion, obtener_cache
+from core.trazas import tramo
+
+# `FLEXWATCH_WX_URL` apunta a otra API compatible (p. ej. la falsa de `benchmarks/wx_falso.py`)
+API_BASE = os.environ.get("FLEXWATCH_WX_URL", "https://aviationweather.gov/api/data").rstrip("/")
+TTL_SEGUNDOS = 600
+TTL_TAF_SEGUNDOS = 1800
+INTERVALO_METAR_SEGUNDOS = 3600
+MAX_ESTACIONES_POR_PETICION = 40
+TIMEOUT_SEGUNDOS = 15
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def obtener_sesion():
+    """Sesión HTTP compartida para reutilizar conexiones con la API."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def _epoch(valor):
+    """Epoch UTC a partir de los campos de tiempo de la API (entero o ISO 8601)."""
+    if valor is None or valor == "":
+        return None
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    try:
+        return datetime.fromisoformat(str(valor).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def _normalizar(estaciones):
+    return list(dict.fromkeys(e.strip().upper() for e in estaciones if e and e.strip()))
+
+
+def _consultar_json(endpoint, estaciones, **params):
+    """Pide `endpoint` para todas las estaciones, en bloques, y devuelve los registros."""
+    registros = []
+    sesion = obtener_sesion()
+    for i in range(0, len(estaciones), MAX_ESTACIONES_POR_PETICION):
+        bloque = estaciones[i:i + MAX_ESTACIONES_POR_PETICION]
+        with tramo(f"wx.{endpoint}", estaciones=len(bloque)) as atributos:
+            response = sesion.get(
+                f"{API_BASE}/{endpoint}",
+                params={"ids": ",".join(bloque), "format": "json", **params},
+                timeout=TIMEOUT_SEGUNDOS,
+            )
+            response.raise_for_status()
+            atributos["bytes"] = len(response.content)
+        # La API responde 204 sin cuerpo cuando ninguna estación tiene datos
+        if response.status_code == 204 or not response.text.strip():
+            continue
+        registros.extend(response.json())
+    return registros
+
+
+def _con_cache(tipo, estaciones, descargar):
+    """
+    Resuelve desde la caché y descarga en un solo lote las estaciones que falten
+    y que nadie más esté descargando; las demás se esperan.
+
+    `descargar` devuelve `{estación: (valor, expira)}`; las estaciones sin
+    datos se guardan como `None` durante `TTL_SEGUNDOS`.
+    """
+    cache = obtener_cache()
+    estaciones = _normalizar(estaciones)
+    resultado, faltantes = {}, []
+    for estacion in estaciones:
+        encontrado, valor = cache.obtener(tipo, estacion)
+        if encontrado:
+            resultado[estacion] = valor
+        else:
+            faltantes.append(estacion)
+    if not faltantes:
+        return resultado
+    propias, ajenas = peticiones_en_curso.reclamar(tipo, faltantes)
+    with peticiones_en_curso.liderar(tipo, propias) as valores:
+        if propias:
+            descargados = descargar(list(propias))
+            for estacion in propias:
+                valor, expira = descargados.get(estacion, (None, time.time() + TTL_SEGUNDOS))
+                cache.guardar(tipo, estacion, valor, expira=expira)
+                valores[estacion] = valor
+    resultado.update(valores)
+    resultado.update(peticiones_en_curso.esperar(tipo, ajenas))
+    return {estacion: resultado[estacion] for estacion in estaciones}
+
+
+def _descargar_tafs(estaciones):
+    tafs = {}
+    for registro in _consultar_json("taf", estaciones):
+        estacion, raw = registro.get("icaoId"), registro.get("rawTAF")
+        # Si la API devuelve más de un TAF por estación, el primero es el vigente
+        if estacion and raw and estacion not in tafs:
+            expira = expiracion(TTL_TAF_SEGUNDOS, _epoch(registro.get("validTimeTo")))
+            tafs[estacion] = (" ".join(raw.split()), expira)
+    return tafs
+
+
+def _descargar_metars(estaciones, horas):
+    metars, expiraciones = {}, {}
+    registros = _consultar_json("metar", estaciones, hours=horas)
+    registros.sort(key=lambda r: _epoch(r.get("obsTime")) or 0, reverse=True)
+    for registro in registros:
+        estacion, raw = registro.get("icaoId"), registro.get("rawOb")
+        if estacion and raw:
+            metars.setdefault(estacion, []).append(raw.strip())
+            if estacion not in expiraciones:
+                # El primero es el más reciente: el siguiente METAR rutinario llega una hora después
+                observacion = _epoch(registro.get("obsTime"))
+                siguiente = observacion + INTERVALO_METAR_SEGUNDOS if observacion else None
+                expiraciones[estacion] = expiracion(TTL_SEGUNDOS, siguiente)
+    return {estacion: (lista, expiraciones[estacion]) for estacion, lista in metars.items()}
+
+
+def obtener_tafs(estaciones):
+    """Devuelve `{estación: TAF crudo o None}` con una petición por bloque."""
+    return _con_cache("taf", estaciones, _descargar_tafs)
+
+
+def obtener_metars(estaciones, horas=6):
+    """Devuelve `{estación: [METARs del más reciente al más antiguo] o None}`."""
+    return _con_cache(f"metar_{horas}h", estaciones, lambda faltantes: _descargar_metars(faltantes, horas))
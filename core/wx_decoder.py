@@ -0,0 +1,391 @@
+"""
+Decodificador local de TAF y METAR.
+
+Convierte los reportes crudos en registros estructurados (viento, visibilidad,
+techo, fenómenos) segmentados en el tiempo, calcula la tendencia de los METAR
+y la ventana más adversa del TAF, incluida la alerta de techo por debajo de
+500 ft. Todo es determinista: la IA queda como capa narrativa opcional.
+"""
+import operator
+import re
+from datetime import datetime, timedelta, timezone
+
+TECHO_MINIMO_FT = 500
+VISIBILIDAD_MAXIMA_M = 9999
+METROS_POR_MILLA = 1609.34
+
+
+def _millas_a_metros(millas):
+    return int(round(millas * METROS_POR_MILLA))
+
+
+# Categorías de vuelo de la FAA de peor a mejor: (nombre, techo límite ft,
+# visibilidad límite m, si el límite es parte de la categoría). LIFR < 500 ft
+# o < 1 SM; IFR < 1000 ft o < 3 SM; MVFR 1000-3000 ft o 3-5 SM, inclusive.
+CATEGORIAS_VUELO = (
+    ("LIFR", 500, _millas_a_metros(1), False),
+    ("IFR", 1000, _millas_a_metros(3), False),
+    ("MVFR", 3000, _millas_a_metros(5), True),
+)
+ORDEN_CATEGORIA = {"LIFR": 0, "IFR": 1, "MVFR": 2, "VFR": 3}
+
+_RE_HORA_METAR = re.compile(r"^(\d{2})(\d{2})(\d{2})Z$")
+_RE_PERIODO = re.compile(r"^(\d{2})(\d{2})/(\d{2})(\d{2})$")
+_RE_FM = re.compile(r"^FM(\d{2})(\d{2})(\d{2})$")
+_RE_VIENTO = re.compile(r"^(\d{3}|VRB)(\d{2,3})(?:G(\d{2,3}))?(KT|MPS)$")
+_RE_VIS_METROS = re.compile(r"^(\d{4})(?:NDV)?$")
+_RE_VIS_SM = re.compile(r"^([PM])?(\d+)?(?:(\d)/(\d))?SM$")
+_RE_NUBES = re.compile(r"^(FEW|SCT|BKN|OVC|VV)(\d{3}|///)(CB|TCU)?$")
+_RE_FENOMENO = re.compile(
+    r"^(?:[+-]|VC)?(?:MI|PR|BC|DR|BL|SH|TS|FZ)?(?:DZ|RA|SN|SG|IC|PL|GR|GS|UP|BR|FG|FU|VA|DU|SA|HZ|PY|PO|SQ|FC|SS|DS)*$"
+)
+_PALABRAS_CAMBIO = ("FM", "TEMPO", "BECMG", "PROB30", "PROB40")
+
+
+# --- Elementos individuales ---
+def _fecha_desde_dia_hora(dia, hora, minuto, referencia):
+    """Fecha UTC a partir de día/hora del reporte, eligiendo el mes más cercano a `referencia`."""
+    extra = timedelta(days=1) if hora == 24 else timedelta(0)
+    hora = 0 if hora == 24 else hora
+    candidatos = []
+    for desplazamiento in (-1, 0, 1):
+        mes = referencia.month + desplazamiento
+        anio = referencia.year + (mes - 1) // 12
+        mes = (mes - 1) % 12 + 1
+        try:
+            candidatos.append(datetime(anio, mes, dia, hora, minuto, tzinfo=timezone.utc) + extra)
+        except ValueError:
+            continue
+    return min(candidatos, key=lambda fecha: abs(fecha - referencia))
+
+
+def _visibilidad_sm(token, previo):
+    """Visibilidad en millas (admite `1 1/2SM`, `P6SM`, `M1/4SM`) convertida a metros."""
+    coincidencia = _RE_VIS_SM.match(token)
+    if not coincidencia:
+        return None
+    prefijo, enteros, numerador, denominador = coincidencia.groups()
+    millas = float(enteros or 0)
+    if previo and previo.isdigit() and not enteros:
+        millas += float(previo)
+    if numerador:
+        millas += float(numerador) / float(denominador)
+    if prefijo == "P" or millas >= 6:
+        return VISIBILIDAD_MAXIMA_M
+    return _millas_a_metros(millas)
+
+
+def _elementos(tokens):
+    """Extrae viento, visibilidad, nubes y fenómenos de una lista de grupos."""
+    elementos = {}
+    nubes = []
+    fenomenos = []
+    for i, token in enumerate(tokens):
+        if token == "CAVOK":
+            elementos.update(visibilidad_m=VISIBILIDAD_MAXIMA_M, techo_ft=None, cavok=True)
+            nubes = []
+            continue
+        viento = _RE_VIENTO.match(token)
+        if viento:
+            factor = 1.94384 if viento.group(4) == "MPS" else 1
+            elementos["viento"] = {
+                "direccion": None if viento.group(1) == "VRB" else int(viento.group(1)),
+                "velocidad_kt": int(round(int(viento.group(2)) * factor)),
+                "racha_kt": int(round(int(viento.group(3)) * factor)) if viento.group(3) else None,
+            }
+            continue
+        if _RE_VIS_METROS.match(token):
+            elementos["visibilidad_m"] = min(int(token[:4]), VISIBILIDAD_MAXIMA_M)
+            continue
+        if token.endswith("SM"):
+            visibilidad = _visibilidad_sm(token, tokens[i - 1] if i else None)
+            if visibilidad is not None:
+                elementos["visibilidad_m"] = visibilidad
+            continue
+        nube = _RE_NUBES.match(token)
+        if nube:
+            altura = None if nube.group(2) == "///" else int(nube.group(2)) * 100
+            nubes.append({"cantidad": nube.group(1), "altura_ft": altura, "tipo": nube.group(3)})
+            continue
+        if token in ("NSC", "SKC", "CLR", "NCD", "NSW"):
+            if token != "NSW":
+                nubes = []
+                elementos["sin_nubes"] = True
+            else:
+                fenomenos = []
+                elementos["sin_fenomenos"] = True
+            continue
+        if len(token) >= 2 and _RE_FENOMENO.match(token) and not token.isdigit():
+            fenomenos.append(token)
+    if nubes:
+        elementos["nubes"] = nubes
+        techos = [n["altura_ft"] for n in nubes if n["cantidad"] in ("BKN", "OVC", "VV") and n["altura_ft"] is not None]
+        elementos["techo_ft"] = min(techos) if techos else None
+    elif elementos.get("sin_nubes"):
+        elementos["nubes"] = []
+        elementos["techo_ft"] = None
+    if fenomenos or elementos.get("sin_fenomenos"):
+        elementos["fenomenos"] = fenomenos
+    elementos.pop("sin_nubes", None)
+    elementos.pop("sin_fenomenos", None)
+    return elementos
+
+
+def categoria_vuelo(techo_ft, visibilidad_m):
+    """Categoría de vuelo (LIFR/IFR/MVFR/VFR) según techo y visibilidad."""
+    for nombre, techo_limite, vis_limite, inclusivo in CATEGORIAS_VUELO:
+        dentro = operator.le if inclusivo else operator.lt
+        if (techo_ft is not None and dentro(techo_ft, techo_limite)) or (visibilidad_m is not None and dentro(visibilidad_m, vis_limite)):
+            return nombre
+    return "VFR"
+
+
+# --- METAR ---
+def decodificar_metar(raw, referencia=None):
+    """Decodifica un METAR/SPECI crudo en un diccionario."""
+    referencia = referencia or datetime.now(timezone.utc)
+    tokens = raw.replace("=", " ").split()
+    if tokens and tokens[0] in ("METAR", "SPECI"):
+        tokens = tokens[1:]
+    registro = {"raw": raw.strip(), "estacion": tokens[0] if tokens else None, "hora": None}
+    cuerpo = tokens[1:]
+    if cuerpo and _RE_HORA_METAR.match(cuerpo[0]):
+        dia, hora, minuto = map(int, _RE_HORA_METAR.match(cuerpo[0]).groups())
+        registro["hora"] = _fecha_desde_dia_hora(dia, hora, minuto, referencia)
+        cuerpo = cuerpo[1:]
+    # Las tendencias y remarks no describen la observación actual
+    for corte in ("RMK", "TEMPO", "BECMG", "NOSIG"):
+        if corte in cuerpo:
+            cuerpo = cuerpo[:cuerpo.index(corte)]
+    registro.update(_elementos(cuerpo))
+    registro.setdefault("techo_ft", None)
+    registro.setdefault("visibilidad_m", None)
+    registro["categoria"] = categoria_vuelo(registro["techo_ft"], registro["visibilidad_m"])
+    return registro
+
+
+def _valor_comparable(valor, maximo):
+    return maximo if valor is None else valor
+
+
+def tendencia_metar(metars, referencia=None):
+    """
+    Tendencia del techo y la visibilidad entre el METAR más antiguo y el más reciente.
+
+    `metars` va del más reciente al más antiguo, como lo devuelve la API.
+    Devuelve un diccionario con `flecha` (⬆️, ⬇️ o =), `estado` y los reportes
+    decodificados en orden cronológico.
+    """
+    decodificados = [decodificar_metar(m, referencia) for m in metars if m and m.strip()]
+    decodificados.sort(key=lambda r: r["hora"] or datetime.min.replace(tzinfo=timezone.utc))
+    if len(decodificados) < 2:
+        actual = decodificados[-1] if decodificados else None
+        return {"flecha": "=", "estado": "estable", "actual": actual, "reportes": decodificados, "cambios": []}
+
+    antiguo, actual = decodificados[0], decodificados[-1]
+    puntaje, cambios = 0, []
+    techo_antes = _valor_comparable(antiguo["techo_ft"], 99999)
+    techo_ahora = _valor_comparable(actual["techo_ft"], 99999)
+    if techo_antes != techo_ahora:
+        puntaje += 1 if techo_ahora > techo_antes else -1
+        cambios.append(f"techo {_texto_techo(antiguo['techo_ft'])} → {_texto_techo(actual['techo_ft'])}")
+    vis_antes = _valor_comparable(antiguo["visibilidad_m"], VISIBILIDAD_MAXIMA_M)
+    vis_ahora = _valor_comparable(actual["visibilidad_m"], VISIBILIDAD_MAXIMA_M)
+    if vis_antes != vis_ahora:
+        puntaje += 1 if vis_ahora > vis_antes else -1
+        cambios.append(f"visibilidad {_texto_visibilidad(antiguo['visibilidad_m'])} → {_texto_visibilidad(actual['visibilidad_m'])}")
+    # Un cambio de categoría de vuelo pesa más que las variaciones dentro de la misma
+    categoria_antes, categoria_ahora = ORDEN_CATEGORIA[antiguo["categoria"]], ORDEN_CATEGORIA[actual["categoria"]]
+    if categoria_antes != categoria_ahora:
+        puntaje += 2 if categoria_ahora > categoria_antes else -2
+        cambios.append(f"categoría {antiguo['categoria']} → {actual['categoria']}")
+
+    if puntaje > 0:
+        flecha, estado = "⬆️", "mejorando"
+    elif puntaje < 0:
+        flecha, estado = "⬇️", "empeorando"
+    else:
+        flecha, estado = "=", "estable"
+    return {"flecha": flecha, "estado": estado, "actual": actual, "reportes": decodificados, "cambios": cambios}
+
+
+# --- TAF ---
+def _partir_grupos(tokens):
+    """Separa los tokens del TAF en grupos (tipo, tokens) en cada indicador de cambio."""
+    grupos, actual, tipo = [], [], "BASE"
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        es_fm = _RE_FM.match(token)
+        if es_fm or token in _PALABRAS_CAMBIO:
+            grupos.append((tipo, actual))
+            if token.startswith("PROB") and i + 1 < len(tokens) and tokens[i + 1] == "TEMPO":
+                tipo, actual = f"{token} TEMPO", []
+                i += 2
+                continue
+            tipo, actual = ("FM", [token]) if es_fm else (token, [])
+        else:
+            actual.append(token)
+        i += 1
+    grupos.append((tipo, actual))
+    return [(tipo, grupo) for tipo, grupo in grupos if grupo]
+
+
+def decodificar_taf(raw, referencia=None):
+    """
+    Decodifica un TAF en segmentos temporales.
+
+    `valido_hasta` es el fin del periodo de validez del encabezado (el `fin`
+    del segmento BASE se recorta al primer FM).
+
+    Cada segmento tiene `tipo` (BASE, FM, BECMG, TEMPO, PROB30/40 [TEMPO]),
+    `inicio`, `fin` y las condiciones vigentes en ese periodo: para FM y BECMG
+    las condiciones resultantes, y para TEMPO/PROB las predominantes con los
+    elementos temporales superpuestos.
+    """
+    referencia = referencia or datetime.now(timezone.utc)
+    tokens = raw.replace("=", " ").split()
+    while tokens and tokens[0] in ("TAF", "AMD", "COR"):
+        tokens = tokens[1:]
+    estacion = tokens[0] if tokens else None
+    tokens = tokens[1:]
+    emitido = None
+    if tokens and _RE_HORA_METAR.match(tokens[0]):
+        emitido = _fecha_desde_dia_hora(*map(int, _RE_HORA_METAR.match(tokens[0]).groups()), referencia)
+        tokens = tokens[1:]
+    referencia = emitido or referencia
+    if "RMK" in tokens:
+        tokens = tokens[:tokens.index("RMK")]
+
+    segmentos = []
+    predominante = {}
+    for tipo, grupo in _partir_grupos(tokens):
+        inicio = fin = None
+        if tipo == "FM":
+            dia, hora, minuto = map(int, _RE_FM.match(grupo[0]).groups())
+            inicio = _fecha_desde_dia_hora(dia, hora, minuto, referencia)
+            grupo = grupo[1:]
+        if grupo and _RE_PERIODO.match(grupo[0]):
+            d1, h1, d2, h2 = map(int, _RE_PERIODO.match(grupo[0]).groups())
+            inicio = _fecha_desde_dia_hora(d1, h1, 0, referencia)
+            fin = _fecha_desde_dia_hora(d2, h2, 0, referencia)
+            grupo = grupo[1:]
+        elementos = _elementos(grupo)
+        if tipo == "BASE":
+            predominante = dict(elementos)
+            condiciones = dict(predominante)
+        elif tipo == "FM":
+            predominante = dict(elementos)
+            condiciones = dict(predominante)
+        elif tipo == "BECMG":
+            predominante = {**predominante, **elementos}
+            condiciones = dict(predominante)
+        else:
+            condiciones = {**predominante, **elementos}
+        condiciones.setdefault("techo_ft", None)
+        condiciones.setdefault("visibilidad_m", None)
+        segmentos.append({
+            "tipo": tipo,
+            "inicio": inicio,
+            "fin": fin,
+            "texto": " ".join(grupo),
+            **condiciones,
+            "categoria": categoria_vuelo(condiciones["techo_ft"], condiciones["visibilidad_m"]),
+        })
+
+    # Un FM termina donde empieza el siguiente FM o donde acaba el TAF
+    fin_taf = segmentos[0]["fin"] if segmentos else None
+    cambios_fm = [s for s in segmentos if s["tipo"] in ("BASE", "FM")]
+    for actual, siguiente in zip(cambios_fm, cambios_fm[1:] + [None]):
+        actual["fin"] = siguiente["inicio"] if siguiente else fin_taf
+    return {"estacion": estacion, "emitido": emitido, "valido_hasta": fin_taf, "segmentos": segmentos}
+
+
+def _gravedad(segmento):
+    return (
+        ORDEN_CATEGORIA[segmento["categoria"]],
+        _valor_comparable(segmento["techo_ft"], 99999),
+        _valor_comparable(segmento["visibilidad_m"], VISIBILIDAD_MAXIMA_M),
+    )
+
+
+def peor_ventana(taf_decodificado):
+    """Segmento del TAF con las condiciones más adversas (menor categoría, techo y visibilidad)."""
+    segmentos = taf_decodificado["segmentos"]
+    return min(segmentos, key=_gravedad) if segmentos else None
+
+
+def alertas_techo(taf_decodificado, minimo_ft=TECHO_MINIMO_FT):
+    """Segmentos del TAF con techo por debajo de `minimo_ft`."""
+    return [s for s in taf_decodificado["segmentos"] if s["techo_ft"] is not None and s["techo_ft"] < minimo_ft]
+
+
+# --- Presentación ---
+def _texto_techo(techo_ft):
+    return "sin techo" if techo_ft is None else f"{techo_ft} ft"
+
+
+def _texto_visibilidad(visibilidad_m):
+    if visibilidad_m is None:
+        return "n/d"
+    return "≥10 km" if visibilidad_m >= VISIBILIDAD_MAXIMA_M else f"{visibilidad_m} m"
+
+
+def _texto_viento(viento):
+    if not viento:
+        return "n/d"
+    if viento["velocidad_kt"] == 0:
+        return "calma"
+    direccion = "VRB" if viento["direccion"] is None else f"{viento['direccion']:03d}°"
+    racha = f" G{viento['racha_kt']}" if viento["racha_kt"] else ""
+    return f"{direccion} {viento['velocidad_kt']}{racha} kt"
+
+
+def _texto_hora(fecha):
+    return fecha.strftime("%d/%H%MZ") if fecha else "?"
+
+
+def _texto_condiciones(registro):
+    fenomenos = " ".join(registro.get("fenomenos") or []) or "—"
+    return (f"viento {_texto_viento(registro.get('viento'))}, visibilidad {_texto_visibilidad(registro['visibilidad_m'])}, "
+            f"techo {_texto_techo(registro['techo_ft'])}, fenómenos {fenomenos} ({registro['categoria']})")
+
+
+def resumen_metar_markdown(metars, estacion, referencia=None):
+    """Tendencia y METAR vigente en Markdown, sin IA."""
+    tendencia = tendencia_metar(metars, referencia)
+    actual = tendencia["actual"]
+    if actual is None:
+        return f"No hay METAR decodificable para {estacion}."
+    cambios = "; ".join(tendencia["cambios"]) or "sin cambios significativos de techo ni visibilidad"
+    return "\n".join([
+        f"**Tendencia {tendencia['flecha']} {tendencia['estado']}** en las últimas "
+        f"{len(tendencia['reportes'])} observaciones: {cambios}.",
+        "",
+        f"**METAR vigente ({_texto_hora(actual['hora'])}):** {_texto_condiciones(actual)}.",
+    ])
+
+
+def resumen_taf_markdown(raw_taf, estacion, referencia=None):
+    """Tabla de segmentos del TAF, peor ventana y alerta de techo en Markdown, sin IA."""
+    taf = decodificar_taf(raw_taf, referencia)
+    if not taf["segmentos"]:
+        return f"No se pudo decodificar el TAF de {estacion}."
+    filas = ["| Periodo | Tipo | Viento | Visibilidad | Techo | Fenómenos | Cat. |", "|---|---|---|---|---|---|---|"]
+    for s in taf["segmentos"]:
+        fenomenos = " ".join(s.get("fenomenos") or []) or "—"
+        filas.append(
+            f"| {_texto_hora(s['inicio'])} – {_texto_hora(s['fin'])} | {s['tipo']} | {_texto_viento(s.get('viento'))} | "
+            f"{_texto_visibilidad(s['visibilidad_m'])} | {_texto_techo(s['techo_ft'])} | {fenomenos} | {s['categoria']} |"
+        )
+    peor = peor_ventana(taf)
+    lineas = filas + [
+        "",
+        f"**Condiciones más adversas:** {_texto_hora(peor['inicio'])} – {_texto_hora(peor['fin'])} ({peor['tipo']}): "
+        f"{_texto_condiciones(peor)}.",
+    ]
+    alertas = alertas_techo(taf)
+    if alertas:
+        periodos = ", ".join(f"{_texto_hora(s['inicio'])}–{_texto_hora(s['fin'])} ({_texto_techo(s['techo_ft'])})" for s in alertas)
+        lineas.append(f"\n🚨 **ALERTA:** techo por debajo de {TECHO_MINIMO_FT} ft en {periodos}.")
+    return "\n".join(lineas)
@@ -1,167 +1,49 @@
 import streamlit as st
 import pandas as pd
-import io
-import os
-import importlib
+import threading
 from datetime import datetime
-from fpdf import FPDF
-from g4f.client import Client
-import airportsdata
-import streamlit.components.v1 as components
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from core import runways, dataset, health_check, itinerario, llm_cache, peticiones_en_curso, reporte, ventanas_vuelo
 
-# --- Cargar la base de datos de pistas al iniciar ---
+# --- Cargar el índice de pistas al iniciar ---
 @st.cache_resource
-def load_runway_data():
-    """Carga el archivo runways.csv en un DataFrame de Pandas."""
+def load_runway_index():
+    """Construye una sola vez el índice de pistas por aeropuerto desde runways.csv."""
     try:
-        runway_path = os.path.join("assets", "runways.csv")
-        return pd.read_csv(runway_path)
+        return runways.obtener_indice()
     except FileNotFoundError:
         st.error("Error: No se encontró el archivo `runways.csv` en la carpeta `assets`.")
         st.error("Por favor, descárgalo desde https://ourairports.com/data/ y colócalo en la carpeta `assets`.")
         return None
 
-runways_df = load_runway_data()
+runway_index = load_runway_index()
 
-# Cargar datos de aeropuertos para conversión
+# Cargar datos de aeropuertos para conversión (dataset precompilado, mapeado en memoria)
 try:
-    airports = airportsdata.load('IATA')
+    airports = dataset.obtener_dataset()
 except Exception as e:
     st.error(f"No se pudo cargar la base de datos de aeropuertos: {e}")
     st.stop()
 
-# Reutilizando funciones de otras páginas
-try:
-    wx_page = importlib.import_module("pages.1_Analisis_WX")
-    notam_page = importlib.import_module("pages.2_Analisis_Notam")
-    obtener_taf_de_api = wx_page.obtener_taf_de_api
-    buscar_y_descargar_notams = notam_page.buscar_y_descargar_notams
-    analizar_notams_raw = notam_page.analizar_notams_con_ia
-except ImportError:
-    st.error("Asegúrate de que los archivos `pages/1_Analisis_WX.py` y `pages/2_Analisis_Notam.py` existan.")
-    st.stop()
-
 # Configuración de la Página
 st.set_page_config(page_title="Operation Health Check | Flex Watch", page_icon="🩺", layout="wide")
 st.title("🩺 Operation Health Check")
 st.markdown("Pega tu itinerario para analizar el impacto de WX y NOTAMs en cada vuelo, ahora con información de pistas.")
 
 # --- Funciones de la Página ---
-
-class PDF(FPDF):
-    def header(self):
-        self.set_font('Helvetica', 'B', 12)
-        self.cell(0, 10, 'Briefing Operacional', 0, 1, 'C')
-        self.ln(5)
-
-    def footer(self):
-        self.set_y(-15)
-        self.set_font('Helvetica', 'I', 8)
-        self.cell(0, 10, f'Página {self.page_no()}', 0, 0, 'C')
-
-def create_report_pdf(df_report):
-    pdf = PDF()
-    pdf.add_page()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    
-    pdf.set_font('Helvetica', 'B', 16)
-    report_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    pdf.cell(0, 10, f"Análisis de Itinerario - {report_date}", 0, 1, 'L')
-    pdf.set_font('Helvetica', 'I', 10)
-    pdf.cell(0, 10, "(Todas las horas en UTC)", 0, 1, 'L')
-    pdf.ln(10)
-
-    for _, row in df_report.iterrows():
-        pdf.set_font('Helvetica', 'B', 12)
-        flight_title = f"Vuelo: {row['Flight']} ({row['From_IATA']} -> {row['To_IATA']})"
-        pdf.cell(0, 10, flight_title, 0, 1)
-
-        pdf.set_font('Helvetica', '', 10)
-        metrics_text = (
-            f"Matrícula: {row['Reg.'] or 'N/A'}  |  "
-            f"STD (UTC): {str(row['STD']).split(' ')[-1] if ' ' in str(row['STD']) else str(row['STD'])}  |  "
-            f"STA (UTC): {str(row['STA']).split(' ')[-1] if ' ' in str(row['STA']) else str(row['STA'])}"
-        )
-        pdf.cell(0, 10, metrics_text, 0, 1)
-
-        pdf.set_font('Helvetica', '', 10)
-        analysis_text = row['AI_Analysis'].encode('latin-1', 'replace').decode('latin-1')
-        pdf.multi_cell(0, 5, analysis_text)
-        
-        pdf.ln(5)
-        pdf.line(pdf.get_x(), pdf.get_y(), pdf.get_x() + 190, pdf.get_y())
-        pdf.ln(5)
-
-    return pdf.output(dest='S').encode('latin-1')
-
-def get_runways_for_airport(icao_code):
-    """Busca en el DataFrame las pistas para un código ICAO y devuelve una lista."""
-    if runways_df is None or icao_code == "NO ENCONTRADO":
-        return []
-    
-    airport_runways = runways_df[runways_df['airport_ident'] == icao_code]
-    
-    runway_list = []
-    if not airport_runways.empty:
-        runway_list.extend(airport_runways['le_ident'].dropna().tolist())
-        runway_list.extend(airport_runways['he_ident'].dropna().tolist())
-        
-    return sorted(list(set(runway_list)))
-
-def iata_to_icao(iata_code):
-    if pd.isna(iata_code) or iata_code == '': return ''
-    try: return airports[str(iata_code).strip().upper()]['icao']
-    except KeyError: return "NO ENCONTRADO"
-
-AI_MODELS = ["gpt-4o-mini", "gemini-2.5-flash", "grok-3", "gpt-4.1-mini"]
-
-def call_ai_with_fallback(prompt, model_list):
-    for model in model_list:
-        try:
-            if model != model_list[0]: print(f"INFO: Reintentando con {model}...")
-            client = Client()
-            response = client.chat.completions.create(model=model, messages=[{"role": "user", "content": prompt}])
-            if response.choices and response.choices[0].message.content:
-                return response.choices[0].message.content
-            raise Exception("Respuesta de IA vacía.")
-        except Exception as e:
-            print(f"Modelo {model} falló con error: {e}")
-            continue
-    return "❌ Todos los modelos de IA fallaron."
-
-@st.cache_data(ttl=1800)
-def analyze_flight_health(flight_info, taf_origin, taf_dest, notams_origin, notams_dest, runways_origin, runways_dest):
-    runways_origin_str = ", ".join(runways_origin) if runways_origin else "No disponibles"
-    runways_dest_str = ", ".join(runways_dest) if runways_dest else "No disponibles"
-    
-    prompt = f"""
-    Actúa como un despachador de vuelos experto y un meteorólogo. Tu tarea es analizar el siguiente vuelo y determinar su 'estado de salud/condiciones' operacionales relevantes. Todas las horas proporcionadas (STD, STA, TAF, NOTAM) están en formato UTC.
-
-    **Datos del Vuelo:**
-    * Vuelo: {flight_info['Flight']}
-    * Ruta: {flight_info['From_ICAO']} ({flight_info['From_IATA']}) -> {flight_info['To_ICAO']} ({flight_info['To_IATA']})
-    * Matrícula (Reg.): {flight_info['Reg.']}
-    * Hora de Salida (STD UTC): {flight_info['STD']}
-    * Hora de Llegada (STA UTC): {flight_info['STA']}
-
-    **Infraestructura de Pistas:**
-    * Pistas Disponibles en Origen ({flight_info['From_ICAO']}): [{runways_origin_str}]
-    * Pistas Disponibles en Destino ({flight_info['To_ICAO']}): [{runways_dest_str}]
-
-    **Datos Meteorológicos (TAF UTC):**
-    * TAF Origen ({flight_info['From_ICAO']}): {taf_origin or "No disponible"}
-    * TAF Destino ({flight_info['To_ICAO']}): {taf_dest or "No disponible"}
-
-    **Datos NOTAM (Resumen IA UTC):**
-    * NOTAMs Origen ({flight_info['From_ICAO']}): {notams_origin or "No disponibles"}
-    * NOTAMs Destino ({flight_info['To_ICAO']}): {notams_dest or "No disponibles"}
-
-    **Tu Análisis:**
-    1.  **Análisis WX:** ¿El TAF del origen o destino muestra condiciones adversas cerca de las horas de operación?
-    2.  **Análisis NOTAM y Pistas:** Basado en la lista de pistas disponibles, si un NOTAM menciona un cierre de pista, determina el impacto real. ¿Quedan pistas operativas? ¿Son adecuadas? Menciona qué pistas quedan disponibles.
-    3.  **Conclusión:** Proporciona un resumen conciso (máximo 3-4 frases) del estado del vuelo. Clasifícalo con un emoji y una palabra clave al inicio de tu respuesta: `✅ Normal`, `⚠️ Monitorear`, o `❌ En Riesgo`.
-    """
-    return call_ai_with_fallback(prompt, AI_MODELS)
+# La descarga, los análisis de IA y el PDF viven en core.health_check y core.reporte; aquí solo se dibuja
+
+def render_flight_slot(row):
+    """Dibuja la cabecera del vuelo y devuelve el espacio donde aparecerá su análisis."""
+    st.subheader(f"✈️ Vuelo: {row['Flight']} ({row['From_IATA']} → {row['To_IATA']})", anchor=False)
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Matrícula (Reg.)", value=row['Reg.'] or "N/A")
+    col2.metric("Hora Salida (STD UTC)", value=str(row['STD']).split(' ')[-1] if ' ' in str(row['STD']) else str(row['STD']))
+    col3.metric("Hora Llegada (STA UTC)", value=str(row['STA']).split(' ')[-1] if ' ' in str(row['STA']) else str(row['STA']))
+    placeholder = st.empty()
+    placeholder.caption("⏳ Esperando NOTAMs, TAF y análisis de IA...")
+    st.divider()
+    return placeholder
 
 # --- Interfaz de Usuario ---
 st.header("1. Pega tu Itinerario Aquí")
@@ -169,65 +51,81 @@ st.info("Haz clic en la primera celda y pega los datos (Ctrl+V). Asegúrate de q
 
 df_template = pd.DataFrame([{"Order": "","Flight": "","Date": "","ST": "","State": "","STD": "","STA": "","Best DT": "","Best AT": "","From": "","To": "","Reg.": "","Own / Sub": "","Delay": "","Pax(F/C/Y)": ""}])
 edited_df = st.data_editor(df_template, num_rows="dynamic", use_container_width=True, key="itinerary_editor")
+uploaded_file = st.file_uploader(
+    "...o sube el itinerario completo (CSV o Excel)", type=["csv", "xlsx", "xls"],
+    help="Columnas `Flight`, `From`, `To`, `STD` y `STA` (IATA y UTC); `Date`, `Reg.` y `Order` son opcionales. Si hay archivo, se usa en lugar de la tabla.",
+)
 
 if 'analysis_df' not in st.session_state:
     st.session_state.analysis_df = None
 
+batch_mode = st.toggle(
+    "📦 Analizar en lote los vuelos que comparten aeropuertos", value=True,
+    help="Una sola consulta a la IA por grupo de vuelos, con el contexto de cada aeropuerto una sola vez.",
+)
+window_hours = st.number_input(
+    "🕒 Margen de la ventana del vuelo (horas)", min_value=0.0, max_value=24.0,
+    value=ventanas_vuelo.MARGEN_HORAS, step=0.5,
+    help="Solo se envían a la IA los NOTAMs y periodos del TAF vigentes entre STD ± margen en origen y STA ± margen en destino.",
+)
+
 if st.button("🩺 Analizar Salud del Itinerario", type="primary"):
-    df_itinerary = edited_df.dropna(how='all').reset_index(drop=True)
-    if 'Flight' not in df_itinerary.columns or pd.isna(df_itinerary['Flight'].iloc[0]) or df_itinerary['Flight'].iloc[0] == '':
+    if uploaded_file is not None:
+        try:
+            df_itinerary = itinerario.leer_itinerario(uploaded_file)
+        except Exception as e:
+            st.error(f"❌ No se pudo leer el archivo `{uploaded_file.name}`: {e}")
+            st.stop()
+    else:
+        df_itinerary = edited_df.dropna(how='all').reset_index(drop=True)
+    if df_itinerary.empty or 'Flight' not in df_itinerary.columns or pd.isna(df_itinerary['Flight'].iloc[0]) or df_itinerary['Flight'].iloc[0] == '':
         st.warning("⚠️ La tabla está vacía o no tiene vuelos.")
     else:
         st.header("2. Itinerario Identificado y Convertido a ICAO")
-        df_itinerary['From_IATA'] = df_itinerary['From']
-        df_itinerary['To_IATA'] = df_itinerary['To']
-        df_itinerary['From_ICAO'] = df_itinerary['From_IATA'].apply(iata_to_icao)
-        df_itinerary['To_ICAO'] = df_itinerary['To_IATA'].apply(iata_to_icao)
-        st.dataframe(df_itinerary[['Order', 'Flight', 'From_IATA', 'To_IATA', 'From_ICAO', 'To_ICAO', 'STD', 'STA']], use_container_width=True)
-
-        with st.spinner("Optimizando... Obteniendo todos los NOTAMs necesarios..."):
-            all_airports_icao = pd.concat([df_itinerary['From_ICAO'], df_itinerary['To_ICAO']]).unique()
-            notam_summaries = {}
-            for airport_icao in all_airports_icao:
-                if airport_icao and airport_icao != "NO ENCONTRADO":
-                    file_path = buscar_y_descargar_notams([airport_icao])
-                    if file_path and os.path.exists(file_path):
-                        with open(file_path, 'rb') as f: file_content = f.read()
-                        notam_summaries[airport_icao] = analizar_notams_raw(file_content, airport_icao)
-                        os.remove(file_path)
-                    else: notam_summaries[airport_icao] = "No se pudieron obtener los NOTAMs."
-        st.success("Todos los NOTAMs han sido recopilados y pre-analizados.")
-
-        progress_bar = st.progress(0, text="Analizando vuelos...")
-        results = []
+        df_itinerary = itinerario.preparar_itinerario(df_itinerary, airports)
+        st.dataframe(df_itinerary[['Order', 'Flight', 'From_IATA', 'To_IATA', 'From_ICAO', 'To_ICAO', 'STD_UTC', 'STA_UTC']], use_container_width=True)
+        airport_windows = itinerario.ventanas_por_aeropuerto(df_itinerary)
+        st.caption(f"{len(df_itinerary)} tramos · {len(airport_windows)} aeropuertos distintos a consultar.")
+        runways_lote = health_check.pistas_del_itinerario(df_itinerary, runway_index) if runway_index else {}
+
+        st.header("3. Resultados del Health Check")
+        progress_bar = st.progress(0, text="Descargando NOTAMs y TAFs de todos los aeropuertos...")
+        # Lo que otra sesión ya estaba descargando o analizando se espera en lugar de repetirse
+        joined_status = st.empty()
+        joined = []
+
+        def on_joined(tipo, etiquetas):
+            joined.append(peticiones_en_curso.describir(tipo, etiquetas))
+            joined_status.info("🔗 Unido a peticiones en curso de otras sesiones: " + "; ".join(joined))
+        results = {}
         total_flights = len(df_itinerary)
-        for index, row in df_itinerary.iterrows():
-            origin_icao, dest_icao = row['From_ICAO'], row['To_ICAO']
-            runways_origin = get_runways_for_airport(origin_icao)
-            runways_dest = get_runways_for_airport(dest_icao)
-            taf_origin = obtener_taf_de_api(origin_icao) if origin_icao != "NO ENCONTRADO" else "Código ICAO no válido"
-            taf_dest = obtener_taf_de_api(dest_icao) if dest_icao != "NO ENCONTRADO" else "Código ICAO no válido"
-            notams_origin = notam_summaries.get(origin_icao, "No disponible")
-            notams_dest = notam_summaries.get(dest_icao, "No disponible")
-            ai_summary = analyze_flight_health(row, taf_origin, taf_dest, notams_origin, notams_dest, runways_origin, runways_dest)
-            results.append(ai_summary)
-            progress_text = f"Analizando vuelo {row['Flight']} ({row['From_IATA']}-{row['To_IATA']})... [{index+1}/{total_flights}]"
-            progress_bar.progress((index + 1) / total_flights, text=progress_text)
+        # Cada vuelo tiene su espacio desde el inicio; el análisis se escribe en él a medida que llega
+        placeholders = {index: render_flight_slot(row) for index, row in df_itinerary.iterrows()}
+
+        # Los hilos del planificador escriben en los placeholders con el contexto de esta ejecución
+        ctx = get_script_run_ctx()
+        check = health_check.ejecutar_health_check(
+            df_itinerary, runways_lote, en_lote=batch_mode, margen_horas=window_hours,
+            al_fragmento=lambda index, texto: placeholders[index].markdown(texto),
+            inicializar_hilo=lambda: add_script_run_ctx(threading.current_thread(), ctx),
+            al_unirse=on_joined,
+        )
+        done = 0
+        for group, analyses in check:
+            for index in group:
+                done += 1
+                row = df_itinerary.loc[index]
+                results[index] = analyses[index]
+                placeholders[index].markdown(results[index])
+                progress_text = f"Vuelo {row['Flight']} ({row['From_IATA']}-{row['To_IATA']}) analizado... [{done}/{total_flights}]"
+                progress_bar.progress(done / total_flights, text=progress_text)
         progress_bar.empty()
+        stats_ia = llm_cache.estadisticas_ia()["total"]
+        st.caption(f"Caché de IA: {stats_ia['tasa_aciertos']:.0%} de aciertos ({stats_ia['aciertos']} de {stats_ia['aciertos'] + stats_ia['fallos']} consultas, {stats_ia['entradas']} respuestas guardadas).")
 
-        st.header("3. Resultados del Health Check")
-        df_itinerary['AI_Analysis'] = results
+        df_itinerary['AI_Analysis'] = [results[index] for index in df_itinerary.index]
         st.session_state.analysis_df = df_itinerary.copy()
 
-        for index, row in st.session_state.analysis_df.iterrows():
-            st.subheader(f"✈️ Vuelo: {row['Flight']} ({row['From_IATA']} → {row['To_IATA']})", anchor=False)
-            col1, col2, col3 = st.columns(3)
-            col1.metric("Matrícula (Reg.)", value=row['Reg.'] or "N/A")
-            col2.metric("Hora Salida (STD UTC)", value=str(row['STD']).split(' ')[-1] if ' ' in str(row['STD']) else str(row['STD']))
-            col3.metric("Hora Llegada (STA UTC)", value=str(row['STA']).split(' ')[-1] if ' ' in str(row['STA']) else str(row['STA']))
-            st.markdown(row['AI_Analysis'])
-            st.divider()
-
 # --- Sección de Exportación / Impresión ---
 if st.session_state.analysis_df is not None and not st.session_state.analysis_df.empty:
     st.header("4. Acciones", anchor=False)
@@ -235,7 +133,7 @@ if st.session_state.analysis_df is not None and not st.session_state.analysis_df
     col1, col2 = st.columns(2)
 
     with col1:
-        pdf_data = create_report_pdf(st.session_state.analysis_df)
+        pdf_data = reporte.crear_reporte_pdf(st.session_state.analysis_df)
         st.download_button(
             label="📄 Descargar Reporte en PDF",
             data=pdf_data,
@@ -249,6 +147,7 @@ if st.session_state.analysis_df is not None and not st.session_state.analysis_df
         # Usamos un botón de Streamlit normal que, al ser presionado, inyecta
         # el código JavaScript para abrir el diálogo de impresión.
         if st.button("🖨️ Imprimir Reporte", use_container_width=True):
+            import streamlit.components.v1 as components
             components.html(
                 "<script>window.print();</script>",
                 height=0,
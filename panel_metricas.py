@@ -0,0 +1,72 @@
+import json
+from datetime import datetime, timezone
+
+import pandas as pd
+import streamlit as st
+
+from core import peticiones_en_curso, trazas
+
+VENTANAS = {"Última hora": 3600, "Últimas 24 h": 86400, "Todo el búfer": None}
+
+
+def mostrar():
+    """Vista oculta de métricas (`/?metricas`): p50/p95 por etapa a partir del búfer de trazas del proceso."""
+    st.title("📈 Métricas por etapa")
+    st.caption(
+        f"Tramos medidos en este proceso (búfer de {trazas.CAPACIDAD} tramos). "
+        "Exportación: `FLEXWATCH_TRAZAS_ARCHIVO` (JSON lines) y `FLEXWATCH_METRICAS_PUERTO` (`/metrics`, Prometheus)."
+    )
+    ventana = st.selectbox("Ventana", list(VENTANAS), index=0)
+    segundos = VENTANAS[ventana]
+    desde = None if segundos is None else datetime.now(timezone.utc).timestamp() - segundos
+
+    resumen = trazas.resumen_por_etapa(desde)
+    if not resumen:
+        st.info("Todavía no hay tramos registrados en esta ventana.")
+        return
+
+    df = pd.DataFrame(resumen)
+    df["ultimo"] = pd.to_datetime(df["ultimo"], unit="s", utc=True).dt.strftime("%Y-%m-%d %H:%M:%S")
+    st.dataframe(
+        df.rename(columns={
+            "etapa": "Etapa", "tramos": "Tramos", "fallos": "Fallos", "p50_ms": "p50 (ms)", "p95_ms": "p95 (ms)",
+            "max_ms": "Máx. (ms)", "total_s": "Total (s)", "ultimo": "Último (UTC)",
+        }),
+        hide_index=True, use_container_width=True,
+        column_config={c: st.column_config.NumberColumn(format="%.1f") for c in ("p50 (ms)", "p95 (ms)", "Máx. (ms)", "Total (s)")},
+    )
+    st.bar_chart(df.set_index("etapa")[["p50_ms", "p95_ms"]], horizontal=True)
+
+    compartidas = peticiones_en_curso.estadisticas()
+    total = compartidas.pop("total")
+    if compartidas:
+        st.caption(
+            f"Peticiones compartidas entre sesiones: {total['unidas']} unidas a una en curso, "
+            f"{total['propias']} ejecutadas, {total['en_curso']} en curso ahora."
+        )
+        st.dataframe(pd.DataFrame([
+            {"Tipo": tipo, "Ejecutadas": datos["propias"], "Unidas": datos["unidas"]} for tipo, datos in compartidas.items()
+        ]), hide_index=True, use_container_width=True)
+
+    etapa = st.selectbox("Tramos recientes de la etapa", df["etapa"].tolist())
+    recientes = trazas.tramos(desde, etapa)[-100:][::-1]
+    st.dataframe(pd.DataFrame([
+        {
+            "Inicio (UTC)": datetime.fromtimestamp(t["inicio"], timezone.utc).strftime("%H:%M:%S"),
+            "ms": round(t["duracion"] * 1000, 1), "OK": t["ok"], "Hilo": t["hilo"],
+            "Atributos": json.dumps(t.get("atributos", {}), ensure_ascii=False, default=str), "Error": t.get("error", ""),
+        }
+        for t in recientes
+    ]), hide_index=True, use_container_width=True)
+
+    col1, col2 = st.columns(2)
+    col1.download_button(
+        "⬇️ Descargar tramos (JSON lines)",
+        data="\n".join(json.dumps(t, ensure_ascii=False, default=str) for t in trazas.tramos(desde)),
+        file_name=f"trazas_{datetime.now(timezone.utc):%Y%m%d_%H%M}.jsonl", use_container_width=True,
+    )
+    if col2.button("🗑️ Vaciar búfer", use_container_width=True):
+        trazas.limpiar()
+        st.rerun()
+    with st.expander("Formato Prometheus"):
+        st.code(trazas.texto_prometheus(), language="text")
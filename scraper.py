@@ -1,131 +1,272 @@
-import os
+import argparse
+import json
+import socketserver
 import sys
+import threading
 import time
-import pandas as pd
-from datetime import datetime
-from g4f.client import Client
-from playwright.sync_api import sync_playwright, Error
+from datetime import datetime, timezone
+from core import analisis, faa, fuentes_notam, notam_parser, notam_rules, runways
+from core import llm_cache
+from core.scheduler import PlanificadorRecursos, en_orden_de_llegada
 
 # This script is designed to be called from the command line.
-# It expects one argument: the airport ICAO code.
+#   python scraper.py SKBO                     -> writes notam_result_SKBO.txt (single airport, as before)
+#   python scraper.py SKBO SCEL KMIA --json    -> one JSON line per airport on stdout (or --salida)
+#   python scraper.py --archivo icaos.txt      -> same, ICAOs read from a file ("-" for stdin)
+#   python scraper.py --daemon [--puerto N]    -> long-running process taking jobs on a local socket
+# NOTAMs and AI summaries are shared with the Streamlit pages through the persistent cache.
+# Log lines go to stderr so stdout stays machine-readable in JSON mode.
 
-def manejar_pagina_bienvenida(page):
-    """Handles the welcome screen by clicking the accept button if it appears."""
-    bienvenida_locator = "button:has-text(\"I've read and understood above statements\")"
-    try:
-        if page.locator(bienvenida_locator).is_visible(timeout=3000):
-            page.click(bienvenida_locator)
-            time.sleep(2)
-    except Error:
-        pass
-
-def buscar_y_descargar_notams(aeropuerto):
-    """Automates Firefox to search and download NOTAMs for a single airport."""
-    print(f"INFO: Starting Playwright process for {aeropuerto}...")
-    download_dir = os.path.join(os.getcwd(), "descargas_notam")
-    os.makedirs(download_dir, exist_ok=True)
-    
+PUERTO_DAEMON = 8766
+LIMITES_LOTE = {"notam": 1, "ia": 4}
+
+def log(mensaje):
+    print(mensaje, file=sys.stderr, flush=True)
+
+def buscar_y_descargar_notams(aeropuerto, fuente=None):
+    """Returns the airport NOTAMs from the persistent cache or downloads them with the configured NOTAM source."""
+    # FLEXWATCH_FUENTE_NOTAM=http skips the browser and queries the FAA search endpoint directly
+    log(f"INFO: Requesting NOTAMs for {aeropuerto} (cache or '{fuentes_notam.obtener_fuente(fuente).nombre}' source)...")
+    df = faa.buscar_notams_por_lote([aeropuerto], download_dir="descargas_notam", fuente=fuente).get(aeropuerto.strip().upper())
+    if df is not None:
+        log(f"INFO: NOTAMs ready ({len(df)} records).")
+    return df
+
+def pistas_del_aeropuerto(aeropuerto):
+    """Looks up the open runway idents for the airport in the runway index."""
     try:
-        with sync_playwright() as p:
-            print(f"INFO: Launching headless browser...")
-            browser = p.firefox.launch(headless=True)
-            context = browser.new_context(
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:125.0) Gecko/20100101 Firefox/125.0",
-                accept_downloads=True
-            )
-            page = context.new_page()
-            print(f"INFO: Navigating to FAA portal...")
-            page.goto("https://notams.aim.faa.gov/notamSearch/", wait_until="domcontentloaded")
-            manejar_pagina_bienvenida(page)
-            
-            input_locator = "input[name='designatorsForLocation']"
-            page.wait_for_selector(input_locator, timeout=10000)
-            page.fill(input_locator, aeropuerto)
-            page.press(input_locator, "Enter")
-            manejar_pagina_bienvenida(page)
-
-            print(f"INFO: Waiting for data table...")
-            page.wait_for_function(
-                "() => document.querySelectorAll('table.table.table-striped').length > 0 && document.querySelectorAll('table.table.table-striped')[0].rows.length > 1",
-                timeout=30000
-            )
-            
-            print(f"INFO: Downloading NOTAM file...")
-            download_locator = "span.icon-excel"
-            with page.expect_download() as download_info:
-                page.click(download_locator)
-            
-            download = download_info.value
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            file_path = os.path.join(download_dir, f"NOTAMs_{aeropuerto}_{timestamp}.xls")
-            download.save_as(file_path)
-            
-            context.close()
-            browser.close()
-            print(f"INFO: Download successful. File saved at {file_path}")
-            return file_path
-            
-    except Exception as e:
-        print(f"ERROR: A Playwright error occurred: {e}")
-        return None
+        return runways.obtener_indice().cabeceras(aeropuerto)
+    except FileNotFoundError:
+        log("ERROR: assets/runways.csv not found, runway closures cannot be cross-checked.")
+        return []
 
-def analizar_notams_con_ia(ruta_archivo, aeropuerto):
-    """Reads the downloaded file and sends it to the IA for analysis."""
-    print(f"INFO: Analyzing file {ruta_archivo} with AI...")
+def evaluar_notams(df, aeropuerto):
+    """Parses the NOTAMs and classifies them with the local rules against the airport runways."""
+    return notam_rules.evaluar_aeropuerto(notam_parser.parsear_notams(df), aeropuerto, pistas_del_aeropuerto(aeropuerto))
+
+def analizar_notams_con_ia(df, aeropuerto, evaluacion=None):
+    """Classifies the NOTAMs locally and sends the critical ones to the IA for analysis."""
+    log(f"INFO: Analyzing NOTAMs for {aeropuerto}...")
     try:
-        df = pd.read_excel(ruta_archivo, skiprows=4)
-        df.columns = ["Location", "NOTAM #/LTA #", "Class", "Issue Date (UTC)",
-                      "Effective Date (UTC)", "Expiration Date (UTC)", "Condition"]
-        
         if df.empty:
             return f"✅ No se encontraron NOTAMs activos para **{aeropuerto}**."
-            
-        datos_texto = df.to_string()
-        prompt = f"""
-        Eres un asistente experto en operaciones aéreas. Analiza los siguientes NOTAMs para el aeropuerto {aeropuerto}.
-        Clasifícalos por tipo (CIERRES DE PISTA, OBSTÁCULOS, RODAJE, etc.), explica su impacto y genera un resumen final con los puntos más críticos.
-        Presenta el resultado en Markdown.
-        DATOS DE NOTAMs:
-        {datos_texto}
-        """
-        client = Client()
-        response = client.chat.completions.create(
-            model="gpt-4-turbo", messages=[{"role": "user", "content": prompt}]
-        )
-        if not response.choices or not response.choices[0].message.content:
-            raise Exception("La respuesta de la IA llegó vacía.")
-        
-        print("INFO: AI analysis complete.")
-        return response.choices[0].message.content
+        evaluacion = evaluacion or evaluar_notams(df, aeropuerto)
+        if not evaluacion.requiere_ia:
+            log("INFO: No critical NOTAMs, local summary generated.")
+        # Same prompt, cache key and NOTAM history as the Streamlit pages (core.analisis)
+        resumen = analisis.analizar_notams(df, aeropuerto, evaluacion.pistas_aeropuerto, evaluacion=evaluacion)
+        if evaluacion.requiere_ia:
+            log("INFO: AI analysis complete.")
+        return resumen
 
     except Exception as e:
         error_msg = f"❌ Error durante el análisis con IA para {aeropuerto}: {e}"
-        print(f"ERROR: {error_msg}")
+        log(f"ERROR: {error_msg}")
         return error_msg
 
-if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("ERROR: Usage: python scraper.py <ICAO_CODE>")
-        sys.exit(1)
-        
-    icao_code = sys.argv[1]
-    
+def _registros(df):
+    """DataFrame rows as JSON-ready dicts (ISO 8601 dates, null for missing values)."""
+    return json.loads(df.to_json(orient="records", date_format="iso"))
+
+def resultado_aeropuerto(aeropuerto, df, segundos_notams, fuente):
+    """One JSON-lines record: raw and parsed NOTAMs, the summary and the timings."""
+    inicio = time.perf_counter()
+    registro = {
+        "icao": aeropuerto,
+        "ok": False,
+        "fuente": fuente,
+        "generado": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+    if df is None:
+        registro["error"] = f"Failed to download NOTAMs for {aeropuerto}."
+        registro["tiempos"] = {"notams_s": round(segundos_notams, 3)}
+        return registro
+
+    evaluacion = evaluar_notams(df, aeropuerto) if not df.empty else None
+    resumen = analizar_notams_con_ia(df, aeropuerto, evaluacion)
+    if evaluacion is not None:
+        vigentes = set(evaluacion.vigentes["notam_id"])
+        parseados = evaluacion.tabla.assign(en_ventana=evaluacion.tabla["notam_id"].isin(vigentes))
+    registro.update(
+        ok=llm_cache.es_respuesta_valida(resumen),
+        pistas=evaluacion.pistas_aeropuerto if evaluacion is not None else [],
+        requiere_ia=bool(evaluacion is not None and evaluacion.requiere_ia),
+        resumen=resumen,
+        notams=_registros(df),
+        parseados=_registros(parseados) if evaluacion is not None else [],
+        tiempos={"notams_s": round(segundos_notams, 3), "analisis_s": round(time.perf_counter() - inicio, 3)},
+    )
+    if not registro["ok"]:
+        registro["error"] = resumen
+    return registro
+
+def normalizar_icaos(valores):
+    """Unique ICAO codes, in order, from comma/space separated values; '#' starts a comment."""
+    icaos = []
+    for valor in valores:
+        valor = valor.split("#", 1)[0]
+        icaos.extend(c.strip().upper() for c in valor.replace(",", " ").split() if c.strip())
+    return list(dict.fromkeys(icaos))
+
+def procesar_lote(aeropuertos, emitir, fuente=None):
+    """
+    Downloads the NOTAMs of all airports (one FAA search per block) and analyzes them concurrently.
+
+    Each airport record is passed to `emitir` as soon as its analysis finishes.
+    """
+    nombre_fuente = fuentes_notam.obtener_fuente(fuente).nombre
+    inicio = time.perf_counter()
+    log(f"INFO: Requesting NOTAMs for {len(aeropuertos)} airports (cache or '{nombre_fuente}' source)...")
+    try:
+        notams = faa.buscar_notams_por_lote(aeropuertos, download_dir="descargas_notam", fuente=fuente)
+    except Exception as e:
+        log(f"ERROR: NOTAM download failed: {e}")
+        notams = {}
+    segundos_notams = time.perf_counter() - inicio
+
+    with PlanificadorRecursos(LIMITES_LOTE) as planificador:
+        futuros = {
+            icao: planificador.enviar("ia", resultado_aeropuerto, icao, notams.get(icao), segundos_notams, nombre_fuente)
+            for icao in aeropuertos
+        }
+        for icao, futuro in en_orden_de_llegada(futuros):
+            try:
+                registro = futuro.result()
+            except Exception as e:
+                registro = {"icao": icao, "ok": False, "fuente": nombre_fuente, "error": str(e)}
+            emitir(registro)
+    return time.perf_counter() - inicio
+
+def escritor_json_lines(salida):
+    """Thread-safe `emitir` that writes one JSON object per line and flushes it."""
+    lock = threading.Lock()
+
+    def emitir(registro):
+        linea = json.dumps(registro, ensure_ascii=False)
+        with lock:
+            salida.write(linea + "\n")
+            salida.flush()
+    return emitir
+
+class ManejadorTrabajos(socketserver.StreamRequestHandler):
+    """
+    One job per line: a JSON object `{"id": ..., "aeropuertos": [...]}` or plain ICAO codes.
+
+    Replies with one JSON line per airport (tagged with the job id) and a final `{"fin": true}` line.
+    """
+
+    def handle(self):
+        for linea in self.rfile:
+            linea = linea.decode("utf-8").strip()
+            if not linea:
+                continue
+            trabajo = None
+            try:
+                if linea.startswith(("{", "[", '"')):
+                    pedido = json.loads(linea)
+                    if not isinstance(pedido, dict):
+                        raise ValueError(f"expected a JSON object, got {type(pedido).__name__}")
+                    trabajo = pedido.get("id")
+                    valores = pedido.get("aeropuertos") or []
+                    aeropuertos = normalizar_icaos([valores] if isinstance(valores, str) else valores)
+                else:
+                    aeropuertos = normalizar_icaos([linea])
+            except ValueError as e:
+                self._responder({"trabajo": trabajo, "fin": True, "ok": False, "error": f"Invalid job: {e}"})
+                continue
+            log(f"INFO: Job {trabajo or '-'} received for {', '.join(aeropuertos) or 'no airports'}.")
+            segundos = procesar_lote(aeropuertos, lambda registro: self._responder({"trabajo": trabajo, **registro}), self.server.fuente)
+            self._responder({"trabajo": trabajo, "fin": True, "ok": True, "aeropuertos": len(aeropuertos), "segundos": round(segundos, 3)})
+
+    def _responder(self, registro):
+        with self.server.lock_respuestas:
+            self.wfile.write((json.dumps(registro, ensure_ascii=False) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+class ServidorTrabajos(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, direccion, fuente=None):
+        super().__init__(direccion, ManejadorTrabajos)
+        self.fuente = fuente
+        self.lock_respuestas = threading.Lock()
+
+def ejecutar_daemon(puerto=PUERTO_DAEMON, fuente=None):
+    """Serves jobs on 127.0.0.1:`puerto`; browsers, HTTP sessions and caches stay warm between jobs."""
+    with ServidorTrabajos(("127.0.0.1", puerto), fuente) as servidor:
+        log(f"INFO: Waiting for jobs on 127.0.0.1:{servidor.server_address[1]} (one JSON object or ICAO list per line).")
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            log("INFO: Daemon stopped.")
+
+def resumen_a_archivo(icao_code, fuente=None):
+    """Single-airport mode: writes the summary to notam_result_<ICAO>.txt, as the original script did."""
     # This is the file the Streamlit app will look for
     result_filename = f"notam_result_{icao_code}.txt"
 
-    downloaded_file = buscar_y_descargar_notams(icao_code)
-    
-    if downloaded_file:
-        summary = analizar_notams_con_ia(downloaded_file, icao_code)
+    df_notams = buscar_y_descargar_notams(icao_code, fuente)
+
+    if df_notams is not None:
+        summary = analizar_notams_con_ia(df_notams, icao_code)
         # Save the final summary to a text file
         with open(result_filename, "w", encoding="utf-8") as f:
             f.write(summary)
-        os.remove(downloaded_file) # Clean up the excel file
-        print(f"SUCCESS: Summary saved to {result_filename}")
-        sys.exit(0) # Exit with success code
+        log(f"SUCCESS: Summary saved to {result_filename}")
+        return 0 # Exit with success code
     else:
         # Create an error file if download fails
         with open(result_filename, "w", encoding="utf-8") as f:
             f.write(f"❌ No se pudo descargar la información de NOTAMs para {icao_code}.")
-        print(f"ERROR: Failed to download NOTAMs for {icao_code}.")
-        sys.exit(1) # Exit with error code
\ No newline at end of file
+        log(f"ERROR: Failed to download NOTAMs for {icao_code}.")
+        return 1 # Exit with error code
+
+def main():
+    parser = argparse.ArgumentParser(description="Downloads and analyzes FAA NOTAMs for one or many airports.")
+    parser.add_argument("aeropuertos", nargs="*", help="ICAO codes (comma or space separated).")
+    parser.add_argument("--archivo", help="File with ICAO codes, one or more per line ('-' reads stdin).")
+    parser.add_argument("--json", action="store_true", help="JSON lines output even for a single airport.")
+    parser.add_argument("--salida", help="Write the JSON lines to this file instead of stdout.")
+    parser.add_argument("--daemon", action="store_true", help="Keep running and take jobs on a local socket.")
+    parser.add_argument("--puerto", type=int, default=PUERTO_DAEMON, help="Daemon port on 127.0.0.1.")
+    parser.add_argument("--fuente", choices=sorted(fuentes_notam.FUENTES), help="NOTAM source (default: FLEXWATCH_FUENTE_NOTAM or playwright).")
+    args = parser.parse_args()
+
+    if args.daemon:
+        ejecutar_daemon(args.puerto, args.fuente)
+        return 0
+
+    valores = list(args.aeropuertos)
+    if args.archivo:
+        if args.archivo == "-":
+            valores.extend(sys.stdin)
+        else:
+            with open(args.archivo, encoding="utf-8") as f:
+                valores.extend(f)
+    aeropuertos = normalizar_icaos(valores)
+    if not aeropuertos:
+        parser.error("at least one ICAO code, --archivo or --daemon is required")
+
+    if len(aeropuertos) == 1 and not (args.json or args.archivo or args.salida):
+        return resumen_a_archivo(aeropuertos[0], args.fuente)
+
+    fallidos = []
+
+    def registrar(emitir):
+        def _emitir(registro):
+            if not registro["ok"]:
+                fallidos.append(registro["icao"])
+            emitir(registro)
+        return _emitir
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            segundos = procesar_lote(aeropuertos, registrar(escritor_json_lines(f)), args.fuente)
+    else:
+        segundos = procesar_lote(aeropuertos, registrar(escritor_json_lines(sys.stdout)), args.fuente)
+    log(f"INFO: {len(aeropuertos) - len(fallidos)}/{len(aeropuertos)} airports processed in {segundos:.1f}s.")
+    return 1 if fallidos else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
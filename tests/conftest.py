@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# La caché persistente se elige al importar `core.cache`: una temporal para no tocar la real
+os.environ.setdefault("FLEXWATCH_CACHE", os.path.join(tempfile.mkdtemp(prefix="flexwatch-tests-"), "cache.sqlite3"))
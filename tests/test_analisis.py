@@ -0,0 +1,20 @@
+from datetime import datetime, timedelta, timezone
+
+from core import analisis
+
+
+def test_analisis_taf_se_cachea_hasta_el_fin_de_validez_y_no_hasta_el_primer_fm(monkeypatch):
+    ahora = datetime.now(timezone.utc)
+    hora = ahora.replace(minute=0, second=0, microsecond=0)
+    # El primer FM ya empezó: el segmento BASE terminó, el TAF sigue vigente 20 h más
+    desde, fm, hasta = hora - timedelta(hours=2), hora, hora + timedelta(hours=20)
+    raw = (
+        f"TAF SKBO {desde:%d%H}00Z {desde:%d%H}/{hasta:%d%H} 27008KT 9999 SCT030 "
+        f"FM{fm:%d%H}00 30012KT 9999 BKN025"
+    )
+    llamadas = []
+    monkeypatch.setattr(analisis, "_consultar", lambda *args, **kwargs: llamadas.append(kwargs) or "resumen")
+
+    analisis.analizar_taf(raw, "SKBO")
+
+    assert llamadas[0]["expira"] >= ahora.timestamp() + analisis.TTL_ANALISIS_WX - 60
@@ -0,0 +1,31 @@
+import json
+
+from core import flight_batch
+
+
+def _veredicto(id_vuelo, estado="⚠️ Monitorear"):
+    return {"id": id_vuelo, "estado": estado, "analisis_wx": "TEMPO {RA}", "analisis_notam": "", "conclusion": "Ok."}
+
+
+def test_veredictos_en_streaming_salen_al_cerrarse_cada_objeto():
+    respuesta = "Aquí está:\n" + json.dumps([_veredicto("1"), _veredicto("2", "❌ En riesgo"), _veredicto("9")]) + "\nFin"
+    fragmentos = [respuesta[i:i + 5] for i in range(0, len(respuesta), 5)]
+    leidos = []
+
+    def transmitir():
+        for i, fragmento in enumerate(fragmentos):
+            leidos.append(i)
+            yield fragmento
+
+    salida = []
+    for id_vuelo, analisis in flight_batch.veredictos_en_streaming(transmitir(), [1, 2]):
+        salida.append((id_vuelo, analisis.splitlines()[0], len(leidos)))
+
+    assert [(i, estado) for i, estado, _ in salida] == [("1", "⚠️ Monitorear"), ("2", "❌ En Riesgo")]
+    # El primero se entrega antes de leer el resto de la respuesta
+    assert salida[0][2] < len(fragmentos)
+
+
+def test_veredictos_en_streaming_entrega_cada_vuelo_una_vez():
+    respuesta = json.dumps([_veredicto("1"), _veredicto("1", "✅ Normal"), _veredicto("2")])
+    assert [i for i, _ in flight_batch.veredictos_en_streaming([respuesta], ["1", "2"])] == ["1", "2"]
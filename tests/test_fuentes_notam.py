@@ -0,0 +1,62 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+from core import fuentes_notam
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+import faa_falso  # noqa: E402
+
+GRABACIONES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "grabaciones_faa")
+
+
+@pytest.fixture
+def portal():
+    servidor, url = faa_falso.iniciar_servidor(grabaciones=GRABACIONES)
+    yield servidor, url
+    servidor.shutdown()
+
+
+def test_fuente_http_reune_todas_las_paginas_grabadas(portal):
+    servidor, url = portal
+    df = fuentes_notam.FuenteHTTP(url_base=url).buscar(["skbo", "KMIA"])
+
+    # Tres páginas de dos (offset 0, 2 y 4), en el orden del portal
+    assert servidor.busquedas == 3
+    assert df["NOTAM #/LTA #"].tolist() == ["A0001/25", "A0002/25", "A0003/25", "07/442", "07/443"]
+    assert df["Location"].astype(str).tolist() == ["SKBO", "SKBO", "SKBO", "MIA", "MIA"]
+
+
+def test_fuente_http_mapea_clase_y_condicion(portal):
+    _, url = portal
+    df = fuentes_notam.FuenteHTTP(url_base=url).buscar(["SKBO", "KMIA"]).set_index("NOTAM #/LTA #")
+
+    # `classification` cuando viene; si no, `featureName`
+    assert df.loc["A0001/25", "Class"] == "International"
+    assert df.loc["A0003/25", "Class"] == "Obstruction"
+    assert df.loc["07/442", "Class"] == "Aerodrome"
+    assert df.loc["07/443", "Class"] == "Domestic"
+    # `traditionalMessage` cuando viene con texto; si no, `icaoMessage`
+    assert df.loc["A0001/25", "Condition"].endswith("RWY 13L/31R CLSD")
+    assert df.loc["A0002/25", "Condition"].endswith("TWY A CLSD")
+    assert df.loc["07/442", "Condition"] == "!MIA 07/442 MIA RWY 09/27 CLSD 2508011200-2508312359EST"
+    assert df.loc["07/442", "Expiration Date (UTC)"] == pd.Timestamp("2025-08-31 23:59", tz="UTC")
+    assert bool(df.loc["07/442", "Expiration EST"])
+
+
+def test_export_del_portal_falso_trae_todos_los_aeropuertos():
+    pytest.importorskip("openpyxl")
+    pytest.importorskip("python_calamine")
+    from core import faa
+
+    servidor = faa_falso.ServidorFAAFalso(("127.0.0.1", 0), clonar=True)
+    try:
+        aeropuertos = ["SCEL", "KMIA", "SKBO"]
+        df = faa.leer_excel_notams(servidor.export_de(aeropuertos))
+        # Los mismos NOTAMs que la tabla de la búsqueda, de todos los aeropuertos
+        assert len(df) == servidor.responder(aeropuertos, 0)["totalNotamCount"]
+        assert all(len(parte) for parte in faa.dividir_por_ubicacion(df, aeropuertos).values())
+    finally:
+        servidor.server_close()
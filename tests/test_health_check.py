@@ -0,0 +1,134 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pytest
+import requests
+
+from core import health_check, itinerario
+from core.cache import obtener_cache
+
+VEREDICTO = "✅ Normal\n\n**Conclusión:** Sin novedades."
+
+
+@pytest.fixture
+def itinerario_preparado():
+    salida = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(hours=3)
+    df = pd.DataFrame([
+        {"Flight": "FW100", "From": "BOG", "To": "MDE", "Reg.": "N701FW",
+         "STD": f"{salida:%Y-%m-%d %H:%M}", "STA": f"{salida + timedelta(hours=1):%Y-%m-%d %H:%M}"},
+        {"Flight": "FW101", "From": "MDE", "To": "BOG", "Reg.": "N701FW",
+         "STD": f"{salida + timedelta(hours=2):%Y-%m-%d %H:%M}", "STA": f"{salida + timedelta(hours=3):%Y-%m-%d %H:%M}"},
+    ])
+    return itinerario.preparar_itinerario(df)
+
+
+def _notams(aeropuertos, **_):
+    """Un cierre de pista vigente todo el día en cada aeropuerto, con el formato del export de la FAA."""
+    ahora = datetime.now(timezone.utc)
+    return {
+        icao: pd.DataFrame([{
+            "Location": icao, "NOTAM #/LTA #": f"01/{i:03d}", "Class": "Aerodrome",
+            "Issue Date (UTC)": f"{ahora - timedelta(days=1):%m/%d/%Y %H%M}",
+            "Effective Date (UTC)": f"{ahora - timedelta(hours=1):%m/%d/%Y %H%M}",
+            "Expiration Date (UTC)": f"{ahora + timedelta(days=1):%m/%d/%Y %H%M}",
+            "Condition": f"{icao} RWY 13/31 CLSD",
+        }])
+        for i, icao in enumerate(aeropuertos)
+    }
+
+
+def _tafs_caidos(aeropuertos):
+    raise requests.ConnectionError("aviationweather.gov no responde")
+
+
+@pytest.mark.parametrize("en_lote", [True, False])
+@pytest.mark.parametrize("en_vivo", [True, False])
+def test_health_check_sin_api_meteorologica(monkeypatch, itinerario_preparado, en_lote, en_vivo):
+    prompts = []
+
+    def consultar(prompt, modelos=None):
+        prompts.append(prompt)
+        # El lote no devuelve veredictos por id: cada vuelo se analiza por separado
+        return VEREDICTO if "TAF Origen" in prompt else ""
+
+    def transmitir(prompt, modelos=None):
+        yield consultar(prompt)
+
+    obtener_cache().limpiar()
+    monkeypatch.setattr(health_check, "buscar_notams_por_lote", _notams)
+    monkeypatch.setattr(health_check, "obtener_tafs", _tafs_caidos)
+    monkeypatch.setattr(health_check, "consultar_ia", consultar)
+    monkeypatch.setattr(health_check, "transmitir_ia", transmitir)
+
+    resultados = {}
+    al_fragmento = (lambda indice, texto: None) if en_vivo else None
+    for _, analisis in health_check.ejecutar_health_check(
+        itinerario_preparado, pistas_lote={}, en_lote=en_lote, al_fragmento=al_fragmento,
+    ):
+        resultados.update(analisis)
+
+    assert resultados == {indice: VEREDICTO for indice in itinerario_preparado.index}
+    assert prompts
+    for prompt in prompts:
+        # Sin TAF, pero con los NOTAMs de la ventana de cada tramo
+        assert "TAF: No disponible" in prompt or "TAF Origen (SKBO): No disponible" in prompt \
+            or "TAF Origen (SKRG): No disponible" in prompt
+        assert "RWY 13/31 CLSD" in prompt
+
+
+def test_lote_en_streaming_entrega_cada_veredicto_al_completarse(monkeypatch, itinerario_preparado):
+    eventos = []
+
+    def transmitir(prompt, modelos=None):
+        assert "Vuelos a evaluar" in prompt
+        respuesta = json.dumps([
+            {"id": str(indice), "estado": "✅ Normal", "analisis_wx": "Sin TAF.", "analisis_notam": "RWY 13/31 CLSD.",
+             "conclusion": f"Vuelo {indice} sin impacto."}
+            for indice in itinerario_preparado.index
+        ], ensure_ascii=False)
+        for inicio in range(0, len(respuesta), 7):
+            eventos.append("fragmento")
+            yield respuesta[inicio:inicio + 7]
+
+    obtener_cache().limpiar()
+    monkeypatch.setattr(health_check, "buscar_notams_por_lote", _notams)
+    monkeypatch.setattr(health_check, "obtener_tafs", _tafs_caidos)
+    monkeypatch.setattr(health_check, "consultar_ia", lambda prompt, modelos=None: pytest.fail("el lote no transmitió"))
+    monkeypatch.setattr(health_check, "transmitir_ia", transmitir)
+
+    resultados = {}
+    for _, analisis in health_check.ejecutar_health_check(
+        itinerario_preparado, pistas_lote={}, en_lote=True,
+        al_fragmento=lambda indice, texto: eventos.append(("veredicto", indice)),
+    ):
+        resultados.update(analisis)
+
+    assert set(resultados) == set(itinerario_preparado.index)
+    assert all(texto.startswith("✅ Normal") for texto in resultados.values())
+    # El primer veredicto llega antes de que termine la respuesta del lote
+    primero = eventos.index(("veredicto", itinerario_preparado.index[0]))
+    assert "fragmento" in eventos[primero + 1:]
+    assert eventos.count(("veredicto", itinerario_preparado.index[1])) == 1
+
+
+def test_cada_busqueda_de_notams_es_una_tarea(monkeypatch, itinerario_preparado):
+    busquedas = []
+
+    def notams(aeropuertos, **kwargs):
+        busquedas.append(list(aeropuertos))
+        return _notams(aeropuertos, **kwargs)
+
+    obtener_cache().limpiar()
+    monkeypatch.setattr(health_check, "MAX_DESIGNADORES_POR_BUSQUEDA", 1)
+    monkeypatch.setattr(health_check, "buscar_notams_por_lote", notams)
+    monkeypatch.setattr(health_check, "obtener_tafs", _tafs_caidos)
+    monkeypatch.setattr(health_check, "consultar_ia", lambda prompt, modelos=None: VEREDICTO)
+
+    resultados = {}
+    for _, analisis in health_check.ejecutar_health_check(itinerario_preparado, pistas_lote={}, en_lote=False):
+        resultados.update(analisis)
+
+    # Un bloque por aeropuerto, y las ventanas reúnen los NOTAMs de todos
+    assert sorted(busquedas) == [[icao] for icao in sorted(health_check.aeropuertos_validos(itinerario_preparado))]
+    assert resultados == {indice: VEREDICTO for indice in itinerario_preparado.index}
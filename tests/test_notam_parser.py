@@ -0,0 +1,28 @@
+import pandas as pd
+import pytest
+
+from core import notam_parser
+
+
+def _export(condicion):
+    return pd.DataFrame([{
+        "Location": "MIA", "NOTAM #/LTA #": "08/123", "Class": "Aerodrome",
+        "Issue Date (UTC)": "08/01/2025 1200", "Effective Date (UTC)": "08/01/2025 1200",
+        "Expiration Date (UTC)": "08/31/2025 2359", "Condition": condicion,
+    }])
+
+
+@pytest.mark.parametrize("condicion", [
+    "!MIA 08/123 MIA RWY 09/27 DTHR 500FT 2508011200-2508312359",
+    "!MIA 08/123 MIA RWY 09/27 dthr 500ft 2508011200-2508312359",
+    "!MIA 08/123 MIA RWY 09/27 Declared Dist Changed 2508011200-2508312359",
+])
+def test_umbral_desplazado_es_critico_sin_importar_mayusculas(condicion):
+    tabla = notam_parser.parsear_notams(_export(condicion))
+    assert tabla.loc[0, "categoria"] == notam_parser.PISTA
+    assert tabla.loc[0, "criticidad"] == notam_parser.CRITICO
+
+
+def test_senalizacion_de_pista_en_minusculas_es_rutinaria():
+    tabla = notam_parser.parsear_notams(_export("!MIA 08/123 MIA RWY 09/27 centerline markings faded 2508011200-2508312359"))
+    assert tabla.loc[0, "criticidad"] == notam_parser.RUTINARIO
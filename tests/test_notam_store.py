@@ -0,0 +1,35 @@
+import os
+import threading
+
+import pandas as pd
+
+from core.cache import CachePersistente
+from core.notam_store import AlmacenNotams
+
+
+def _descarga(numero):
+    return pd.DataFrame([{"NOTAM #/LTA #": f"01/{numero:03d}", "Condition": f"RWY 13/31 CLSD {numero}"}])
+
+
+def test_registrar_entre_procesos_no_pierde_descargas(tmp_path):
+    ruta = os.path.join(tmp_path, "cache.sqlite3")
+    anteriores = []
+    inicio = threading.Barrier(6)
+
+    def replica(numero):
+        # Cada réplica con su propia caché sobre el mismo archivo, como otro proceso
+        almacen = AlmacenNotams(CachePersistente(ruta))
+        inicio.wait()
+        for i in range(15):
+            cambios = almacen.registrar("SKBO", _descarga(numero * 100 + i))
+            if cambios is not None:
+                anteriores.extend(cambios.cancelados)
+
+    hilos = [threading.Thread(target=replica, args=(numero,)) for numero in range(6)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    # Cada descarga es la anterior de a lo sumo una: ninguna réplica pisó un registro que no leyó
+    assert len(anteriores) == len(set(anteriores)) == 6 * 15 - 1
@@ -0,0 +1,28 @@
+import json
+import socket
+import threading
+
+import pytest
+
+import scraper
+
+
+@pytest.fixture
+def daemon():
+    servidor = scraper.ServidorTrabajos(("127.0.0.1", 0))
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    yield servidor.server_address
+    servidor.shutdown()
+    servidor.server_close()
+
+
+@pytest.mark.parametrize("linea", ["[]", '"KMIA"', "{no es json"])
+def test_trabajo_invalido_responde_error_y_mantiene_la_conexion(daemon, linea):
+    with socket.create_connection(daemon, timeout=5) as conexion:
+        lector = conexion.makefile("r", encoding="utf-8")
+        for _ in range(2):
+            conexion.sendall((linea + "\n").encode("utf-8"))
+            registro = json.loads(lector.readline())
+            assert registro["fin"] is True
+            assert registro["ok"] is False
+            assert registro["error"].startswith("Invalid job")
@@ -0,0 +1,61 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from core import wx_decoder
+
+
+@pytest.mark.parametrize("techo_ft, esperada", [
+    (400, "LIFR"),
+    (499, "LIFR"),
+    (500, "IFR"),
+    (900, "IFR"),
+    (999, "IFR"),
+    (1000, "MVFR"),
+    (2900, "MVFR"),
+    (3000, "MVFR"),
+    (3100, "VFR"),
+    (None, "VFR"),
+])
+def test_categoria_por_techo(techo_ft, esperada):
+    assert wx_decoder.categoria_vuelo(techo_ft, wx_decoder.VISIBILIDAD_MAXIMA_M) == esperada
+
+
+@pytest.mark.parametrize("visibilidad, esperada", [
+    ("3/4SM", "LIFR"),
+    ("1SM", "IFR"),
+    ("2SM", "IFR"),
+    ("3SM", "MVFR"),
+    ("5SM", "MVFR"),
+    ("6SM", "VFR"),
+    ("P6SM", "VFR"),
+])
+def test_categoria_por_visibilidad_en_millas(visibilidad, esperada):
+    metar = wx_decoder.decodificar_metar(f"KMIA 121853Z 09010KT {visibilidad} FEW250 30/22 A3001")
+    assert metar["categoria"] == esperada
+
+
+@pytest.mark.parametrize("metar, esperada", [
+    ("SKBO 121800Z 27008KT 9999 OVC030 15/10 Q1027", "MVFR"),
+    ("SKBO 121800Z 27008KT 9999 BKN031 15/10 Q1027", "VFR"),
+    ("SKBO 121800Z 27008KT 9999 BKN010 15/10 Q1027", "MVFR"),
+    ("SKBO 121800Z 27008KT 9999 BKN009 15/10 Q1027", "IFR"),
+    ("SKBO 121800Z 27008KT 9999 OVC005 15/10 Q1027", "IFR"),
+    ("SKBO 121800Z 27008KT 9999 OVC004 15/10 Q1027", "LIFR"),
+    ("SKBO 121800Z 27008KT 8000 FEW040 15/10 Q1027", "MVFR"),
+    ("SKBO 121800Z 27008KT 4800 FEW040 15/10 Q1027", "IFR"),
+    ("SKBO 121800Z 27008KT 1500 FEW040 15/10 Q1027", "LIFR"),
+])
+def test_categoria_de_metar(metar, esperada):
+    assert wx_decoder.decodificar_metar(metar)["categoria"] == esperada
+
+
+def test_validez_del_taf_con_grupo_fm():
+    taf = wx_decoder.decodificar_taf(
+        "TAF SKBO 171100Z 1712/1818 27008KT 9999 SCT030 FM171500 30012KT 9999 BKN025 TEMPO 1718/1722 4000 RA",
+        referencia=datetime(2025, 8, 17, 11, 0, tzinfo=timezone.utc),
+    )
+    base = taf["segmentos"][0]
+    assert base["tipo"] == "BASE"
+    assert base["fin"] == datetime(2025, 8, 17, 15, 0, tzinfo=timezone.utc)
+    assert taf["valido_hasta"] == datetime(2025, 8, 18, 18, 0, tzinfo=timezone.utc)